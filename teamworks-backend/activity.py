@@ -0,0 +1,147 @@
+# activity.py
+"""
+Per-project activity log: who changed what, as compact events in the capped
+`project_activity` collection (see model.ensure_indexes).
+
+Write routes call `activity_log.record(...)`, which only appends to an
+in-process buffer. A background thread writes the buffer with one
+insert_many every ACTIVITY_FLUSH_INTERVAL seconds, or sooner once
+ACTIVITY_FLUSH_SIZE events are waiting, so a burst of edits costs one round
+trip instead of one per event. The buffer is flushed at exit; if MongoDB is
+unreachable, events are kept (up to ACTIVITY_MAX_BUFFER, newer events are
+dropped beyond that) and retried.
+
+Event shape:
+    {_id, projectId, seq, type, actor, at, taskId?, data?}
+`seq` is the feed cursor. Before writing, a flush reserves a block of
+per-project sequence numbers with one $inc on the project's counter
+document, so `seq` increases across all workers and has no holes except
+for events still being written by another worker (or lost to a failed
+write); readers wait for a hole to fill before moving past it, see
+server.settled_activity. Client-generated `_id`s are not ordered across
+processes and are not used as cursors.
+
+Config (app.config):
+    ACTIVITY_ENABLED         default True
+    ACTIVITY_FLUSH_INTERVAL  seconds, default 0.5
+    ACTIVITY_FLUSH_SIZE      default 200
+    ACTIVITY_MAX_BUFFER      default 10000
+"""
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger("teamworks.activity")
+
+
+class ActivityLog:
+    def __init__(self, app=None, collection=None, counters=None):
+        self.enabled = False
+        self.buffer = []
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.pid = None
+        if app is not None:
+            self.init_app(app, collection, counters)
+
+    def init_app(self, app, collection, counters):
+        self.collection = collection
+        self.counters = counters
+        self.enabled = app.config.get("ACTIVITY_ENABLED", True)
+        self.flush_interval = app.config.get("ACTIVITY_FLUSH_INTERVAL", 0.5)
+        self.flush_size = app.config.get("ACTIVITY_FLUSH_SIZE", 200)
+        self.max_buffer = app.config.get("ACTIVITY_MAX_BUFFER", 10000)
+        if self.enabled:
+            atexit.register(self.flush)
+
+    def record(self, project_id, kind, actor=None, task_id=None, **data):
+        """Queue one event. `data` should hold JSON-friendly values (ids as strings)."""
+        if not self.enabled:
+            return
+        event = {"projectId": ObjectId(project_id), "type": kind, "actor": actor, "at": datetime.utcnow()}
+        if task_id is not None:
+            event["taskId"] = ObjectId(task_id)
+        if data:
+            event["data"] = data
+        with self.lock:
+            if self.pid != os.getpid():
+                self._start()
+            if len(self.buffer) >= self.max_buffer:
+                # writer is stuck (MongoDB down); keep what is queued
+                self.dropped += 1
+                return
+            self.buffer.append(event)
+            full = len(self.buffer) >= self.flush_size
+        if full:
+            self.wake.set()
+
+    def _start(self):
+        # first event in this process (or in a forked worker: the parent's
+        # buffer and thread are not ours to flush)
+        self.pid = os.getpid()
+        self.buffer = []
+        self.thread = threading.Thread(target=self._run, name="activity-writer", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # e.g. an event bson cannot encode; the batch is lost, the writer is not
+                logger.exception("Activity flush failed")
+
+    def _assign_seq(self, batch):
+        """Give each event without a `seq` the next numbers of its project's counter."""
+        pending = {}
+        for event in batch:
+            if "seq" not in event:
+                pending.setdefault(event["projectId"], []).append(event)
+        for project_id, events in pending.items():
+            counter = self.counters.find_one_and_update(
+                {"_id": project_id},
+                {"$inc": {"seq": len(events)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            first = counter["seq"] - len(events) + 1
+            for offset, event in enumerate(events):
+                event["seq"] = first + offset
+
+    def flush(self):
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            logger.warning("Activity buffer full; %d event(s) dropped", dropped)
+        if not batch:
+            return 0
+        try:
+            self._assign_seq(batch)
+            self.collection.insert_many(batch, ordered=False)
+            return len(batch)
+        except BulkWriteError as exc:
+            # per-event rejections; a retried batch keeps its seqs and _ids,
+            # so events that already made it in fail as duplicates here
+            rejected = len(exc.details.get("writeErrors", []))
+            logger.warning("Activity flush: %d event(s) rejected", rejected)
+            return len(batch) - rejected
+        except PyMongoError as exc:
+            with self.lock:
+                keep = max(0, self.max_buffer - len(self.buffer))
+                self.buffer[:0] = batch[-keep:] if keep else []
+            logger.warning(
+                "Activity flush failed; %d event(s) kept for retry, %d dropped: %s",
+                min(keep, len(batch)), max(0, len(batch) - keep), exc,
+            )
+            return 0
@@ -0,0 +1,276 @@
+# benchmark.py
+"""
+Route benchmark: drives the API through Flask's test client against the
+database in MONGO_URI (seed it first with seed.py) and records latency
+percentiles and MongoDB round-trips per request.
+
+Usage:
+    python seed.py --users 10000 --projects 2000 --tasks 100000 --drop
+    python benchmark.py [--iterations 200] [--only search_project,list_my_tasks]
+                        [--output bench_results/run.json]
+                        [--compare bench_results/baseline.json]
+
+Scenarios run against the largest seeded project and its owner. The
+dependency scenarios work on tasks create_project_backlog made and are
+skipped (with a message) when it did not run. Tasks and
+comments the write scenarios create are tracked and deleted at the end (also
+when --only skips delete_task, or a scenario fails), then the project's stats
+and the task's comment count are recomputed. Routes that destroy seeded data
+(delete project, leave/remove member, change owner) are not benchmarked.
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+# Benchmarks measure the handlers, not the admission control in front of them
+os.environ.setdefault("RATE_LIMIT_ENABLED", "False")
+
+from dbmetrics import command_recorder  # noqa: E402
+from model import (  # noqa: E402
+    backlog_collection, get_comments_collection, get_notifications_collection,
+    get_projects_collection, get_stats_collection, get_users_collection,
+)
+from seed import SEED_PASSWORD  # noqa: E402
+from server import app, rebuild_project_stats  # noqa: E402
+
+# build(ctx, i) -> (path, request kwargs); iterations=None uses --iterations;
+# needs names a ctx list that must be non-empty, else the scenario is skipped
+Scenario = namedtuple("Scenario", ["name", "method", "build", "iterations", "needs"], defaults=[None])
+NEEDS_HINTS = {
+    "created": "no benchmark tasks to work on; add create_project_backlog to --only",
+    "invitees": "every user is already a member of the project",
+}
+
+
+def _auth(ctx, extra=None):
+    return {"headers": {"X-User-Id": str(ctx["user_id"]), **(extra or {})}}
+
+
+def _json(ctx, body):
+    return {**_auth(ctx), "json": body}
+
+
+SCENARIOS = [
+    Scenario("home", "GET", lambda c, i: ("/", {}), None),
+    Scenario("list_user_projects", "GET", lambda c, i: (f"/api/projects/{c['user_id']}", {}), None),
+    Scenario("get_project", "GET", lambda c, i: (f"/api/project/{c['project_id']}", _auth(c)), None),
+    Scenario("get_project_backlog", "GET", lambda c, i: (f"/api/projects/{c['project_id']}/backlog", _auth(c)), None),
+    Scenario("get_project_backlog_range", "GET", lambda c, i: (
+        f"/api/projects/{c['project_id']}/backlog?from={c['range_from']}&to={c['range_to']}", _auth(c)), None),
+    Scenario("get_project_backlog_ranked", "GET", lambda c, i: (
+        f"/api/projects/{c['project_id']}/backlog?order=rank", _auth(c)), None),
+    Scenario("get_project_bootstrap", "GET", lambda c, i: (
+        f"/api/projects/{c['project_id']}/bootstrap?fields=id,title,status,assignedTo,rank", _auth(c)), None),
+    Scenario("list_my_tasks", "GET", lambda c, i: ("/api/users/me/tasks?status=To Do,In Progress", _auth(c)), None),
+    Scenario("list_my_project_stats", "GET", lambda c, i: ("/api/users/me/project-stats", _auth(c)), None),
+    Scenario("search_project", "GET", lambda c, i: (
+        f"/api/projects/{c['project_id']}/search?q=dashboard calendar", _auth(c)), None),
+    Scenario("export_backlog", "GET", lambda c, i: (
+        f"/api/projects/{c['project_id']}/backlog/export?format=ndjson", _auth(c)), 20),
+    Scenario("get_progress_snapshots", "GET", lambda c, i: (f"/api/projects/{c['project_id']}/snapshots", _auth(c)), None),
+    Scenario("list_invitations", "GET", lambda c, i: ("/api/invitations", _auth(c)), None),
+    Scenario("list_notifications", "GET", lambda c, i: ("/api/notifications", _auth(c)), None),
+    Scenario("get_users_list", "GET", lambda c, i: ("/api/users", {}), 50),
+    Scenario("get_comments", "GET", lambda c, i: (
+        f"/api/projects/{c['project_id']}/backlog/{c['task_id']}/comments", _auth(c)), None),
+    Scenario("create_project_backlog", "POST", lambda c, i: (f"/api/projects/{c['project_id']}/backlog", _json(c, {
+        "title": f"bench task {i}", "description": "benchmark", "label": "bench", "status": "To Do",
+        "priority": "Low", "assignedTo": str(c["user_id"]), "startDate": c["range_from"], "dueDate": c["range_to"],
+    })), None),
+    Scenario("update_task", "PUT", lambda c, i: (
+        f"/api/projects/{c['project_id']}/backlog/{c['task_id']}", _json(c, {"progress": i % 100})), None),
+    Scenario("move_task", "POST", lambda c, i: (
+        f"/api/projects/{c['project_id']}/backlog/{c['task_id']}/move", _json(c, {"status": c["task_status"]})), None),
+    Scenario("add_dependency", "POST", lambda c, i: (
+        f"/api/projects/{c['project_id']}/backlog/{c['created'][i % len(c['created'])]}/dependencies",
+        _json(c, {"dependencyId": str(c["task_id"])})), None, "created"),
+    Scenario("remove_dependency", "DELETE", lambda c, i: (
+        f"/api/projects/{c['project_id']}/backlog/{c['created'][i % len(c['created'])]}/dependencies/{c['task_id']}",
+        _auth(c)), None, "created"),
+    Scenario("add_comment", "POST", lambda c, i: (
+        f"/api/projects/{c['project_id']}/backlog/{c['task_id']}/comments",
+        _json(c, {"author": "bench", "text": f"benchmark comment {i}"})), None),
+    Scenario("login_user", "POST", lambda c, i: (
+        "/api/users/login", {"json": {"email": c["email"], "password": SEED_PASSWORD}}), 20),
+    Scenario("invite_members", "POST", lambda c, i: (
+        f"/api/projects/{c['project_id']}/invite", _json(c, {"emails": [c["invitees"][i % len(c["invitees"])]]})), 20, "invitees"),
+    Scenario("delete_task", "DELETE", lambda c, i: (
+        f"/api/projects/{c['project_id']}/backlog/{c['created'][i]}", _auth(c)), "created"),
+]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def build_context():
+    stats = get_stats_collection().find_one({}, sort=[("taskCount", -1)])
+    if not stats:
+        raise SystemExit("No project stats found; run seed.py first.")
+    project = get_projects_collection().find_one({"_id": stats["_id"]})
+    owner = get_users_collection().find_one({"_id": project["owner"]})
+    task = backlog_collection.find_one({"projectId": project["_id"]}, sort=[("dueDate", 1)])
+    invitees = [u["email"] for u in get_users_collection().find(
+        {"_id": {"$nin": project["members"]}}, {"email": 1}).limit(20)]
+    today = datetime.utcnow().date()
+    return {
+        "project_id": project["_id"],
+        "user_id": owner["_id"],
+        "email": owner["email"],
+        "task_id": task["_id"],
+        "task_status": task["status"],
+        "range_from": (today - timedelta(days=14)).isoformat(),
+        "range_to": (today + timedelta(days=14)).isoformat(),
+        "invitees": invitees,
+        "created": [],
+        "comments": [],
+        "dataset": {
+            "users": get_users_collection().estimated_document_count(),
+            "projects": get_projects_collection().estimated_document_count(),
+            "tasks": backlog_collection.estimated_document_count(),
+            "comments": get_comments_collection().estimated_document_count(),
+            "notifications": get_notifications_collection().estimated_document_count(),
+            "largestProjectTasks": stats.get("taskCount", 0),
+        },
+    }
+
+
+def run_scenario(client, scenario, ctx, iterations, warmup):
+    count = scenario.iterations or iterations
+    if count == "created":
+        count = len(ctx["created"])
+    latencies, round_trips, statuses = [], [], Counter()
+    for i in range(-warmup if scenario.method == "GET" else 0, count):
+        path, kwargs = scenario.build(ctx, max(i, 0))
+        command_recorder.start()
+        started = time.perf_counter()
+        response = client.open(path, method=scenario.method, **kwargs)
+        response.get_data()  # drain streamed bodies
+        elapsed = (time.perf_counter() - started) * 1000
+        commands = command_recorder.stop()
+        if scenario.name == "create_project_backlog" and response.status_code == 201:
+            ctx["created"].append(response.get_json()["id"])
+        if scenario.name == "add_comment" and response.status_code == 201:
+            ctx["comments"].append(response.get_json()["id"])
+        if i < 0:
+            continue
+        latencies.append(elapsed)
+        round_trips.append(len(commands))
+        statuses[str(response.status_code)] += 1
+    if not latencies:
+        return None
+    return {
+        "iterations": len(latencies),
+        "p50": round(_percentile(latencies, 50), 3),
+        "p95": round(_percentile(latencies, 95), 3),
+        "p99": round(_percentile(latencies, 99), 3),
+        "mean": round(sum(latencies) / len(latencies), 3),
+        "dbRoundTrips": round(sum(round_trips) / len(round_trips), 2),
+        "statuses": dict(statuses),
+    }
+
+
+def _recount_comments(task_id):
+    comments = get_comments_collection()
+    count = comments.count_documents({"taskId": task_id})
+    if not count:
+        backlog_collection.update_one({"_id": task_id}, {"$unset": {"commentCount": "", "lastCommentAt": ""}})
+        return
+    last = comments.find_one({"taskId": task_id}, {"timestamp": 1}, sort=[("timestamp", -1)])
+    backlog_collection.update_one(
+        {"_id": task_id}, {"$set": {"commentCount": count, "lastCommentAt": last.get("timestamp")}}
+    )
+
+
+def cleanup(ctx):
+    """Remove what the write scenarios created, whichever of them ran."""
+    created = [ObjectId(task_id) for task_id in ctx["created"]]
+    if created:
+        # delete_task may already have removed some (or all) of them
+        backlog_collection.delete_many({"_id": {"$in": created}, "projectId": ctx["project_id"]})
+        get_comments_collection().delete_many({"taskId": {"$in": created}})
+    if ctx["comments"]:
+        get_comments_collection().delete_many({"_id": {"$in": [ObjectId(c) for c in ctx["comments"]]}})
+    _recount_comments(ctx["task_id"])
+    get_projects_collection().update_one(
+        {"_id": ctx["project_id"]},
+        {"$pull": {"pendingInvites": {"email": {"$in": ctx["invitees"]}}}},
+    )
+    rebuild_project_stats([ctx["project_id"]])
+
+
+def print_report(report, baseline=None):
+    header = f"{'route':34} {'p50':>9} {'p95':>9} {'p99':>9} {'db':>6}"
+    if baseline:
+        header += f" {'p95 vs base':>12} {'db vs base':>11}"
+    print(header)
+    for name, row in report["routes"].items():
+        line = f"{name:34} {row['p50']:9.2f} {row['p95']:9.2f} {row['p99']:9.2f} {row['dbRoundTrips']:6.1f}"
+        base = (baseline or {}).get("routes", {}).get(name)
+        if base:
+            delta = (row["p95"] - base["p95"]) / base["p95"] * 100 if base["p95"] else 0.0
+            line += f" {delta:+11.1f}% {row['dbRoundTrips'] - base['dbRoundTrips']:+11.1f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Teamworks routes.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--output", help="write the JSON report here (default bench_results/<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline JSON report to diff against")
+    args = parser.parse_args()
+
+    app.config["TESTING"] = True
+    app.extensions["mail"].suppress = True  # invite_members must not send real email
+
+    only = set(args.only.split(",")) if args.only else None
+    ctx = build_context()
+    client = app.test_client()
+    routes = {}
+    try:
+        for scenario in SCENARIOS:
+            if only and scenario.name not in only:
+                continue
+            if scenario.needs and not ctx[scenario.needs]:
+                print(f"skipping {scenario.name}: {NEEDS_HINTS[scenario.needs]}")
+                continue
+            result = run_scenario(client, scenario, ctx, args.iterations, args.warmup)
+            if result:
+                routes[scenario.name] = result
+    finally:
+        cleanup(ctx)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "iterations": args.iterations,
+            "dataset": ctx["dataset"],
+        },
+        "routes": routes,
+    }
+    output = args.output or os.path.join("bench_results", f"{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as fh:
+        json.dump(report, fh, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+    print_report(report, baseline)
+    print(f"\nreport written to {output}")
+
+
+if __name__ == "__main__":
+    main()
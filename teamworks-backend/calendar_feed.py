@@ -0,0 +1,129 @@
+# calendar_feed.py
+"""
+iCalendar (RFC 5545) rendering of task due dates, plus the small render
+cache the feed routes in server.py keep between calendar-client polls.
+
+Each task becomes an all-day VEVENT spanning startDate..dueDate (or just the
+due day), with a stable UID so clients update events in place.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+PRODID = "-//Teamworks//Task due dates//EN"
+
+
+def _escape(text):
+    return (
+        str(text or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """Content lines are limited to 75 octets; continuation lines start with a space."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1  # never split a UTF-8 sequence
+        parts.append(encoded[start:end].decode("utf-8"))
+        start, limit = end, 74  # the leading space counts
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _date(value):
+    return value.strftime("%Y%m%d")
+
+
+def _stamp(value):
+    return (value or datetime.utcnow()).strftime("%Y%m%dT%H%M%SZ")
+
+
+def render_event(task, project_name=None, link=None):
+    due = task.get("dueDate")
+    if not isinstance(due, datetime):
+        return ""
+    start = task.get("startDate")
+    if not isinstance(start, datetime) or start > due:
+        start = due
+    summary = task.get("title", "")
+    if project_name:
+        summary = f"[{project_name}] {summary}"
+    details = [
+        f"Status: {task.get('status', '')}",
+        f"Priority: {task.get('priority', '')}",
+        f"Progress: {task.get('progress', 0)}%",
+    ]
+    if task.get("description"):
+        details.append("")
+        details.append(task["description"])
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{task['_id']}@teamworks",
+        f"DTSTAMP:{_stamp(task.get('updatedAt'))}",
+        f"DTSTART;VALUE=DATE:{_date(start)}",
+        f"DTEND;VALUE=DATE:{_date(due + timedelta(days=1))}",  # exclusive end
+        f"SUMMARY:{_escape(summary)}",
+        f"DESCRIPTION:{_escape(chr(10).join(details))}",
+    ]
+    if task.get("label"):
+        lines.append(f"CATEGORIES:{_escape(task['label'])}")
+    if link:
+        lines.append(f"URL:{link}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+
+def render_calendar(name, tasks, project_names=None, link_for=None):
+    """
+    Yields the feed in pieces while iterating `tasks` (a cursor), so a large
+    backlog is never materialised as documents at once.
+    project_names: {projectId: name} to prefix summaries (personal feed).
+    link_for: task -> URL shown in the event.
+    """
+    yield "".join(_fold(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}",
+        "REFRESH-INTERVAL;VALUE=DURATION:PT15M",
+        "X-PUBLISHED-TTL:PT15M",
+    ))
+    for task in tasks:
+        project_name = (project_names or {}).get(task.get("projectId"))
+        yield render_event(task, project_name, link_for(task) if link_for else None)
+    yield "END:VCALENDAR\r\n"
+
+
+class FeedCache:
+    """Bounded LRU of rendered feeds: key -> (etag, body)."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, etag):
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry or entry[0] != etag:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, etag, body):
+        with self.lock:
+            self.entries[key] = (etag, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
@@ -0,0 +1,212 @@
+# compression.py
+"""
+Negotiated response compression for the Flask app, and for the async
+(Quart) views of server_async.py through Compressor.after_async_request.
+
+- Picks br (if the optional `brotli` package is installed) or gzip from the
+  request's Accept-Encoding, honouring q-values; identity otherwise.
+- Buffered bodies under COMPRESS_MIN_SIZE are sent as-is.
+- Streamed responses (backlog export) are compressed chunk by chunk with a
+  sync flush after each chunk, so rows still reach the client as produced.
+  The async views only return buffered JSON, so that path compresses
+  buffered bodies only.
+- Compressed bodies are kept in a byte-bounded LRU keyed by URL + ETag (or
+  a body digest when there is no ETag) and encoding, so a repeated hit on an
+  unchanged response skips the compressor. A compressed response's ETag is made weak, as it no longer
+  names the identity bytes.
+
+Config (app.config):
+    COMPRESS_ENABLED         default True
+    COMPRESS_MIN_SIZE        bytes, default 1024
+    COMPRESS_GZIP_LEVEL      default 6
+    COMPRESS_BROTLI_QUALITY  default 4
+    COMPRESS_MIMETYPES       default JSON, NDJSON, CSV, text/plain, text/calendar
+    COMPRESS_CACHE_BYTES     default 32 MiB, 0 disables the cache
+"""
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+DEFAULT_MIMETYPES = {
+    "application/json", "application/x-ndjson", "text/csv", "text/plain", "text/calendar",
+}
+
+
+def parse_accept_encoding(header):
+    """{'gzip': 1.0, 'br': 0.8, ...} from an Accept-Encoding header."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class _CompressedCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class Compressor:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self.enabled = config.get("COMPRESS_ENABLED", True)
+        if not self.enabled:
+            return
+        self.min_size = config.get("COMPRESS_MIN_SIZE", 1024)
+        self.gzip_level = config.get("COMPRESS_GZIP_LEVEL", 6)
+        self.brotli_quality = config.get("COMPRESS_BROTLI_QUALITY", 4)
+        self.mimetypes = set(config.get("COMPRESS_MIMETYPES", DEFAULT_MIMETYPES))
+        cache_bytes = config.get("COMPRESS_CACHE_BYTES", 32 * 1024 * 1024)
+        self.cache = _CompressedCache(cache_bytes) if cache_bytes else None
+        app.after_request(self._after_request)
+
+    def _choose(self, accept_encoding):
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        options = [("br", accepted.get("br", wildcard))] if brotli is not None else []
+        options.append(("gzip", accepted.get("gzip", wildcard)))
+        coding, q = max(options, key=lambda o: o[1])  # ties keep br first
+        return coding if q > 0 else None
+
+    def _compressor(self, coding):
+        """(process(chunk) -> bytes, finish() -> bytes) for one stream."""
+        if coding == "br":
+            c = brotli.Compressor(quality=self.brotli_quality)
+            return (lambda chunk: c.process(chunk) + c.flush()), c.finish
+        c = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+        return (lambda chunk: c.compress(chunk) + c.flush(zlib.Z_SYNC_FLUSH)), c.flush
+
+    def _compress(self, coding, body):
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        c = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return c.compress(body) + c.flush()
+
+    def _stream(self, coding, chunks):
+        process, finish = self._compressor(coding)
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                if chunk:
+                    out = process(chunk)
+                    if out:
+                        yield out
+            yield finish()
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+
+    def _negotiate(self, response, req):
+        """The coding to apply to `response` for request `req`, or None."""
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or response.mimetype not in self.mimetypes
+            or req.method == "HEAD"
+        ):
+            return None
+        response.vary.add("Accept-Encoding")
+        if (
+            "Content-Encoding" in response.headers
+            or "no-transform" in (response.headers.get("Cache-Control") or "")
+        ):
+            return None
+        return self._choose(req.headers.get("Accept-Encoding"))
+
+    @staticmethod
+    def _mark_encoded(response, coding):
+        response.headers["Content-Encoding"] = coding
+        etag = response.headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            response.headers["ETag"] = "W/" + etag
+
+    def _after_request(self, response):
+        coding = self._negotiate(response, request)
+        if not coding or response.direct_passthrough:
+            return response
+
+        if response.is_streamed:
+            response.response = self._stream(coding, response.response)
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            response.set_data(self._cached_compress(coding, body, response.headers.get("ETag"), request.full_path))
+        self._mark_encoded(response, coding)
+        return response
+
+    async def after_async_request(self, response, req):
+        """The same negotiation for a Quart response (buffered bodies only)."""
+        if not self.enabled:
+            return response
+        coding = self._negotiate(response, req)
+        if not coding or not isinstance(response.response, response.data_body_class):
+            return response
+        body = await response.get_data()
+        if len(body) < self.min_size:
+            return response
+        response.set_data(self._cached_compress(coding, body, response.headers.get("ETag"), req.full_path))
+        self._mark_encoded(response, coding)
+        return response
+
+    def _cached_compress(self, coding, body, etag, url):
+        if self.cache is None:
+            return self._compress(coding, body)
+        # An ETag names one resource's body (ours are per-resource versions, so
+        # keyed with the URL); without one, a digest is still far cheaper than
+        # recompressing.
+        if etag and not etag.startswith("W/"):
+            key = (url, etag, coding)
+        else:
+            key = (hashlib.blake2b(body, digest_size=16).digest(), len(body), coding)
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = self._compress(coding, body)
+            self.cache.put(key, compressed)
+        return compressed
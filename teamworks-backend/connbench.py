@@ -0,0 +1,263 @@
+# connbench.py
+"""
+Concurrent-connection benchmark: sync gunicorn workers vs the asyncio mode.
+
+Usage:
+    python seed.py --users 1000 --projects 200 --tasks 10000 --drop
+    pip install -r requirements-async.txt
+    python connbench.py [--levels 50,100,250,500,1000] [--duration 15] [--path /api/notifications]
+                        [--sync-cmd "gunicorn -w 4 -b 127.0.0.1:8001 server:app"]
+                        [--async-cmd "uvicorn server_async:app --host 127.0.0.1 --port 8002"]
+                        [--mix-path /api/users/me/tasks] [--mix-share 0.25]
+                        [--output bench_results/conn.json]
+
+For each server (started here as a subprocess with rate limiting and access
+logs off) and each concurrency level, N clients hit --path in a loop for
+--duration seconds, one connection per request like a polling browser tab.
+Reported per level: completed requests, error/timeout rate, p50/p95/p99
+latency, and the server's resident memory (all processes in its tree,
+sampled from /proc, so Linux only). "capacity" is the highest level whose
+error rate stays under 1% and p99 under --max-p99; "memPerConnKB" is the
+peak RSS growth over idle divided by the level.
+
+With --mix-path, --mix-share of the clients poll that path instead. Pick
+a route the async mode does not port (e.g. /api/users/me/tasks, which is
+forwarded to Flask) and the "mixed" figures show whether forwarded routes
+still run in parallel under load: their throughput should stay close to the
+sync workers' rather than collapsing to what a single thread can serve.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _descendants(root_pid):
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as fh:
+                fields = fh.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def tree_rss_kb(root_pid):
+    total = 0
+    for pid in _descendants(root_pid):
+        try:
+            with open(f"/proc/{pid}/status") as fh:
+                for line in fh:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total
+
+
+async def _request(host, port, raw, timeout):
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        try:
+            writer.write(raw)
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), timeout)
+            await asyncio.wait_for(reader.read(), timeout)  # Connection: close -> read to EOF
+        finally:
+            writer.close()
+        ok = status_line.split(b" ", 2)[1:2] == [b"200"]
+    except (OSError, asyncio.TimeoutError, IndexError):
+        ok = False
+    return ok, (time.perf_counter() - started) * 1000
+
+
+async def _client(host, port, raw, deadline, timeout, results):
+    while time.time() < deadline:
+        results.append(await _request(host, port, raw, timeout))
+
+
+def _get(parts, path, user_id):
+    return (
+        f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nX-User-Id: {user_id}\r\n"
+        f"Connection: close\r\n\r\n"
+    ).encode("ascii")
+
+
+def _summarize(results, duration):
+    latencies = sorted(ms for ok, ms in results if ok)
+    errors = sum(1 for ok, _ in results if not ok)
+    return {
+        "requests": len(results),
+        "throughput": round(len(latencies) / duration, 1),
+        "errorRate": round(errors / len(results), 4) if results else 1.0,
+        "p50": round(_percentile(latencies, 50), 1),
+        "p95": round(_percentile(latencies, 95), 1),
+        "p99": round(_percentile(latencies, 99), 1),
+    }
+
+
+async def _sample_memory(pid, stop, peaks):
+    while not stop.is_set():
+        peaks.append(tree_rss_kb(pid))
+        await asyncio.sleep(0.2)
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+async def run_level(base_url, path, user_id, level, duration, timeout, server_pid, mix_path=None, mix_share=0.0):
+    parts = urlsplit(base_url)
+    mixed_clients = int(round(level * mix_share)) if mix_path else 0
+    results, mixed, peaks = [], [], []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(_sample_memory(server_pid, stop, peaks))
+    deadline = time.time() + duration
+    await asyncio.gather(
+        *(_client(parts.hostname, parts.port, _get(parts, path, user_id), deadline, timeout, results)
+          for _ in range(level - mixed_clients)),
+        *(_client(parts.hostname, parts.port, _get(parts, mix_path, user_id), deadline, timeout, mixed)
+          for _ in range(mixed_clients)),
+    )
+    stop.set()
+    await sampler
+    row = {"connections": level, **_summarize(results + mixed, duration), "peakRssKB": max(peaks) if peaks else 0}
+    if mixed_clients:
+        row["mixed"] = {"path": mix_path, "connections": mixed_clients, **_summarize(mixed, duration)}
+    return row
+
+
+def _wait_until_up(base_url, proc, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with {proc.returncode}")
+        try:
+            urllib.request.urlopen(base_url + "/", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.25)
+    raise SystemExit(f"server at {base_url} did not come up")
+
+
+def _login(base_url, email, password):
+    req = urllib.request.Request(
+        base_url + "/api/users/login",
+        data=json.dumps({"email": email, "password": password}).encode("utf-8"),
+        headers={"Content-Type": "application/json"}, method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        return json.loads(resp.read())["user"]["id"]
+
+
+def _port_of(tokens):
+    """Port from gunicorn's -b HOST:PORT or uvicorn's --port PORT."""
+    if "--port" in tokens:
+        return int(tokens[tokens.index("--port") + 1])
+    for token in tokens:
+        host, _, port = token.rpartition(":")
+        if host and port.isdigit():
+            return int(port)
+    return None
+
+
+def bench_server(name, cmd, args):
+    tokens = shlex.split(cmd)
+    port = _port_of(tokens)
+    if not port:
+        raise SystemExit(f"cannot find the port in {cmd!r}")
+    base_url = f"http://127.0.0.1:{port}"
+
+    env = {**os.environ, "RATE_LIMIT_ENABLED": "false", "LOG_ACCESS": "false", "LOG_LEVEL": "WARNING"}
+    proc = subprocess.Popen(tokens, cwd=HERE, env=env)
+    try:
+        _wait_until_up(base_url, proc)
+        user_id = _login(base_url, args.email, args.password)
+        time.sleep(1)
+        idle = tree_rss_kb(proc.pid)
+        levels = []
+        for level in args.levels:
+            row = asyncio.run(run_level(
+                base_url, args.path, user_id, level, args.duration, args.timeout, proc.pid, args.mix_path, args.mix_share,
+            ))
+            row["memPerConnKB"] = round(max(0, row["peakRssKB"] - idle) / level, 1)
+            levels.append(row)
+            print(f"{name:6} {level:6d} conns  {row['throughput']:8.1f} req/s  err {row['errorRate'] * 100:5.1f}%  "
+                  f"p50 {row['p50']:7.1f}  p99 {row['p99']:8.1f} ms  rss {row['peakRssKB'] / 1024:7.1f} MB  "
+                  f"{row['memPerConnKB']:6.1f} KB/conn")
+            if "mixed" in row:
+                mixed = row["mixed"]
+                print(f"{'':6} {mixed['connections']:6d} mixed  {mixed['throughput']:8.1f} req/s  "
+                      f"err {mixed['errorRate'] * 100:5.1f}%  p50 {mixed['p50']:7.1f}  p99 {mixed['p99']:8.1f} ms  "
+                      f"{mixed['path']}")
+        healthy = [r["connections"] for r in levels if r["errorRate"] < 0.01 and r["p99"] <= args.max_p99]
+        return {"command": cmd, "idleRssKB": idle, "capacity": max(healthy) if healthy else 0, "levels": levels}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and async serving modes under many connections.")
+    parser.add_argument("--sync-cmd", default="gunicorn -w 4 -b 127.0.0.1:8001 server:app")
+    parser.add_argument("--async-cmd", default="uvicorn server_async:app --host 127.0.0.1 --port 8002")
+    parser.add_argument("--only", choices=["sync", "async"])
+    parser.add_argument("--levels", default="50,100,250,500,1000")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per level")
+    parser.add_argument("--timeout", type=float, default=10, help="per-request timeout (counts as an error)")
+    parser.add_argument("--max-p99", type=float, default=1000, help="p99 ms still counted as healthy")
+    parser.add_argument("--path", default="/api/notifications")
+    parser.add_argument("--mix-path", help="route polled by --mix-share of the clients, e.g. /api/users/me/tasks")
+    parser.add_argument("--mix-share", type=float, default=0.25, help="share of clients on --mix-path")
+    parser.add_argument("--email", default="seed.user0@example.com")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+    args.levels = [int(v) for v in args.levels.split(",")]
+    if not sys.platform.startswith("linux"):
+        raise SystemExit("connbench.py reads memory from /proc and needs Linux")
+
+    report = {"meta": {
+        "timestamp": datetime.utcnow().isoformat(), "path": args.path, "duration": args.duration,
+        "mixPath": args.mix_path, "mixShare": args.mix_share if args.mix_path else 0,
+    }}
+    for name, cmd in (("sync", args.sync_cmd), ("async", args.async_cmd)):
+        if args.only and args.only != name:
+            continue
+        report[name] = bench_server(name, cmd, args)
+        print(f"{name}: capacity {report[name]['capacity']} connections\n")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
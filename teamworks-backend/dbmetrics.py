@@ -0,0 +1,77 @@
+# dbmetrics.py
+"""
+Per-thread recording of the MongoDB commands an operation issues.
+
+model.py registers `command_recorder` on the MongoClient. Anything that wants
+to know what a request did against the database (benchmarks, the profiler)
+wraps the work in start()/stop():
+
+    command_recorder.start()
+    ... handle request ...
+    commands = command_recorder.stop()   # [{"name", "collection", "durationMs", ...}]
+
+Recordings nest: a benchmark recording around a request and the profiler's
+recording inside it both see the request's commands. PyMongo publishes
+command events on the thread that runs the operation, so concurrent requests
+on other threads never mix into each other's recording.
+"""
+import threading
+
+from pymongo import monitoring
+
+
+class CommandRecorder(monitoring.CommandListener):
+    def __init__(self):
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+            self._local.pending = {}
+        return stack
+
+    def start(self):
+        self._stack().append([])
+
+    def stop(self):
+        stack = self._stack()
+        commands = stack.pop() if stack else []
+        if not stack:
+            self._local.pending = {}
+        return commands
+
+    def started(self, event):
+        stack = getattr(self._local, "stack", None)
+        if not stack:
+            return
+        collection = event.command.get(event.command_name)
+        entry = {
+            "name": event.command_name,
+            "collection": collection if isinstance(collection, str) else None,
+            "database": event.database_name,
+            "server": "%s:%s" % event.connection_id if event.connection_id else None,
+            "durationMs": None,
+            "ok": None,
+        }
+        for commands in stack:
+            commands.append(entry)
+        self._local.pending[event.request_id] = entry
+
+    def _finish(self, event, ok):
+        pending = getattr(self._local, "pending", None)
+        if not pending:
+            return
+        entry = pending.pop(event.request_id, None)
+        if entry is not None:
+            entry["durationMs"] = event.duration_micros / 1000.0
+            entry["ok"] = ok
+
+    def succeeded(self, event):
+        self._finish(event, True)
+
+    def failed(self, event):
+        self._finish(event, False)
+
+
+command_recorder = CommandRecorder()
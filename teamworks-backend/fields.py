@@ -0,0 +1,85 @@
+# fields.py
+"""
+Conversions between API values and stored document fields, shared by
+server.py and the offline scripts (migrate.py, seed.py) so those do not
+have to import the whole app.
+
+Dates are stored as naive UTC midnight datetimes (BSON dates) and returned
+to clients as 'YYYY-MM-DD'. Task versions travel as ETag / If-Match.
+"""
+from datetime import datetime
+
+
+def as_iso_date(value):
+    """
+    Accepts: 'YYYY-MM-DD', full ISO8601 string, datetime/date objects, or missing.
+    Returns: ISO date string 'YYYY-MM-DD' or '' if value is falsy.
+    """
+    if not value:
+        return ""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, str):
+        # try plain date
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+        except ValueError:
+            # try full ISO (and tolerate Z)
+            try:
+                return datetime.fromisoformat(value.replace("Z", "+00:00")).date().isoformat()
+            except Exception:
+                # if it's some other string, just return as-is to avoid 500s
+                return value
+    return str(value)
+
+
+def parse_iso_date(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            try:
+                return datetime.fromisoformat(value.replace("Z", "+00:00")).date()
+            except Exception:
+                return None
+    return None
+
+
+def to_bson_date(value):
+    """
+    Accepts the same inputs as parse_iso_date.
+    Returns: naive UTC datetime at midnight (stored as a BSON date) or None.
+    """
+    parsed = parse_iso_date(value)
+    if not parsed:
+        return None
+    return datetime(parsed.year, parsed.month, parsed.day)
+
+
+def parse_if_match(raw):
+    """If-Match header -> expected task version, None for absent / '*'; ValueError otherwise."""
+    if not raw or raw.strip() == "*":
+        return None
+    raw = raw.strip()
+    if raw.startswith("W/"):
+        raw = raw[2:]
+    try:
+        return int(raw.strip('"'))
+    except ValueError:
+        raise ValueError("If-Match must be a task version")
+
+
+# Projects embed `memberProfiles: [{_id, name, email}]` (see server.py)
+MEMBER_PROFILE_PROJECTION = {"firstName": 1, "lastName": 1, "email": 1}
+
+
+def member_profile(user):
+    return {
+        "_id": user["_id"],
+        "name": f"{user.get('firstName','')} {user.get('lastName','')}".strip(),
+        "email": user.get("email", ""),
+    }
@@ -0,0 +1,132 @@
+# jobs.py
+"""
+Maintenance and background jobs for the Teamworks backend.
+
+Usage:
+    python jobs.py rebuild-stats [--project <id> ...]
+    python jobs.py rebalance-ranks [--all]
+    python jobs.py archive-projects [--days N] [--limit N]
+    python jobs.py snapshot-progress
+    python jobs.py due-reminders
+    python jobs.py comment-counts [--project <id> ...]
+    python jobs.py run                 # run the periodic jobs forever (Procfile worker)
+"""
+import argparse
+import logging
+import time
+
+from model import backlog_collection, get_rank_rebalance_collection
+from server import app, archive_completed_projects, rebalance_column_ranks, rebuild_project_stats
+from server import rebuild_comment_counts, send_due_reminders, take_progress_snapshots
+
+logger = logging.getLogger("teamworks.jobs")
+
+
+def rebuild_stats(args):
+    count = rebuild_project_stats(args.project or None)
+    print(f"rebuild-stats: {count} project stats document(s) rebuilt")
+
+
+def rebalance_ranks(args):
+    """Respace queued columns (or every column with --all)."""
+    queue = get_rank_rebalance_collection()
+    if getattr(args, "all", False):
+        columns = [
+            row["_id"] for row in backlog_collection.aggregate([
+                {"$group": {"_id": {"projectId": "$projectId", "status": "$status"}}}
+            ])
+        ]
+    else:
+        columns = [entry["_id"] for entry in queue.find({}, {"_id": 1})]
+
+    updated = 0
+    for column in columns:
+        updated += rebalance_column_ranks(column["projectId"], column["status"])
+        queue.delete_one({"_id": column})
+    print(f"rebalance-ranks: {len(columns)} column(s), {updated} task(s) re-ranked")
+
+
+def archive_projects(args):
+    count = archive_completed_projects(getattr(args, "days", None), getattr(args, "limit", None))
+    print(f"archive-projects: {count} project(s) archived")
+
+
+def snapshot_progress(args):
+    count = take_progress_snapshots()
+    print(f"snapshot-progress: {count} snapshot(s) written")
+
+
+def due_reminders(args):
+    created = send_due_reminders()
+    print(f"due-reminders: {created}")
+
+
+def comment_counts(args):
+    rebuild_comment_counts(args.project or None)
+    print("comment-counts: commentCount / lastCommentAt backfilled")
+
+
+# name -> (interval in seconds, job)
+PERIODIC_JOBS = {
+    "rebalance-ranks": (300, rebalance_ranks),
+    "archive-projects": (3600, archive_projects),
+    # idempotent per day, so hourly runs just fill in projects created since
+    "snapshot-progress": (3600, snapshot_progress),
+    "due-reminders": (600, due_reminders),
+}
+
+
+def run(args):
+    """Simple single-process scheduler: runs each periodic job on its interval."""
+    next_run = {name: 0 for name in PERIODIC_JOBS}
+    while True:
+        now = time.monotonic()
+        for name, (interval, job) in PERIODIC_JOBS.items():
+            if now < next_run[name]:
+                continue
+            try:
+                with app.app_context():
+                    job(argparse.Namespace())
+            except Exception:
+                logger.exception("periodic job %s failed", name)
+            next_run[name] = time.monotonic() + interval
+        time.sleep(max(1, min(next_run.values()) - time.monotonic()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teamworks maintenance jobs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("rebuild-stats", help="recompute project_stats from backlog_items")
+    p.add_argument("--project", action="append", help="project id (repeatable); default: all")
+    p.set_defaults(func=rebuild_stats)
+
+    p = sub.add_parser("rebalance-ranks", help="respace Kanban ranks of queued columns")
+    p.add_argument("--all", action="store_true", help="every column, e.g. to rank existing tasks")
+    p.set_defaults(func=rebalance_ranks)
+
+    p = sub.add_parser("archive-projects", help="move old Completed projects to the archive")
+    p.add_argument("--days", type=int, help="override ARCHIVE_AFTER_DAYS")
+    p.add_argument("--limit", type=int, help="archive at most N projects this run")
+    p.set_defaults(func=archive_projects)
+
+    p = sub.add_parser("snapshot-progress", help="write today's per-project progress snapshot")
+    p.set_defaults(func=snapshot_progress)
+
+    p = sub.add_parser("due-reminders", help="notify assignees of tasks due soon or overdue")
+    p.set_defaults(func=due_reminders)
+
+    p = sub.add_parser("comment-counts", help="backfill task commentCount / lastCommentAt")
+    p.add_argument("--project", action="append", help="project id (repeatable); default: all")
+    p.set_defaults(func=comment_counts)
+
+    p = sub.add_parser("run", help="run the periodic jobs forever")
+    p.set_defaults(func=run)
+
+    args = parser.parse_args()
+    with app.app_context():
+        args.func(args)
+
+
+if __name__ == "__main__":
+    main()
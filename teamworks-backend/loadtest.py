@@ -0,0 +1,291 @@
+# loadtest.py
+"""
+Load generator that replays the frontend's request flows against a running
+server over HTTP.
+
+Usage:
+    python seed.py --users 1000 --projects 200 --tasks 10000 --drop
+    RATE_LIMIT_ENABLED=false gunicorn -w 4 -b 127.0.0.1:5001 server:app      # or python server.py (port 5001)
+    python loadtest.py [--base-url http://127.0.0.1:5001] [--users 50] [--processes 4]
+                       [--duration 60] [--think-time 1.0] [--flows dashboard=3,notifications=5,board=2]
+                       [--slo loadtest_slo.json] [--output bench_results/load.json]
+
+Each virtual user logs in as a seeded account (seed.user<N>@example.com) and
+then loops: pick a flow by weight, run its steps back to back the way the
+page does, sleep an exponentially distributed think time. Virtual users are
+threads spread over --processes worker processes so the generator itself is
+not the bottleneck.
+
+Flows (mirroring the React pages):
+    dashboard      DashboardHome: GET /api/projects/<user> + GET /api/users
+    notifications  NotificationBell: GET /api/invitations + GET /api/notifications
+    board          KanbanBoard: project, users and backlog loads, then a drag
+                   (PUT backlog/<task> {"status": ...})
+
+With --slo the run is a regression check: the JSON file maps step names (or
+"*" for every step) to limits, e.g.
+    {"*": {"errorRate": 0.01}, "board.drag": {"p95": 250, "p99": 600}}
+and the process exits 1 if any limit is breached.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+
+BOARD_COLUMNS = ["To Do", "In Progress", "Done"]
+DEFAULT_FLOWS = {"dashboard": 3, "notifications": 5, "board": 2}
+
+
+class Client:
+    """Minimal JSON-over-HTTP client that times every request as a named step."""
+
+    def __init__(self, base_url, samples, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.samples = samples
+        self.timeout = timeout
+        self.user_id = None
+
+    def call(self, step, method, path, body=None):
+        headers = {"Content-Type": "application/json"}
+        if self.user_id:
+            headers["X-User-Id"] = self.user_id
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                status, payload = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        except (urllib.error.URLError, OSError):
+            status, payload = 0, b""
+        elapsed = (time.perf_counter() - started) * 1000
+        self.samples.append((step, elapsed, status, time.time()))
+        if 200 <= status < 300 and payload:
+            try:
+                return json.loads(payload)
+            except ValueError:
+                return None
+        return None
+
+
+def flow_dashboard(client, state, rng):
+    client.call("dashboard.projects", "GET", f"/api/projects/{client.user_id}")
+    client.call("dashboard.users", "GET", "/api/users")
+
+
+def flow_notifications(client, state, rng):
+    client.call("notifications.invitations", "GET", "/api/invitations")
+    client.call("notifications.list", "GET", "/api/notifications")
+
+
+def flow_board(client, state, rng):
+    if not state["projects"]:
+        projects = client.call("board.projects", "GET", f"/api/projects/{client.user_id}") or []
+        state["projects"] = [p["id"] for p in projects]
+        if not state["projects"]:
+            return
+    project_id = rng.choice(state["projects"])
+    client.call("board.project", "GET", f"/api/project/{project_id}")
+    client.call("board.users", "GET", "/api/users")
+    tasks = client.call("board.backlog", "GET", f"/api/projects/{project_id}/backlog") or []
+    if not tasks:
+        return
+    task = rng.choice(tasks)
+    target = rng.choice([c for c in BOARD_COLUMNS if c != task.get("status")])
+    client.call("board.drag", "PUT", f"/api/projects/{project_id}/backlog/{task['id']}", {"status": target})
+
+
+FLOWS = {
+    "dashboard": flow_dashboard,
+    "notifications": flow_notifications,
+    "board": flow_board,
+}
+
+
+def virtual_user(index, args, flows, deadline, samples, seed, delay=0.0):
+    time.sleep(delay)
+    rng = random.Random(seed + index)
+    client = Client(args.base_url, samples, args.timeout)
+    login = client.call("login", "POST", "/api/users/login", {
+        "email": f"seed.user{index % args.seed_users}@example.com",
+        "password": args.password,
+    })
+    if not login:
+        return
+    client.user_id = login["user"]["id"]
+    state = {"projects": []}
+    names, weights = zip(*flows.items())
+    while time.time() < deadline:
+        FLOWS[rng.choices(names, weights=weights)[0]](client, state, rng)
+        if args.think_time > 0:
+            time.sleep(min(rng.expovariate(1.0 / args.think_time), max(0.0, deadline - time.time())))
+
+
+def worker(worker_index, user_indexes, args, flows, start_at, deadline, queue):
+    """One process: its share of virtual users as threads, samples sent back on exit."""
+    samples = []  # list.append is atomic under the GIL
+    time.sleep(max(0.0, start_at - time.time()))
+    threads = []
+    for i, index in enumerate(user_indexes):
+        # ramp up evenly instead of logging everyone in at the same instant
+        delay = args.ramp_up * i / max(1, len(user_indexes))
+        t = threading.Thread(target=virtual_user, args=(index, args, flows, deadline, samples, args.seed, delay),
+                             daemon=True)
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join(timeout=max(0.0, deadline - time.time()) + args.timeout + 5)
+    queue.put(samples)
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(samples, measured_from, measured_to):
+    """Per-step stats over samples that finished inside the measurement window."""
+    by_step = defaultdict(list)
+    for step, elapsed, status, finished in samples:
+        if measured_from <= finished <= measured_to or step == "login":
+            by_step[step].append((elapsed, status))
+    window = max(1e-9, measured_to - measured_from)
+    steps = {}
+    for step in sorted(by_step):
+        rows = by_step[step]
+        latencies = sorted(r[0] for r in rows)
+        errors = sum(1 for r in rows if not 200 <= r[1] < 300)
+        statuses = defaultdict(int)
+        for _, status in rows:
+            statuses[str(status)] += 1
+        steps[step] = {
+            "requests": len(rows),
+            "throughput": round(len(rows) / window, 2),
+            "errorRate": round(errors / len(rows), 4),
+            "p50": round(_percentile(latencies, 50), 2),
+            "p95": round(_percentile(latencies, 95), 2),
+            "p99": round(_percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2),
+            "statuses": dict(statuses),
+        }
+    return steps
+
+
+def check_slo(steps, slo):
+    """List of human-readable breaches; empty when every limit holds."""
+    breaches = []
+    for step, row in steps.items():
+        limits = {**slo.get("*", {}), **slo.get(step, {})}
+        for metric, limit in limits.items():
+            if metric == "throughput":
+                if row["throughput"] < limit:
+                    breaches.append(f"{step}: throughput {row['throughput']}/s < {limit}/s")
+            elif metric in row and row[metric] > limit:
+                breaches.append(f"{step}: {metric} {row[metric]} > {limit}")
+    for step in slo:
+        if step != "*" and step not in steps:
+            breaches.append(f"{step}: no requests recorded")
+    return breaches
+
+
+def _parse_flows(spec):
+    if not spec:
+        return dict(DEFAULT_FLOWS)
+    flows = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in FLOWS:
+            raise SystemExit(f"unknown flow {name!r}; choose from {', '.join(FLOWS)}")
+        flows[name] = float(weight or 1)
+    return flows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay frontend flows against a running server.")
+    parser.add_argument("--base-url", default=os.getenv("LOADTEST_BASE_URL", "http://127.0.0.1:5001"))
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--processes", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--duration", type=float, default=60, help="seconds of measured load")
+    parser.add_argument("--ramp-up", type=float, default=5, help="seconds to start all users (not measured)")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean seconds between flows")
+    parser.add_argument("--flows", help="weights, e.g. dashboard=3,notifications=5,board=2")
+    parser.add_argument("--seed-users", type=int, default=1000, help="how many seed.user<N> accounts exist")
+    parser.add_argument("--password", default="password123", help="seeded accounts' password")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--slo", help="JSON file of per-step limits; exit 1 on breach")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    flows = _parse_flows(args.flows)
+    processes = max(1, min(args.processes, args.users))
+    start_at = time.time() + 1
+    measured_from = start_at + args.ramp_up
+    deadline = measured_from + args.duration
+
+    queue = multiprocessing.Queue()
+    workers = []
+    for w in range(processes):
+        user_indexes = list(range(w, args.users, processes))
+        p = multiprocessing.Process(target=worker, args=(w, user_indexes, args, flows, start_at, deadline, queue))
+        p.start()
+        workers.append(p)
+    # drain before join: a child blocks on exit until its queued samples are read
+    samples = []
+    for _ in workers:
+        samples.extend(queue.get())
+    for p in workers:
+        p.join()
+
+    steps = summarize(samples, measured_from, deadline)
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "baseUrl": args.base_url,
+            "users": args.users,
+            "processes": processes,
+            "duration": args.duration,
+            "thinkTime": args.think_time,
+            "flows": flows,
+        },
+        "steps": steps,
+    }
+
+    print(f"{'step':28} {'req':>7} {'req/s':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for step, row in steps.items():
+        print(f"{step:28} {row['requests']:7d} {row['throughput']:8.1f} {row['errorRate'] * 100:6.2f} "
+              f"{row['p50']:8.1f} {row['p95']:8.1f} {row['p99']:8.1f}")
+
+    breaches = []
+    if args.slo:
+        with open(args.slo) as fh:
+            breaches = check_slo(steps, json.load(fh))
+        report["sloBreaches"] = breaches
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+    if breaches:
+        print("\nSLO breaches:")
+        for breach in breaches:
+            print(f"  {breach}")
+        sys.exit(1)
+    if args.slo:
+        print("\nall SLOs met")
+
+
+if __name__ == "__main__":
+    main()
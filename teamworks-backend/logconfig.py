@@ -0,0 +1,244 @@
+# logconfig.py
+"""
+Structured, non-blocking logging for the Flask app.
+
+- Request threads only enqueue records (QueueHandler); a QueueListener thread
+  formats and writes them, so slow log I/O never stalls a request.
+- Every record carries the request id: taken from an incoming X-Request-Id
+  header (sanitised) or generated, and echoed back on the response.
+- Sensitive keys (passwords, tokens, ...) are redacted by the formatter, both
+  in structured fields (extra={"fields": {...}}) and in key/value pairs that
+  ended up inside the message text. Logged paths mask route variables with a
+  sensitive name (the calendar feeds' /api/calendar/<token>/...).
+- INFO/DEBUG records of high-volume loggers (and records logged with
+  extra={"sample": True}) are sampled per request, so a kept request keeps
+  all of its lines. WARNING and above are always kept.
+
+Config (app.config / env):
+    LOG_LEVEL             default INFO
+    LOG_FORMAT            "json" (default) or "text"
+    LOG_INFO_SAMPLE_RATE  0..1, default 1.0 (keep everything)
+    LOG_SAMPLED_LOGGERS   comma-separated logger names, default "teamworks.access"
+    LOG_ACCESS            one access-log line per request, default True
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+REDACTED = "[REDACTED]"
+SENSITIVE_KEYS = {
+    "password", "newpassword", "currentpassword", "oldpassword", "token", "calendartoken",
+    "accesstoken", "refreshtoken", "secret", "authorization", "cookie", "mail_password",
+}
+# key: value / key=value pairs inside free-form message text
+_SENSITIVE_TEXT = re.compile(
+    r"""(?P<key>['"]?(?:%s)['"]?\s*[:=]\s*)(?P<value>b?'[^']*'|b?"[^"]*"|[^\s,}&]+)""" % "|".join(
+        sorted(SENSITIVE_KEYS, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+access_logger = logging.getLogger("teamworks.access")
+
+# Set by non-Flask request handlers (server_async.py) where flask.g is absent
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+
+def redact(value):
+    """Copy of value with every sensitive key's value replaced."""
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if str(k).lower().replace("-", "") in SENSITIVE_KEYS else redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+def redact_text(text):
+    return _SENSITIVE_TEXT.sub(lambda m: m.group("key") + REDACTED, text)
+
+
+def redact_path(path, view_args=None):
+    """path with the segments bound to sensitive route variables (e.g. <token>) masked."""
+    secrets = {
+        str(value) for name, value in (view_args or {}).items()
+        if name.lower() in SENSITIVE_KEYS and value
+    }
+    if not secrets:
+        return path
+    return "/".join(REDACTED if segment in secrets else segment for segment in path.split("/"))
+
+
+def request_path(full=False):
+    """The current request's path for logs; full=True appends the (redacted) query string."""
+    path = redact_path(request.path, request.view_args)
+    if full and request.query_string:
+        path += "?" + redact_text(request.query_string.decode("utf-8", "replace"))
+    return path
+
+
+def current_request_id():
+    if has_request_context():
+        return getattr(g, "request_id", None)
+    return request_id_var.get()
+
+
+def new_request_id(incoming):
+    """Sanitised X-Request-Id from the client, or a fresh one."""
+    return incoming if incoming and _REQUEST_ID.match(incoming) else uuid.uuid4().hex
+
+
+class RequestContextFilter(logging.Filter):
+    """Runs on the request thread (before enqueueing) to capture request data."""
+
+    def filter(self, record):
+        record.request_id = current_request_id() or "-"
+        if has_request_context():
+            record.method = request.method
+            record.path = request_path()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate, loggers):
+        super().__init__()
+        self.threshold = int(max(0.0, min(1.0, rate)) * 10000)
+        self.loggers = set(loggers)
+
+    def filter(self, record):
+        if self.threshold >= 10000 or record.levelno >= logging.WARNING:
+            return True
+        if record.name not in self.loggers and not getattr(record, "sample", False):
+            return True
+        key = getattr(record, "request_id", None) or uuid.uuid4().hex
+        return zlib.crc32(key.encode("utf-8")) % 10000 < self.threshold
+
+
+class _Formatting:
+    def _fields(self, record):
+        fields = getattr(record, "fields", None)
+        return redact(fields) if fields else None
+
+    def _message(self, record):
+        return redact_text(record.getMessage())
+
+
+class JsonFormatter(_Formatting, logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": self._message(record),
+            "requestId": getattr(record, "request_id", "-"),
+        }
+        if getattr(record, "method", None):
+            entry["method"] = record.method
+            entry["path"] = record.path
+        fields = self._fields(record)
+        if fields:
+            entry["fields"] = fields
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = redact_text(record.exc_text)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(_Formatting, logging.Formatter):
+    def format(self, record):
+        line = "%s %s [%s] %s: %s" % (
+            self.formatTime(record), record.levelname, getattr(record, "request_id", "-"),
+            record.name, self._message(record),
+        )
+        fields = self._fields(record)
+        if fields:
+            line += " " + json.dumps(fields, default=str)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line += "\n" + redact_text(record.exc_text)
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Ships the record unformatted so the listener's formatter still sees
+    structured fields; only what can't cross threads safely is resolved here.
+    """
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            record.fields = dict(fields)  # the caller may keep mutating its dict
+        return record
+
+
+def init_logging(app):
+    config = app.config
+    level = config.get("LOG_LEVEL", "INFO")
+    formatter = JsonFormatter() if config.get("LOG_FORMAT", "json") == "json" else TextFormatter()
+
+    output = logging.StreamHandler()
+    output.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(SamplingFilter(
+        config.get("LOG_INFO_SAMPLE_RATE", 1.0),
+        config.get("LOG_SAMPLED_LOGGERS", [access_logger.name]),
+    ))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    app.logger.removeHandler(default_handler)
+    app.logger.setLevel(level)
+    # werkzeug's own per-request line duplicates the access log
+    if config.get("LOG_ACCESS", True):
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    @app.before_request
+    def _assign_request_id():
+        g.request_id = new_request_id(request.headers.get("X-Request-Id"))
+        g._log_started = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        request_id = getattr(g, "request_id", None)
+        if request_id:
+            response.headers["X-Request-Id"] = request_id
+        if config.get("LOG_ACCESS", True):
+            started = getattr(g, "_log_started", None)
+            access_logger.info("%s %s %s", request.method, request_path(), response.status_code, extra={"fields": {
+                "status": response.status_code,
+                "durationMs": round((time.perf_counter() - started) * 1000, 2) if started else None,
+                "userId": request.headers.get("X-User-Id"),
+            }})
+        return response
+
+    return listener
@@ -0,0 +1,234 @@
+# migrate.py
+"""
+Online, batched, resumable data migrations.
+
+Usage:
+    python migrate.py <name> [--batch-size 500] [--pause 0.1] [--restart]
+    python migrate.py --list
+
+Progress is checkpointed in the `migrations` collection after every batch, so
+an interrupted run resumes from the last processed _id. Every document is
+rewritten with a compare-and-set filter on the values it was read with, which
+means a concurrent write from the API is never clobbered (the API already
+stores the new shape, so the document simply no longer needs migrating).
+"""
+import argparse
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from model import backlog_collection, get_comments_collection, get_migrations_collection
+from model import check_connection, get_projects_collection, get_users_collection
+from fields import MEMBER_PROFILE_PROJECTION, member_profile, to_bson_date
+
+
+# -------------------- backlog-types --------------------
+
+def _backlog_types_changes(task, context=None):
+    """
+    startDate/dueDate: ISO string -> BSON date, assignedTo: str -> ObjectId,
+    dependencies: str -> ObjectId. A value that does not convert is cleared
+    (or, for dependencies, dropped) but kept in `legacy<Field>` so it can be
+    fixed by hand; each one is reported.
+    """
+    changes = {}
+
+    def keep_legacy(field, value, what):
+        legacy_field = "legacy" + field[0].upper() + field[1:]
+        changes[legacy_field] = value
+        print(f"backlog-types: task {task['_id']}: {what} (kept in {legacy_field})")
+
+    for field in ("startDate", "dueDate"):
+        value = task.get(field)
+        if isinstance(value, str):
+            changes[field] = to_bson_date(value)
+            if value and changes[field] is None:
+                keep_legacy(field, value, f"unparseable {field} {value!r} cleared")
+
+    assigned = task.get("assignedTo")
+    if isinstance(assigned, str):
+        try:
+            changes["assignedTo"] = ObjectId(assigned)
+        except Exception:
+            changes["assignedTo"] = None
+            if assigned:
+                keep_legacy("assignedTo", assigned, f"assignedTo {assigned!r} is not a user id, cleared")
+
+    deps = task.get("dependencies") or []
+    if any(isinstance(dep, str) for dep in deps):
+        typed, dropped = [], []
+        for dep in deps:
+            try:
+                dep_oid = ObjectId(dep)
+            except Exception:
+                dropped.append(dep)
+                continue
+            if dep_oid not in typed:
+                typed.append(dep_oid)
+        changes["dependencies"] = typed
+        if dropped:
+            keep_legacy("dependencies", deps, f"dependencies {dropped!r} are not task ids, dropped")
+    return changes
+
+
+# -------------------- comment-project-ids --------------------
+
+def _comment_task_projects(batch):
+    """One lookup per batch: taskId -> projectId."""
+    task_ids = list({c["taskId"] for c in batch if c.get("taskId")})
+    return {
+        t["_id"]: t["projectId"]
+        for t in backlog_collection.find({"_id": {"$in": task_ids}}, {"projectId": 1})
+    }
+
+
+def _comment_project_changes(comment, task_projects):
+    """Copy the parent task's projectId onto the comment (for project-scoped search)."""
+    project_id = task_projects.get(comment.get("taskId"))
+    if not project_id:
+        return {}
+    return {"projectId": project_id}
+
+
+# -------------------- member-profiles --------------------
+
+def _project_member_users(batch):
+    """One lookup per batch: userId -> user (name/email only)."""
+    user_ids = list({m for p in batch for m in p.get("members", [])})
+    return {
+        u["_id"]: u
+        for u in get_users_collection().find({"_id": {"$in": user_ids}}, MEMBER_PROFILE_PROJECTION)
+    }
+
+
+def _member_profiles_changes(project, users):
+    """Embedded {_id, name, email} per member, in `members` order."""
+    profiles = [member_profile(users.get(m, {"_id": m})) for m in project.get("members", [])]
+    if profiles == project.get("memberProfiles"):
+        return {}
+    # members is rewritten unchanged so the compare-and-set guard also covers it
+    return {"memberProfiles": profiles, "members": project.get("members", [])}
+
+
+MIGRATIONS = {
+    "backlog-types": {
+        "collection": backlog_collection,
+        "filter": {"$or": [
+            {"startDate": {"$type": "string"}},
+            {"dueDate": {"$type": "string"}},
+            {"assignedTo": {"$type": "string"}},
+            {"dependencies": {"$type": "string"}},
+        ]},
+        "projection": {
+            "startDate": 1, "dueDate": 1, "assignedTo": 1, "dependencies": 1,
+            "legacyStartDate": 1, "legacyDueDate": 1, "legacyAssignedTo": 1, "legacyDependencies": 1,
+        },
+        "transform": _backlog_types_changes,
+    },
+    "comment-project-ids": {
+        "collection": get_comments_collection(),
+        "filter": {"projectId": {"$exists": False}},
+        "projection": {"taskId": 1, "projectId": 1},
+        "prepare": _comment_task_projects,
+        "transform": _comment_project_changes,
+    },
+    "member-profiles": {
+        "collection": get_projects_collection(),
+        # also catches projects whose embedded list drifted from members
+        "filter": {"$expr": {"$ne": [
+            {"$size": {"$ifNull": ["$memberProfiles", []]}},
+            {"$size": {"$ifNull": ["$members", []]}},
+        ]}},
+        "projection": {"members": 1, "memberProfiles": 1},
+        "prepare": _project_member_users,
+        "transform": _member_profiles_changes,
+    },
+}
+
+
+def run_migration(name, batch_size=500, pause=0.0, restart=False):
+    spec = MIGRATIONS[name]
+    collection = spec["collection"]
+    state_collection = get_migrations_collection()
+
+    if restart:
+        state_collection.delete_one({"_id": name})
+
+    state = state_collection.find_one({"_id": name}) or {}
+    last_id = state.get("lastId")
+    modified = state.get("modified", 0)
+    if state.get("done"):
+        print(f"{name}: already complete ({modified} documents). Use --restart to run again.")
+        return modified
+
+    while True:
+        query = spec["filter"]
+        if last_id is not None:
+            query = {"$and": [spec["filter"], {"_id": {"$gt": last_id}}]}
+
+        batch = list(
+            collection.find(query, spec["projection"]).sort("_id", 1).limit(batch_size)
+        )
+        if not batch:
+            break
+
+        context = spec["prepare"](batch) if "prepare" in spec else None
+        ops = []
+        for doc in batch:
+            changes = spec["transform"](doc, context)
+            if not changes:
+                continue
+            # compare-and-set: only rewrite if the fields still hold what we read
+            guard = {"_id": doc["_id"]}
+            for field in changes:
+                guard[field] = doc.get(field)
+            ops.append(UpdateOne(guard, {"$set": changes}))
+
+        if ops:
+            result = collection.bulk_write(ops, ordered=False)
+            modified += result.modified_count
+
+        last_id = batch[-1]["_id"]
+        state_collection.update_one(
+            {"_id": name},
+            {"$set": {"lastId": last_id, "modified": modified, "done": False, "updatedAt": datetime.utcnow()}},
+            upsert=True,
+        )
+        print(f"{name}: processed up to {last_id} ({modified} modified)")
+
+        if pause:
+            time.sleep(pause)
+
+    state_collection.update_one(
+        {"_id": name},
+        {"$set": {"done": True, "modified": modified, "finishedAt": datetime.utcnow()}},
+        upsert=True,
+    )
+    print(f"{name}: done ({modified} documents modified)")
+    return modified
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Teamworks data migrations.")
+    parser.add_argument("name", nargs="?", choices=sorted(MIGRATIONS))
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.0,
+                        help="seconds to sleep between batches to limit load on a live cluster")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    parser.add_argument("--list", action="store_true", help="list available migrations")
+    args = parser.parse_args()
+
+    if args.list or not args.name:
+        for name in sorted(MIGRATIONS):
+            print(name)
+        return
+
+    if not check_connection():
+        raise SystemExit(1)
+    run_migration(args.name, batch_size=args.batch_size, pause=args.pause, restart=args.restart)
+
+
+if __name__ == "__main__":
+    main()
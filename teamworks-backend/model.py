@@ -1,20 +1,26 @@
 # model.py
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT
+from gridfs import GridFSBucket
 import certifi
+import logging
 import os
 from dotenv import load_dotenv
+from dbmetrics import command_recorder
 
 # Load environment variables from .env
 load_dotenv()
 
+logger = logging.getLogger("teamworks.db")
+
 # Get MongoDB URI from .env or fallback to localhost
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/teamworks_db")
 
 # Connect to MongoDB with or without SSL depending on URI
+# (command_recorder lets benchmarks/profiling see the commands a request issues)
 if "localhost" in MONGO_URI or "127.0.0.1" in MONGO_URI:
-    client = MongoClient(MONGO_URI)
+    client = MongoClient(MONGO_URI, event_listeners=[command_recorder])
 else:
-    client = MongoClient(MONGO_URI, tls=True, tlsCAFile=certifi.where())
+    client = MongoClient(MONGO_URI, tls=True, tlsCAFile=certifi.where(), event_listeners=[command_recorder])
 
 # Access database and collections
 db = client["teamworks_db"]
@@ -38,9 +44,135 @@ def get_comments_collection():
 def get_notifications_collection():
     return db["notifications"]
 
-# Test connection
-try:
-    client.admin.command("ping")
-    print("✅ Connected to MongoDB!")
-except Exception as e:
-    print(f"❌ MongoDB Connection Failed: {e}")
+def get_migrations_collection():
+    return db["migrations"]
+
+def get_stats_collection():
+    return db["project_stats"]
+
+def get_rate_limits_collection():
+    return db["rate_limits"]
+
+def get_rank_rebalance_collection():
+    return db["rank_rebalance_queue"]
+
+# Archive tier: completed projects and their tasks/comments, out of the hot set
+def get_archived_projects_collection():
+    return db["archived_projects"]
+
+def get_archived_backlog_collection():
+    return db["archived_backlog_items"]
+
+def get_archived_comments_collection():
+    return db["archived_task_comments"]
+
+def get_snapshots_collection():
+    return db["project_snapshots"]
+
+# Capped: the activity feed keeps the most recent ACTIVITY_LOG_BYTES of events
+ACTIVITY_LOG_BYTES = int(os.getenv("ACTIVITY_LOG_BYTES", 256 * 1024 * 1024))
+
+def get_activity_collection():
+    return db["project_activity"]
+
+# One document per project: the last activity `seq` handed out
+def get_activity_counters_collection():
+    return db["project_activity_counters"]
+
+# Task attachments: file bytes in the `attachments` GridFS bucket, one small
+# metadata document per file (same _id) for listings
+attachments_bucket = GridFSBucket(db, bucket_name="attachments")
+
+def get_attachments_bucket():
+    return attachments_bucket
+
+def get_attachments_collection():
+    return db["task_attachments"]
+
+
+# Text index field weights; search divides both collections' scores by the largest
+TASK_TEXT_WEIGHTS = {"title": 10, "label": 5, "description": 1}
+COMMENT_TEXT_WEIGHTS = {"text": 1}  # the index default
+
+
+def ensure_indexes():
+    # Daily burndown snapshots live in a time-series collection (MongoDB 5.0+);
+    # older servers fall back to a plain collection with the same index.
+    if "project_snapshots" not in db.list_collection_names():
+        try:
+            db.create_collection(
+                "project_snapshots",
+                timeseries={"timeField": "day", "metaField": "projectId", "granularity": "hours"},
+            )
+        except Exception:
+            pass
+    get_snapshots_collection().create_index([("projectId", ASCENDING), ("day", ASCENDING)])
+
+    if "project_activity" not in db.list_collection_names():
+        try:
+            db.create_collection("project_activity", capped=True, size=ACTIVITY_LOG_BYTES)
+        except Exception:
+            pass
+    # Per-project feed pages and "since" reads walk (projectId, seq); unique so
+    # a retried flush cannot store an event twice
+    get_activity_collection().create_index([("projectId", ASCENDING), ("seq", ASCENDING)], unique=True)
+
+    # Date-range reads on a project's backlog (calendar / range filters)
+    backlog_collection.create_index([("projectId", ASCENDING), ("dueDate", ASCENDING)])
+    # Gantt timeline windows: overlap on startDate/dueDate, returned in startDate order
+    backlog_collection.create_index([("projectId", ASCENDING), ("startDate", ASCENDING), ("dueDate", ASCENDING)])
+    # Personal task feed: tasks assigned to a user ordered by due date (keyset on _id)
+    backlog_collection.create_index([("assignedTo", ASCENDING), ("dueDate", ASCENDING), ("_id", ASCENDING)])
+    # Backlog import: resolves dependency refs by external id within one run
+    backlog_collection.create_index([("importId", ASCENDING), ("importKey", ASCENDING)], sparse=True)
+    projects_collection.create_index([("members", ASCENDING)])
+    # Project-scoped full-text search (equality prefix on projectId)
+    backlog_collection.create_index(
+        [("projectId", ASCENDING), ("title", TEXT), ("description", TEXT), ("label", TEXT)],
+        weights=TASK_TEXT_WEIGHTS,
+        name="project_task_text",
+    )
+    comments_collection.create_index(
+        [("projectId", ASCENDING), ("text", TEXT)],
+        name="project_comment_text",
+    )
+    comments_collection.create_index([("taskId", ASCENDING), ("timestamp", ASCENDING)])
+    # Kanban columns come back pre-sorted by fractional rank
+    backlog_collection.create_index([("projectId", ASCENDING), ("status", ASCENDING), ("rank", ASCENDING)])
+    projects_collection.create_index([("status", ASCENDING), ("updatedAt", ASCENDING)])
+    # Due-date reminder scans are range queries on dueDate across all projects
+    backlog_collection.create_index([("dueDate", ASCENDING)])
+    notifications = get_notifications_collection()
+    notifications.create_index([("userId", ASCENDING), ("createdAt", DESCENDING)])
+    notifications.create_index(
+        [("dedupeKey", ASCENDING)],
+        unique=True,
+        partialFilterExpression={"dedupeKey": {"$exists": True}},
+    )
+    # Attachment listings per task, never touching attachments.chunks
+    get_attachments_collection().create_index([("taskId", ASCENDING), ("uploadedAt", ASCENDING)])
+    get_attachments_collection().create_index([("projectId", ASCENDING)])
+    # calendar feed URLs carry the token instead of X-User-Id
+    users_collection.create_index(
+        [("calendarToken", ASCENDING)],
+        unique=True,
+        partialFilterExpression={"calendarToken": {"$exists": True}},
+    )
+    get_archived_projects_collection().create_index([("members", ASCENDING)])
+    get_archived_backlog_collection().create_index([("projectId", ASCENDING)])
+    get_archived_comments_collection().create_index([("taskId", ASCENDING), ("timestamp", ASCENDING)])
+
+def check_connection():
+    """
+    Ping the server and ensure indexes. Called by the app once logging is
+    configured (importing this module does no I/O), so the result reaches
+    the configured handlers. Returns False if MongoDB is unreachable.
+    """
+    try:
+        client.admin.command("ping")
+        logger.info("Connected to MongoDB")
+        ensure_indexes()
+        return True
+    except Exception as e:
+        logger.error("MongoDB connection failed: %s", e)
+        return False
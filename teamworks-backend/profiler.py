@@ -0,0 +1,145 @@
+# profiler.py
+"""
+Opt-in per-request profiling and Server-Timing for the Flask app.
+
+Two layers, both off unless PROFILE_ENABLED is set:
+
+- Server-Timing on every response: `db` (sum of the request's MongoDB
+  command durations, from dbmetrics.command_recorder), `serialize` (time in
+  the JSON provider), `app` (the rest of the handler) and `total`.
+- A full profile for selected requests: those sending the PROFILE_HEADER
+  (whose value must equal PROFILE_TOKEN when one is configured) plus a
+  PROFILE_SAMPLE_RATE fraction of all requests. Each profiled request writes
+      <PROFILE_DIR>/<timestamp>-<endpoint>-<request id>.prof   cProfile/pstats
+      <PROFILE_DIR>/<timestamp>-<endpoint>-<request id>.json   request + Mongo commands
+  and gets an X-Profile-Id response header naming the pair. Open the .prof
+  with `python -m pstats` or snakeviz.
+
+The profile stops when the view returns, so the body of a streamed response
+(export) is not included. Only the Flask app is instrumented: the async
+views of server_async.py send no Server-Timing and are never profiled.
+
+Config (app.config):
+    PROFILE_ENABLED      bool, default False
+    PROFILE_HEADER       default "X-Profile"
+    PROFILE_TOKEN        required header value, default "" (any value)
+    PROFILE_SAMPLE_RATE  0..1, default 0
+    PROFILE_DIR          default "profiles"
+"""
+import cProfile
+import json
+import os
+import random
+import time
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+from dbmetrics import command_recorder
+from logconfig import current_request_id, request_path
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Accumulates time spent encoding JSON into g._serialize_seconds."""
+
+    def dumps(self, obj, **kwargs):
+        if not has_request_context() or "_timing_started" not in g:
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            g._serialize_seconds = g.get("_serialize_seconds", 0.0) + time.perf_counter() - started
+
+
+class Profiler:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("PROFILE_ENABLED", False)
+        if not self.enabled:
+            return
+        self.header = app.config.get("PROFILE_HEADER", "X-Profile")
+        self.token = app.config.get("PROFILE_TOKEN", "")
+        self.sample_rate = app.config.get("PROFILE_SAMPLE_RATE", 0.0)
+        self.directory = app.config.get("PROFILE_DIR", "profiles")
+        os.makedirs(self.directory, exist_ok=True)
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _wants_profile(self):
+        value = request.headers.get(self.header)
+        if value is not None and (not self.token or value == self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _before_request(self):
+        g._timing_started = time.perf_counter()
+        command_recorder.start()
+        g._timing_recording = True
+        if self._wants_profile():
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # another profiler already active on this thread
+                return None
+            g._profile = profile
+        return None
+
+    def _stop(self):
+        profile = g.pop("_profile", None)
+        if profile is not None:
+            profile.disable()
+        commands = command_recorder.stop() if g.pop("_timing_recording", False) else []
+        return profile, commands
+
+    def _after_request(self, response):
+        if "_timing_started" not in g:
+            return response  # an earlier before_request answered first
+        profile, commands = self._stop()
+        total = time.perf_counter() - g._timing_started
+        db = sum(c["durationMs"] or 0 for c in commands) / 1000.0
+        serialize = g.get("_serialize_seconds", 0.0)
+        app_time = max(0.0, total - db - serialize)
+        response.headers["Server-Timing"] = ", ".join([
+            f'db;dur={db * 1000:.2f};desc="{len(commands)} commands"',
+            f"serialize;dur={serialize * 1000:.2f}",
+            f"app;dur={app_time * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ])
+        if profile is not None:
+            response.headers["X-Profile-Id"] = self._write(profile, commands, response, {
+                "totalMs": round(total * 1000, 3),
+                "dbMs": round(db * 1000, 3),
+                "serializeMs": round(serialize * 1000, 3),
+                "appMs": round(app_time * 1000, 3),
+            })
+        return response
+
+    def _teardown_request(self, exc):
+        # after_request is skipped when the view raised; don't leak the profiler
+        if "_timing_started" in g:
+            self._stop()
+
+    def _write(self, profile, commands, response, timing):
+        request_id = current_request_id() or f"{random.getrandbits(32):08x}"
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{request.endpoint or 'unknown'}-{request_id}"
+        base = os.path.join(self.directory, name)
+        profile.dump_stats(base + ".prof")
+        with open(base + ".json", "w") as fh:
+            json.dump({
+                "requestId": request_id,
+                "method": request.method,
+                "path": request_path(full=True),
+                "endpoint": request.endpoint,
+                "status": response.status_code,
+                "timing": timing,
+                "mongoCommands": commands,
+            }, fh, indent=2, default=str)
+        return name
@@ -0,0 +1,104 @@
+# ranking.py
+"""
+Lexicographic fractional ranks for ordering tasks inside a Kanban column.
+
+A rank is a string over DIGITS (ASCII order, so Mongo's default binary string
+comparison sorts them correctly) read as a base-62 fraction. There is always
+room between two distinct ranks, so moving a card rewrites only that card.
+Ranks never end in '0', otherwise nothing would fit between "x" and "x0".
+"""
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+# Ranks longer than this get their column queued for rebalancing
+RANK_MAX_LENGTH = 16
+
+
+def _digit(rank, i):
+    return DIGITS.index(rank[i])
+
+
+def rank_between(lower=None, upper=None):
+    """A rank strictly between lower and upper (None = open end)."""
+    lower = lower or ""
+    if upper is not None and lower >= upper:
+        raise ValueError("lower rank must sort before upper rank")
+
+    result = []
+    i = 0
+    while True:
+        lo = _digit(lower, i) if i < len(lower) else 0
+        hi = _digit(upper, i) if upper is not None else BASE
+        if lo == hi:
+            result.append(DIGITS[lo])
+            i += 1
+            continue
+        mid = (lo + hi) // 2
+        if mid > lo:
+            result.append(DIGITS[mid])
+            return "".join(result)
+        # hi == lo + 1: keep lo here; from now on anything above `lower` fits
+        result.append(DIGITS[lo])
+        upper = None
+        i += 1
+
+
+def rank_after(rank=None):
+    """
+    A rank after `rank` with nothing else above it (appending to a column).
+    Increments the last digit that is not 'z', so repeated appends keep the
+    same length instead of halving the remaining space each time.
+    """
+    if not rank:
+        return DIGITS[BASE // 2]
+    digits = [DIGITS.index(c) for c in rank]
+    i = len(digits) - 1
+    while i >= 0 and digits[i] == BASE - 1:
+        i -= 1
+    if i < 0:
+        return rank_between(rank, None)
+    digits = digits[:i + 1]
+    digits[i] += 1
+    return "".join(DIGITS[d] for d in digits)
+
+
+def rank_sequence(after=None, width=4):
+    """
+    Ranks for appending many tasks at once: `after` + a fixed-width suffix
+    that never contains '0' (base 61, 61**4 ~ 13.8M ranks per call).
+    """
+    prefix = after or ""
+    usable = DIGITS[1:]
+    n = 1
+    while True:
+        value = n
+        suffix = []
+        for _ in range(width):
+            value, rem = divmod(value, len(usable))
+            suffix.append(usable[rem])
+        if value:
+            raise ValueError("rank_sequence exhausted; rebalance the column")
+        yield prefix + "".join(reversed(suffix))
+        n += 1
+
+
+def spaced_ranks(count):
+    """
+    `count` evenly spaced ranks for rebalancing a column. They use the lower
+    half of the rank space, leaving the upper half free for later appends.
+    """
+    if count <= 0:
+        return []
+    width = 1
+    while BASE ** width < 2 * (count + 1) * BASE:
+        width += 1
+    step = (BASE ** width // 2) // (count + 1)
+    ranks = []
+    for i in range(1, count + 1):
+        value = step * i
+        chars = []
+        for _ in range(width):
+            value, rem = divmod(value, BASE)
+            chars.append(DIGITS[rem])
+        ranks.append("".join(reversed(chars)).rstrip("0"))
+    return ranks
@@ -0,0 +1,237 @@
+# ratelimit.py
+"""
+Token-bucket rate limiting and admission control for the Flask app.
+
+- Every request is charged one token from a bucket keyed by
+  (route budget, user id + client IP, or client IP alone). Empty bucket ->
+  429 + Retry-After. X-User-Id is not authenticated, so a request gets a
+  user bucket only once the id is known to belong to a real user (checked
+  with the `user_exists` callback after a request the IP bucket allowed,
+  then remembered, least recently used first out); made-up ids are charged
+  to the client IP. User buckets include the IP, so claiming someone else's
+  id never drains their bucket, and one IP holds at most max_users_per_ip of
+  them, which caps what rotating ids listed by GET /api/users can gain.
+- Budgets are per endpoint (view function name), e.g. login is strict and
+  reads are loose; anything unlisted falls back to the read/write default.
+- A cap on in-flight requests per worker process sheds load with 503 before
+  every worker thread is tied up. It only binds with threaded workers and a
+  cap below the thread count; the Procfile runs
+      gunicorn server:app --worker-class gthread --workers $WEB_CONCURRENCY --threads $GUNICORN_THREADS
+  (defaults 2 x 16) against the default cap of 12, which leaves each worker
+  4 threads to answer 503s while the rest are busy. Plain sync workers run
+  one request at a time, so there the cap never applies.
+
+Backends:
+    MemoryBackend  per-process buckets (dev, single worker, and the stand-in
+                   the shared backend falls back to if Mongo is unreachable)
+    MongoBackend   buckets shared by all workers/hosts, one atomic
+                   find_one_and_update (pipeline update) per request
+"""
+import math
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+from datetime import datetime, timedelta
+
+from flask import g, jsonify, request
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+# rate: tokens refilled per second, burst: bucket capacity
+Budget = namedtuple("Budget", ["rate", "burst"])
+
+DEFAULT_BUDGETS = {
+    # bcrypt-heavy auth routes: a handful per minute per client
+    "login_user": Budget(rate=5 / 60, burst=5),
+    "create_user": Budget(rate=3 / 60, burst=3),
+    "invite_members": Budget(rate=10 / 60, burst=10),
+    # fallbacks
+    "default_read": Budget(rate=20, burst=60),
+    "default_write": Budget(rate=5, burst=20),
+}
+
+# Routes keyed by client IP even when an X-User-Id header is present
+IP_KEYED_ROUTES = {"login_user", "create_user"}
+
+READ_METHODS = {"GET", "HEAD"}
+
+
+class MemoryBackend:
+    def __init__(self, max_keys=100_000):
+        self._buckets = OrderedDict()  # key -> (tokens, stamp), least recently used first
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def take(self, key, budget):
+        """Returns (allowed, retry_after_seconds)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (budget.burst, now))
+            tokens = min(budget.burst, tokens + (now - stamp) * budget.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # the evicted bucket starts full next time, i.e. its client is forgiven
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / budget.rate
+
+
+class MongoBackend:
+    def __init__(self, collection, fallback=None):
+        self._collection = collection
+        self._fallback = fallback or MemoryBackend()
+        try:
+            collection.create_index("expiresAt", expireAfterSeconds=0)
+        except PyMongoError:
+            pass
+
+    def take(self, key, budget):
+        now = datetime.utcnow()
+        # seconds for an empty bucket to refill, so idle keys expire on their own
+        ttl = timedelta(seconds=math.ceil(budget.burst / budget.rate) + 60)
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$ts", now]}]}, 1000]}
+        refilled = {"$min": [
+            budget.burst,
+            {"$add": [{"$ifNull": ["$tokens", budget.burst]}, {"$multiply": [elapsed, budget.rate]}]},
+        ]}
+        try:
+            doc = self._collection.find_one_and_update(
+                {"_id": key},
+                [
+                    {"$set": {"tokens": refilled, "ts": now, "expiresAt": now + ttl}},
+                    {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                    {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}},
+                ],
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except PyMongoError:
+            return self._fallback.take(key, budget)
+        if doc["allowed"]:
+            return True, 0
+        return False, (1 - doc["tokens"]) / budget.rate
+
+
+class RateLimiter:
+    """
+    Config (app.config):
+        RATE_LIMIT_ENABLED       bool, default True
+        RATE_LIMIT_BUDGETS       dict endpoint -> Budget, merged over DEFAULT_BUDGETS
+        RATE_LIMIT_PROXY_HOPS    trusted reverse proxies in front of the app (Heroku's
+                                 router: 1); the client IP is the X-Forwarded-For
+                                 entry the outermost of them appended. 0 (default)
+                                 uses the socket address
+        MAX_CONCURRENT_REQUESTS  in-flight cap per worker process (keep it below
+                                 gunicorn's --threads), 0 disables
+
+    `user_exists(user_id)` says whether an X-User-Id header names a real
+    user; without it every request is keyed by client IP. max_users_per_ip
+    bounds the user buckets one IP can hold (users behind one NAT share it).
+    """
+
+    def __init__(self, app=None, backend=None, user_exists=None, max_known_users=100_000, max_users_per_ip=20):
+        self.backend = backend or MemoryBackend()
+        self.budgets = dict(DEFAULT_BUDGETS)
+        self.user_exists = user_exists
+        self._known_users = OrderedDict()  # (user id, ip), least recently used first
+        self._users_per_ip = Counter()
+        self._known_lock = threading.Lock()
+        self._max_known_users = max_known_users
+        self._max_users_per_ip = max_users_per_ip
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("RATE_LIMIT_ENABLED", True)
+        self.proxy_hops = app.config.get("RATE_LIMIT_PROXY_HOPS", 0)
+        self.budgets.update(app.config.get("RATE_LIMIT_BUDGETS", {}))
+        max_concurrent = app.config.get("MAX_CONCURRENT_REQUESTS", 0)
+        if max_concurrent:
+            self._slots = threading.BoundedSemaphore(max_concurrent)
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def client_ip(self, remote_addr, forwarded_for):
+        """
+        The address bucketed as the client. Entries left of those our own
+        proxies appended are whatever the client sent, so X-Forwarded-For is
+        read from the right (as werkzeug's ProxyFix(x_for=proxy_hops) does).
+        """
+        if self.proxy_hops and forwarded_for:
+            hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+            if len(hops) >= self.proxy_hops:
+                return hops[-self.proxy_hops]
+        return remote_addr or "unknown"
+
+    def _client_ip(self):
+        return self.client_ip(request.remote_addr, ",".join(request.headers.getlist("X-Forwarded-For")))
+
+    def budget_for(self, endpoint, method):
+        if endpoint in self.budgets:
+            return endpoint, self.budgets[endpoint]
+        name = "default_read" if method in READ_METHODS else "default_write"
+        return name, self.budgets[name]
+
+    def client_key(self, endpoint, user_id, ip):
+        """
+        (bucket client, id to verify): a known user's bucket at this IP, else
+        the IP's plus the claimed user id to check once the request is allowed.
+        """
+        if not user_id or endpoint in IP_KEYED_ROUTES:
+            return f"ip:{ip}", None
+        with self._known_lock:
+            if (user_id, ip) in self._known_users:
+                self._known_users.move_to_end((user_id, ip))
+                return f"user:{user_id}|ip:{ip}", None
+            if self._users_per_ip[ip] >= self._max_users_per_ip:
+                return f"ip:{ip}", None  # this IP has all the user buckets it gets
+        return f"ip:{ip}", user_id
+
+    def verify_user(self, user_id, ip):
+        """Remember `user_id` at `ip` if it names a real user (one lookup per unknown pair)."""
+        if self.user_exists is None or not self.user_exists(user_id):
+            return
+        with self._known_lock:
+            key = (user_id, ip)
+            if key in self._known_users or self._users_per_ip[ip] >= self._max_users_per_ip:
+                return
+            self._known_users[key] = None
+            self._users_per_ip[ip] += 1
+            while len(self._known_users) > self._max_known_users:
+                (_, evicted_ip), _ = self._known_users.popitem(last=False)
+                self._users_per_ip[evicted_ip] -= 1
+                if not self._users_per_ip[evicted_ip]:
+                    del self._users_per_ip[evicted_ip]
+
+    def _before_request(self):
+        if not self.enabled or request.method == "OPTIONS":
+            return None
+
+        if self._slots is not None:
+            if not self._slots.acquire(blocking=False):
+                response = jsonify({"error": "Server is busy, please retry shortly."})
+                response.headers["Retry-After"] = "1"
+                return response, 503
+            g._admission_slot = True
+
+        endpoint = request.endpoint or "unknown"
+        budget_name, budget = self.budget_for(endpoint, request.method)
+        ip = self._client_ip()
+        client, unverified = self.client_key(endpoint, request.headers.get("X-User-Id"), ip)
+
+        allowed, retry_after = self.backend.take(f"{budget_name}|{client}", budget)
+        if not allowed:
+            response = jsonify({"error": "Too many requests, please slow down."})
+            response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+            return response, 429
+        if unverified:
+            self.verify_user(unverified, ip)
+        return None
+
+    def _teardown_request(self, exc):
+        if g.pop("_admission_slot", False):
+            self._slots.release()
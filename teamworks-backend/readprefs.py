@@ -0,0 +1,116 @@
+# readprefs.py
+"""
+Per-route read preferences.
+
+Heavy list/aggregate reads (backlog listings, the user directory, stats,
+exports, search, timelines) can tolerate slightly stale data and are sent to
+secondaries; everything else, in particular any read that must see the
+caller's own write, stays on the primary. Routes opt in by reading through
+the router:
+
+    read_router.collection(backlog_collection).find(...)
+
+which returns the collection with the current endpoint's read preference
+(or the collection itself when the endpoint is not routed). Handles are
+cached, so this costs a dict lookup per call.
+
+A routed read carries maxStalenessSeconds: a secondary lagging further than
+that behind the primary is not eligible (MongoDB requires at least 90s), and
+with the default secondaryPreferred mode the read falls back to the primary
+when no secondary qualifies. Against a standalone server read preferences are
+ignored, so the router is harmless in development.
+
+Config (app.config):
+    READ_PREFERENCE_ENABLED        default False
+    READ_PREFERENCE_MODE           default "secondaryPreferred"
+    READ_MAX_STALENESS_SECONDS     default 90
+    READ_PREFERENCE_ROUTES         {endpoint: "mode" | "mode:staleness"},
+                                   merged over DEFAULT_ROUTES; "primary" opts a
+                                   route back out
+
+`python replset_check.py` verifies the routing against a local replica set.
+"""
+from flask import has_request_context, request
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Endpoints (view function names) served from secondaries by default
+DEFAULT_ROUTES = (
+    "get_project_backlog",
+    "get_users_list",
+    "list_my_project_stats",
+    "export_backlog",
+    "search_project",
+    "get_progress_snapshots",
+    "get_project_timeline",
+    "list_my_tasks",
+)
+
+
+def parse_routes(raw):
+    """'get_users_list=secondary:120,export_backlog=nearest' -> {endpoint: spec}."""
+    routes = {}
+    for part in (raw or "").split(","):
+        endpoint, _, spec = part.strip().partition("=")
+        if endpoint and spec:
+            routes[endpoint.strip()] = spec.strip()
+    return routes
+
+
+def make_read_preference(spec, default_staleness):
+    """'secondary' / 'secondary:120' -> a pymongo read preference."""
+    mode, _, staleness = spec.partition(":")
+    if mode not in MODES:
+        raise ValueError(f"Unknown read preference mode {mode!r} (expected one of {', '.join(MODES)})")
+    if mode == "primary":
+        return Primary()
+    max_staleness = int(staleness) if staleness else default_staleness
+    if max_staleness != -1 and max_staleness < 90:
+        raise ValueError("maxStalenessSeconds must be at least 90 (or -1 for no limit)")
+    return MODES[mode](max_staleness=max_staleness)
+
+
+class ReadPreferenceRouter:
+    def __init__(self, app=None):
+        self.preferences = {}
+        self.handles = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        if not config.get("READ_PREFERENCE_ENABLED", False):
+            return
+        staleness = config.get("READ_MAX_STALENESS_SECONDS", 90)
+        mode = config.get("READ_PREFERENCE_MODE", "secondaryPreferred")
+        routes = {endpoint: mode for endpoint in DEFAULT_ROUTES}
+        routes.update(config.get("READ_PREFERENCE_ROUTES") or {})
+        # validated at startup, so a typo fails the deploy rather than a request
+        self.preferences = {
+            endpoint: make_read_preference(spec, staleness)
+            for endpoint, spec in routes.items()
+            if spec.partition(":")[0] != "primary"
+        }
+
+    def preference_for(self, endpoint):
+        return self.preferences.get(endpoint)
+
+    def collection(self, collection, endpoint=None):
+        """`collection` with the read preference of `endpoint` (default: the current Flask request's)."""
+        if endpoint is None and has_request_context():
+            endpoint = request.endpoint
+        preference = self.preferences.get(endpoint)
+        if preference is None:
+            return collection
+        key = (type(collection), collection.full_name, endpoint)  # sync and async handles differ
+        handle = self.handles.get(key)
+        if handle is None:
+            handle = self.handles[key] = collection.with_options(read_preference=preference)
+        return handle
@@ -0,0 +1,147 @@
+# replset_check.py
+"""
+Checks per-route read preferences (readprefs.py) against a replica set: each
+routed read endpoint must read from a secondary, and read-after-write
+routes and writes must stay on the primary.
+
+Local three-member replica set:
+    for port in 27017 27018 27019; do
+        mkdir -p /tmp/rs0/$port
+        mongod --replSet rs0 --port $port --dbpath /tmp/rs0/$port --bind_ip localhost \\
+               --fork --logpath /tmp/rs0/$port.log
+    done
+    mongosh --port 27017 --eval 'rs.initiate({_id: "rs0", members: [
+        {_id: 0, host: "localhost:27017"}, {_id: 1, host: "localhost:27018"},
+        {_id: 2, host: "localhost:27019"}]})'
+    MONGO_URI="mongodb://localhost:27017,localhost:27018,localhost:27019/teamworks_db?replicaSet=rs0" \\
+        python seed.py --users 50 --projects 10 --tasks 2000 --drop
+
+Usage:
+    python replset_check.py [--uri mongodb://...?replicaSet=rs0] [--email seed.user0@example.com]
+
+Routed endpoints are checked with READ_PREFERENCE_MODE=secondary, so a read
+that silently fell back to the primary shows up as a failure. Every command
+a request issues is attributed to a member through dbmetrics.command_recorder.
+Exits non-zero if any check fails.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_URI = "mongodb://localhost:27017,localhost:27018,localhost:27019/teamworks_db?replicaSet=rs0"
+READ_COMMANDS = {"find", "aggregate", "getMore", "count", "distinct"}
+
+
+def _configure(uri):
+    # model.py and server.py read these at import time
+    os.environ["MONGO_URI"] = uri
+    os.environ["READ_PREFERENCE_ENABLED"] = "true"
+    os.environ["READ_PREFERENCE_MODE"] = "secondary"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["LOG_ACCESS"] = "false"
+    os.environ["LOG_LEVEL"] = "WARNING"
+    os.environ["ACTIVITY_ENABLED"] = "false"
+
+
+def _wait_for_members(client, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if client.primary and client.secondaries:
+            return
+        time.sleep(0.25)
+    raise SystemExit("no primary + secondary discovered; is MONGO_URI a replica set?")
+
+
+def _print_lag(client):
+    status = client.admin.command("replSetGetStatus")
+    primary = next((m for m in status["members"] if m["stateStr"] == "PRIMARY"), None)
+    for member in status["members"]:
+        lag = ""
+        if primary and member is not primary and member.get("optimeDate"):
+            lag = f"  lag {(primary['optimeDate'] - member['optimeDate']).total_seconds():.1f}s"
+        print(f"  {member['name']:24} {member['stateStr']}{lag}")
+
+
+def _cases(project_id, task_id, title_word):
+    today = datetime.utcnow().date()
+    window = f"from={(today - timedelta(days=60)).isoformat()}&to={(today + timedelta(days=60)).isoformat()}"
+    backlog = f"/api/projects/{project_id}/backlog"
+    return [
+        # (endpoint, method, path, body, expected member for reads)
+        ("get_project_backlog", "GET", backlog, None, "secondary"),
+        ("get_users_list", "GET", "/api/users", None, "secondary"),
+        ("list_my_project_stats", "GET", "/api/users/me/project-stats", None, "secondary"),
+        ("export_backlog", "GET", f"{backlog}/export?format=ndjson", None, "secondary"),
+        ("search_project", "GET", f"/api/projects/{project_id}/search?q={title_word}", None, "secondary"),
+        ("get_progress_snapshots", "GET", f"/api/projects/{project_id}/snapshots", None, "secondary"),
+        ("get_project_timeline", "GET", f"/api/projects/{project_id}/timeline?{window}", None, "secondary"),
+        ("list_my_tasks", "GET", "/api/users/me/tasks", None, "secondary"),
+        ("get_project", "GET", f"/api/project/{project_id}", None, "primary"),
+        ("get_project_bootstrap", "GET", f"/api/projects/{project_id}/bootstrap", None, "primary"),
+        ("get_comments", "GET", f"{backlog}/{task_id}/comments", None, "primary"),
+        ("update_task", "PUT", f"{backlog}/{task_id}", {"progress": 0}, "primary"),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify per-route read preferences on a replica set.")
+    parser.add_argument("--uri", default=os.getenv("MONGO_URI", DEFAULT_URI))
+    parser.add_argument("--email", default="seed.user0@example.com")
+    args = parser.parse_args()
+    if "replicaSet=" not in args.uri:
+        raise SystemExit("--uri must name the replica set (...?replicaSet=rs0)")
+    _configure(args.uri)
+
+    from dbmetrics import command_recorder
+    from model import backlog_collection, client, get_projects_collection, get_users_collection
+    from server import app, read_router
+
+    _wait_for_members(client)
+    print("members:")
+    _print_lag(client)
+    primary = "%s:%s" % client.primary
+    secondaries = {"%s:%s" % member for member in client.secondaries}
+
+    user = get_users_collection().find_one({"email": args.email}, {"_id": 1})
+    if not user:
+        raise SystemExit(f"no user {args.email}; run seed.py first")
+    project = get_projects_collection().find_one({"members": user["_id"]}, {"_id": 1})
+    task = project and backlog_collection.find_one({"projectId": project["_id"]}, {"title": 1})
+    if not task:
+        raise SystemExit(f"{args.email} has no project with tasks; run seed.py first")
+    title_word = (task.get("title") or "task").split()[0]
+    # let the secondaries catch up with the seed before reading from them
+    time.sleep(2)
+
+    test_client = app.test_client()
+    headers = {"X-User-Id": str(user["_id"])}
+    failures = 0
+    print(f"\n{'endpoint':24} {'status':>6} {'primary':>8} {'second.':>8}  expected   result")
+    for endpoint, method, path, body, expected in _cases(project["_id"], task["_id"], title_word):
+        command_recorder.start()
+        try:
+            response = test_client.open(path, method=method, headers=headers, json=body)
+            response.get_data()  # drain streamed bodies inside the recording
+        finally:
+            commands = command_recorder.stop()
+        reads = [c for c in commands if c["name"] in READ_COMMANDS]
+        on_primary = sum(1 for c in reads if c["server"] == primary)
+        on_secondary = sum(1 for c in reads if c["server"] in secondaries)
+        if expected == "secondary":
+            # the membership check in require_project_member stays on the primary
+            ok = on_secondary > 0 and read_router.preference_for(endpoint) is not None
+        else:
+            ok = on_secondary == 0
+        ok = ok and response.status_code < 400
+        failures += not ok
+        print(f"{endpoint:24} {response.status_code:>6} {on_primary:>8} {on_secondary:>8}  {expected:9}  "
+              f"{'ok' if ok else 'FAIL'}")
+
+    print(f"\n{failures} failure(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# seed.py
+"""
+Synthetic data generator for scale testing.
+
+Usage:
+    python seed.py --users 10000 --projects 2000 --tasks 100000 [--drop] [--seed 42]
+
+Writes realistic users, projects (owner + members), tasks with dependency
+DAGs, comments and notifications into the database from MONGO_URI using
+insert_many batches, then rebuilds project stats. Every seeded user's
+password is SEED_PASSWORD. --drop clears the collections first and refuses
+to run against a non-local MONGO_URI unless --yes is given.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import bcrypt
+from bson import ObjectId
+
+from fields import member_profile
+from model import (
+    MONGO_URI, backlog_collection, get_comments_collection, get_notifications_collection,
+    get_projects_collection, get_stats_collection, get_users_collection,
+)
+from ranking import rank_sequence
+from server import DONE_STATUSES, rebuild_project_stats
+
+SEED_PASSWORD = "password123"
+INSERT_BATCH = 5000
+
+FIRST_NAMES = ["Ava", "Ben", "Chloe", "Dev", "Elif", "Farah", "Gus", "Hana", "Ivan", "Jia",
+               "Kofi", "Lena", "Mateo", "Nia", "Omar", "Priya", "Quinn", "Rosa", "Sam", "Tariq"]
+LAST_NAMES = ["Ahmed", "Brown", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Hughes", "Ito",
+              "Jones", "Kim", "Lopez", "Manalo", "Nguyen", "Okafor", "Patel", "Rossi", "Singh"]
+STATUSES = ["To Do", "In Progress", "Done"]
+STATUS_WEIGHTS = [5, 3, 4]
+PRIORITIES = ["Low", "Medium", "High"]
+LABELS = ["frontend", "backend", "bug", "feature", "docs", "design", "infra", "research"]
+WORDS = ["login", "dashboard", "calendar", "invite", "search", "export", "import", "profile",
+         "kanban", "gantt", "notification", "comment", "api", "schema", "index", "cache",
+         "deploy", "review", "refactor", "layout", "mobile", "email", "report", "onboarding"]
+
+
+def _sentence(rng, low, high):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize()
+
+
+def _insert_batched(collection, docs):
+    for start in range(0, len(docs), INSERT_BATCH):
+        collection.insert_many(docs[start:start + INSERT_BATCH], ordered=False)
+
+
+def seed(users, projects, tasks, comments_per_task, notifications_per_user, rng):
+    now = datetime.utcnow()
+    today = datetime(now.year, now.month, now.day)
+    password = bcrypt.hashpw(SEED_PASSWORD.encode("utf-8"), bcrypt.gensalt())  # hash once, reuse
+
+    user_docs = []
+    for i in range(users):
+        user_docs.append({
+            "_id": ObjectId(),
+            "firstName": rng.choice(FIRST_NAMES),
+            "lastName": rng.choice(LAST_NAMES),
+            "email": f"seed.user{i}@example.com",
+            "password": password,
+        })
+    _insert_batched(get_users_collection(), user_docs)
+    user_ids = [u["_id"] for u in user_docs]
+    users_by_id = {u["_id"]: u for u in user_docs}
+    print(f"users: {len(user_docs)}")
+
+    project_docs = []
+    for i in range(projects):
+        team = rng.sample(user_ids, min(len(user_ids), rng.randint(3, 15)))
+        created = now - timedelta(days=rng.randint(1, 720))
+        project_docs.append({
+            "_id": ObjectId(),
+            "name": f"{_sentence(rng, 1, 3)} {i}",
+            "description": _sentence(rng, 5, 15),
+            "createdBy": team[0],
+            "owner": team[0],
+            "members": team,
+            "memberProfiles": [member_profile(users_by_id[m]) for m in team],
+            "pendingInvites": [],
+            "status": "Completed" if rng.random() < 0.2 else "Active",
+            "createdAt": created,
+            "updatedAt": created + timedelta(days=rng.randint(0, 30)),
+        })
+    _insert_batched(get_projects_collection(), project_docs)
+    print(f"projects: {len(project_docs)}")
+
+    # Skewed task distribution: a few big projects, a long tail of small ones
+    weights = [1.0 / (rank + 1) for rank in range(len(project_docs))]
+    task_docs = []
+    tasks_by_project = {}
+    ranks = {}
+    for project in rng.choices(project_docs, weights=weights, k=tasks):
+        earlier = tasks_by_project.setdefault(project["_id"], [])
+        start = today + timedelta(days=rng.randint(-120, 90))
+        status = rng.choices(STATUSES, weights=STATUS_WEIGHTS)[0]
+        column = (project["_id"], status)
+        if column not in ranks:
+            ranks[column] = rank_sequence()
+        # dependencies only point at earlier tasks of the same project -> always a DAG
+        deps = rng.sample(earlier[-50:], min(len(earlier[-50:]), rng.choice([0, 0, 1, 1, 2, 3])))
+        task = {
+            "_id": ObjectId(),
+            "title": _sentence(rng, 2, 6),
+            "description": _sentence(rng, 8, 30),
+            "label": rng.choice(LABELS),
+            "status": status,
+            "priority": rng.choice(PRIORITIES),
+            "assignedTo": rng.choice(project["members"]),
+            "startDate": start,
+            "dueDate": start + timedelta(days=rng.randint(1, 30)),
+            "progress": 100 if status in DONE_STATUSES else rng.choice([0, 10, 25, 50, 75, 90]),
+            "dependencies": deps,
+            "rank": next(ranks[column]),
+            "version": 1,
+            "createdAt": start,
+            "updatedAt": start,
+            "projectId": project["_id"],
+        }
+        earlier.append(task["_id"])
+        task_docs.append(task)
+    _insert_batched(backlog_collection, task_docs)
+    print(f"tasks: {len(task_docs)}")
+
+    names = {u["_id"]: f'{u["firstName"]} {u["lastName"]}' for u in user_docs}
+    other_authors = list(names.values())[:100]
+    comment_docs = []
+    for task in task_docs:
+        for _ in range(rng.randint(0, comments_per_task * 2)):
+            comment_docs.append({
+                "taskId": task["_id"],
+                "projectId": task["projectId"],
+                "author": names[task["assignedTo"]] if rng.random() < 0.5 else rng.choice(other_authors),
+                "text": _sentence(rng, 4, 20),
+                "timestamp": task["createdAt"] + timedelta(hours=rng.randint(1, 200)),
+            })
+    _insert_batched(get_comments_collection(), comment_docs)
+    print(f"comments: {len(comment_docs)}")
+
+    notification_docs = []
+    for user_id in user_ids:
+        for _ in range(rng.randint(0, notifications_per_user * 2)):
+            project = rng.choice(project_docs)
+            notification_docs.append({
+                "userId": user_id,
+                "projectId": project["_id"],
+                "type": "invite-response",
+                "message": f'{rng.choice(FIRST_NAMES)} accepted your invitation to "{project["name"]}".',
+                "createdAt": now - timedelta(minutes=rng.randint(1, 60 * 24 * 60)),
+                "isRead": rng.random() < 0.6,
+            })
+    _insert_batched(get_notifications_collection(), notification_docs)
+    print(f"notifications: {len(notification_docs)}")
+
+    rebuild_project_stats()
+    print("project stats rebuilt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed Teamworks with synthetic data.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--comments-per-task", type=int, default=2, help="average")
+    parser.add_argument("--notifications-per-user", type=int, default=5, help="average")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", action="store_true", help="clear the seeded collections first")
+    parser.add_argument("--yes", action="store_true", help="allow --drop on a non-local MONGO_URI")
+    args = parser.parse_args()
+
+    if args.drop:
+        if not ("localhost" in MONGO_URI or "127.0.0.1" in MONGO_URI) and not args.yes:
+            sys.exit("Refusing to --drop a non-local database without --yes")
+        for collection in (get_users_collection(), get_projects_collection(), backlog_collection,
+                           get_comments_collection(), get_notifications_collection(), get_stats_collection()):
+            collection.delete_many({})
+
+    started = time.perf_counter()
+    seed(args.users, args.projects, args.tasks, args.comments_per_task,
+         args.notifications_per_user, random.Random(args.seed))
+    print(f"done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
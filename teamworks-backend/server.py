@@ -1,13 +1,40 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from flask_mail import Mail, Message
 from model import get_users_collection, get_comments_collection, get_projects_collection, get_notifications_collection
+from model import get_stats_collection, get_rate_limits_collection, get_rank_rebalance_collection
+from model import get_archived_projects_collection, get_archived_backlog_collection, get_archived_comments_collection
+from model import get_snapshots_collection, get_activity_collection, get_activity_counters_collection
+from model import get_attachments_bucket, get_attachments_collection, check_connection
+from ranking import RANK_MAX_LENGTH, rank_after, rank_between, rank_sequence, spaced_ranks
+from ratelimit import RateLimiter, MemoryBackend, MongoBackend
+from logconfig import init_logging
+from profiler import Profiler
+from compression import Compressor
+from calendar_feed import FeedCache, render_calendar
+from fields import MEMBER_PROFILE_PROJECTION, as_iso_date, member_profile, parse_if_match, parse_iso_date, to_bson_date
+from activity import ActivityLog
+from readprefs import ReadPreferenceRouter, parse_routes
 from model import backlog_collection
+from model import COMMENT_TEXT_WEIGHTS, TASK_TEXT_WEIGHTS
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from gridfs.errors import NoFile
+from werkzeug.datastructures import ContentRange
+from urllib.parse import quote
 import bcrypt
 from bson import ObjectId
-from datetime import datetime
+from bson.errors import InvalidId
+from datetime import datetime, timedelta, timezone
 from functools import wraps
+import codecs
+import csv
+import hashlib
+import io
+import json
 import os
+import secrets
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -20,8 +47,35 @@ CORS(
     app,
     origins=[FRONTEND_URL, "http://localhost:3000"],  # keep localhost for dev if you want
     supports_credentials=True,
+    expose_headers=[
+        "ETag", "X-Request-Id", "Server-Timing", "X-Profile-Id",
+        "Accept-Ranges", "Content-Range", "Content-Disposition",
+    ],
 )
 
+# Logging (see logconfig.py)
+app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO').upper()
+app.config['LOG_FORMAT'] = os.getenv('LOG_FORMAT', 'json')
+app.config['LOG_INFO_SAMPLE_RATE'] = float(os.getenv('LOG_INFO_SAMPLE_RATE', 1.0))
+app.config['LOG_SAMPLED_LOGGERS'] = os.getenv('LOG_SAMPLED_LOGGERS', 'teamworks.access').split(',')
+app.config['LOG_ACCESS'] = os.getenv('LOG_ACCESS', 'True').lower() == 'true'
+init_logging(app)
+check_connection()
+
+# Opt-in profiling + Server-Timing (see profiler.py); registered before the
+# rate limiter so throttled requests are timed too
+app.config['PROFILE_ENABLED'] = os.getenv('PROFILE_ENABLED', 'False').lower() == 'true'
+app.config['PROFILE_HEADER'] = os.getenv('PROFILE_HEADER', 'X-Profile')
+app.config['PROFILE_TOKEN'] = os.getenv('PROFILE_TOKEN', '')
+app.config['PROFILE_SAMPLE_RATE'] = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+app.config['PROFILE_DIR'] = os.getenv('PROFILE_DIR', 'profiles')
+profiler = Profiler(app)
+
+# gzip / br response compression (see compression.py)
+app.config['COMPRESS_ENABLED'] = os.getenv('COMPRESS_ENABLED', 'True').lower() == 'true'
+app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+compressor = Compressor(app)
+
 # Email configuration
 app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
 app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
@@ -32,8 +86,66 @@ app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD', '')
 app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', app.config['MAIL_USERNAME'])
 app.config['FRONTEND_URL'] = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 
+# Due-date reminders (python jobs.py due-reminders)
+app.config['REMINDER_WINDOW_DAYS'] = int(os.getenv('REMINDER_WINDOW_DAYS', 1))
+app.config['REMINDER_OVERDUE_LOOKBACK_DAYS'] = int(os.getenv('REMINDER_OVERDUE_LOOKBACK_DAYS', 7))
+app.config['REMINDER_EMAILS'] = os.getenv('REMINDER_EMAILS', 'False').lower() == 'true'
+
+# Completed projects untouched for this many days move to the archive collections
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 30))
+
+# ICS feeds include tasks due at most this many days ago
+app.config['CALENDAR_PAST_DAYS'] = int(os.getenv('CALENDAR_PAST_DAYS', 90))
+
+# Project activity log, written behind in batches (see activity.py)
+app.config['ACTIVITY_ENABLED'] = os.getenv('ACTIVITY_ENABLED', 'True').lower() == 'true'
+app.config['ACTIVITY_FLUSH_INTERVAL'] = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', 0.5))
+app.config['ACTIVITY_FLUSH_SIZE'] = int(os.getenv('ACTIVITY_FLUSH_SIZE', 200))
+# Long-poll limits: a wait holds a worker here, only a coroutine in server_async.py
+app.config['ACTIVITY_MAX_WAIT'] = int(os.getenv('ACTIVITY_MAX_WAIT', 25))
+app.config['ACTIVITY_SYNC_MAX_WAIT'] = int(os.getenv('ACTIVITY_SYNC_MAX_WAIT', 0))
+app.config['ACTIVITY_POLL_INTERVAL'] = float(os.getenv('ACTIVITY_POLL_INTERVAL', 1.0))
+app.config['ACTIVITY_GAP_SECONDS'] = int(os.getenv('ACTIVITY_GAP_SECONDS', 10))
+activity_log = ActivityLog(app, get_activity_collection(), get_activity_counters_collection())
+
+# Heavy list/aggregate reads go to replica-set secondaries (see readprefs.py)
+app.config['READ_PREFERENCE_ENABLED'] = os.getenv('READ_PREFERENCE_ENABLED', 'False').lower() == 'true'
+app.config['READ_PREFERENCE_MODE'] = os.getenv('READ_PREFERENCE_MODE', 'secondaryPreferred')
+app.config['READ_MAX_STALENESS_SECONDS'] = int(os.getenv('READ_MAX_STALENESS_SECONDS', 90))
+app.config['READ_PREFERENCE_ROUTES'] = parse_routes(os.getenv('READ_PREFERENCE_ROUTES', ''))
+read_router = ReadPreferenceRouter(app)
+
+# Task attachments (GridFS): per-file size limit and per-project quota, in bytes
+app.config['ATTACHMENT_MAX_BYTES'] = int(os.getenv('ATTACHMENT_MAX_BYTES', 25 * 1024 * 1024))
+app.config['ATTACHMENT_PROJECT_QUOTA_BYTES'] = int(os.getenv('ATTACHMENT_PROJECT_QUOTA_BYTES', 1024 ** 3))
+
 mail = Mail(app)
 
+# Rate limiting / admission control
+app.config['RATE_LIMIT_ENABLED'] = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+app.config['RATE_LIMIT_BACKEND'] = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # 'memory' or 'mongo'
+# Reverse proxies in front of the app whose X-Forwarded-For entries are trusted (Heroku: 1)
+app.config['RATE_LIMIT_PROXY_HOPS'] = int(os.getenv('RATE_LIMIT_PROXY_HOPS', 0))
+# Per worker process; keep below the Procfile's gunicorn --threads (16)
+app.config['MAX_CONCURRENT_REQUESTS'] = int(os.getenv('MAX_CONCURRENT_REQUESTS', 12))
+
+
+def _user_exists(user_id):
+    """Rate-limit keying: does an X-User-Id header name a real user?"""
+    try:
+        user_oid = ObjectId(user_id)
+    except InvalidId:
+        return False
+    return get_users_collection().find_one({"_id": user_oid}, {"_id": 1}) is not None
+
+
+rate_limiter = RateLimiter(
+    app,
+    backend=MongoBackend(get_rate_limits_collection())
+    if app.config['RATE_LIMIT_BACKEND'] == 'mongo' else MemoryBackend(),
+    user_exists=_user_exists,
+)
+
 @app.route('/')
 def home():
     return jsonify({"message": "Welcome to Teamworks!"})
@@ -101,53 +213,92 @@ def require_project_member(fn):
 @app.route('/api/projects', methods=['POST'])
 def create_project():
     data = request.json
+    creator = get_users_collection().find_one(
+        {"_id": ObjectId(data["createdBy"])}, MEMBER_PROFILE_PROJECTION
+    ) or {"_id": ObjectId(data["createdBy"])}
     project = {
         "name": data["name"],
         "description": data.get("description", ""),
         "createdBy": ObjectId(data["createdBy"]),
         "owner": ObjectId(data["createdBy"]),  
         "members": [ObjectId(data["createdBy"])],
+        "memberProfiles": [member_profile(creator)],
         "pendingInvites": [],
         "status": "Active",
         "createdAt": datetime.now(),
         "updatedAt": datetime.now(),
     }
     result = get_projects_collection().insert_one(project)
+    get_stats_collection().insert_one(_empty_project_stats(result.inserted_id, member_count=1))
+    activity_log.record(result.inserted_id, "project.created", actor=project["createdBy"], name=project["name"])
     return jsonify({"message": "Project created", "id": str(result.inserted_id)}), 201 
 
 
 @app.route('/api/projects/<user_id>', methods=['GET'])
 def list_user_projects(user_id):
-    projects = []
-    for p in get_projects_collection().find({"members": ObjectId(user_id)}):
-        projects.append({
-            "id": str(p["_id"]),
-            "name": p["name"],
-            "description": p.get("description", ""),
-            "createdBy": str(p["createdBy"]),
-            "owner": str(p["owner"]) if p.get("owner") else None, 
-            "members": [str(member) for member in p["members"]],
-            "createdAt": p["createdAt"].isoformat() if isinstance(p["createdAt"], datetime) else str(p["createdAt"]),
-            "updatedAt": p["updatedAt"].isoformat() if isinstance(p["updatedAt"], datetime) else str(p["updatedAt"]),
-            "status": p.get("status", "Active"),
-        })
+    projects = [serialize_user_project(p) for p in get_projects_collection().find({"members": ObjectId(user_id)})]
     return jsonify(projects)
 
+
+def serialize_user_project(p):
+    return {
+        "id": str(p["_id"]),
+        "name": p["name"],
+        "description": p.get("description", ""),
+        "createdBy": str(p["createdBy"]),
+        "owner": str(p["owner"]) if p.get("owner") else None,
+        "members": [str(member) for member in p["members"]],
+        "memberProfiles": [_serialize_member(m) for m in p.get("memberProfiles", [])],
+        "createdAt": p["createdAt"].isoformat() if isinstance(p["createdAt"], datetime) else str(p["createdAt"]),
+        "updatedAt": p["updatedAt"].isoformat() if isinstance(p["updatedAt"], datetime) else str(p["updatedAt"]),
+        "status": p.get("status", "Active"),
+    }
+
 @app.route('/api/project/<project_id>', methods=['GET'])
 @require_project_member
 def get_project(project_id):
     p = get_projects_collection().find_one({"_id": ObjectId(project_id)})
     if not p:
         return jsonify({"error": "Project not found"}), 404
-    return jsonify({
+    return jsonify(serialize_project(p))
+
+
+def serialize_project(p):
+    return {
         "id": str(p["_id"]),
         "name": p.get("name", ""),
         "description": p.get("description", ""),
         "createdBy": str(p.get("createdBy")) if p.get("createdBy") else None,
         "owner": str(p.get("owner")) if p.get("owner") else None,
         "members": [str(m) for m in p.get("members", [])],
+        "memberProfiles": [_serialize_member(m) for m in p.get("memberProfiles", [])],
         "status": p.get("status", "Active"),
-    })
+    }
+
+
+# -------------------- MEMBER PROFILES --------------------
+# Projects embed `memberProfiles: [{_id, name, email}]` next to `members`, so
+# project pages render names without fetching the user directory. Every
+# membership change writes both arrays in the same update; a name/email change
+# fans out to the user's projects (see update_user_profile).
+# `python migrate.py member-profiles` backfills projects created before this.
+
+def _serialize_member(profile):
+    return {
+        "id": str(profile["_id"]),
+        "email": profile.get("email", ""),
+        "name": profile.get("name", ""),
+    }
+
+
+def _refresh_member_profile(project_filter, user, collection=None):
+    """Rewrite `user`'s embedded profile on the matching projects that carry one."""
+    collection = collection if collection is not None else get_projects_collection()
+    return collection.update_many(
+        {**project_filter, "memberProfiles._id": user["_id"]},
+        {"$set": {"memberProfiles.$[m]": member_profile(user)}},
+        array_filters=[{"m._id": user["_id"]}],
+    ).modified_count
 
 
 # -------------------- LEAVE PROJECT (member) --------------------
@@ -181,7 +332,7 @@ def leave_project(project_id):
     result = projects.update_one(
         {"_id": ObjectId(project_id)},
         {
-            "$pull": {"members": user_id},
+            "$pull": {"members": user_id, "memberProfiles": {"_id": user_id}},
             "$set": {"updatedAt": datetime.utcnow()}
         }
     )
@@ -189,6 +340,8 @@ def leave_project(project_id):
     if result.modified_count == 0:
         return jsonify({"error": "You are not a member of this project"}), 400
 
+    _apply_member_count(project_id, -1)
+    _activity(project_id, "member.left")
     return jsonify({"message": "You have left the project."}), 200
 
 # -------------------- REMOVE PROJECT MEMBER (by owner) --------------------
@@ -225,7 +378,7 @@ def remove_member(project_id, member_id):
     result = projects.update_one(
         {"_id": ObjectId(project_id)},
         {
-            "$pull": {"members": member_oid},
+            "$pull": {"members": member_oid, "memberProfiles": {"_id": member_oid}},
             "$set": {"updatedAt": datetime.utcnow()}
         }
     )
@@ -233,6 +386,8 @@ def remove_member(project_id, member_id):
     if result.modified_count == 0:
         return jsonify({"error": "Member not removed"}), 400
 
+    _apply_member_count(project_id, -1)
+    _activity(project_id, "member.removed", memberId=member_id)
     return jsonify({"message": "Member removed from project."}), 200
 
 # -------------------- Owner/auth helpers--------------------
@@ -270,9 +425,33 @@ def require_project_owner(fn):
 
     return wrapper
 
+def restore_archived_on_reopen(fn):
+    """
+    Reopening (status -> Active) an archived project restores it into the hot
+    collections first, so the owner check and the status update see it as usual.
+    """
+    @wraps(fn)
+    def wrapper(project_id, *args, **kwargs):
+        data = request.get_json(silent=True) or {}
+        if (data.get("status") or "").strip() == "Active":
+            user_id = get_request_user_id()
+            try:
+                project_oid = ObjectId(project_id)
+            except Exception:
+                return jsonify({"error": "Invalid project ID"}), 400
+            archived = get_archived_projects_collection().find_one(
+                {"_id": project_oid}, {"owner": 1}
+            )
+            if archived and user_id and str(archived.get("owner")) == str(user_id):
+                restore_project(project_oid)
+        return fn(project_id, *args, **kwargs)
+
+    return wrapper
+
 # --------------------  ---------------------
 
 @app.route("/api/projects/<project_id>/status", methods=["PATCH"])
+@restore_archived_on_reopen
 @require_project_owner
 def update_project_status(project_id):
     data = request.json or {}
@@ -286,6 +465,7 @@ def update_project_status(project_id):
     )
     if res.matched_count == 0:
         return jsonify({"error": "Project not found"}), 404
+    _activity(project_id, "project.status", status=new_status)
     return jsonify({"message": "Status updated", "status": new_status}), 200
 
 # -------------------- PROJECT INVITE ---------------------
@@ -323,26 +503,29 @@ def list_invitations():
     if not email:
         return jsonify({"error": "User has no email on file"}), 400
 
-    cursor = get_projects_collection().find(
-        {"pendingInvites.email": email},
-        {"name": 1, "pendingInvites": 1, "owner": 1}
-    )
+    cursor = get_projects_collection().find({"pendingInvites.email": email}, INVITATION_PROJECTION)
 
-    results = []
-    for p in cursor:
-        for inv in p.get("pendingInvites", []):
-            if (inv.get("email") or "").lower() == email:
-                results.append({
-                    "projectId": str(p["_id"]),
-                    "projectName": p.get("name", ""),
-                    "invitedAt": inv.get("invitedAt").isoformat() if isinstance(inv.get("invitedAt"), datetime) else str(inv.get("invitedAt", "")),
-                    "invitedBy": str(inv.get("invitedBy")) if inv.get("invitedBy") else None,
-                    "ownerId": str(p.get("owner")) if p.get("owner") else None
-                })
-                break
+    results = [inv for inv in (serialize_invitation(p, email) for p in cursor) if inv]
     return jsonify(results), 200
 
 
+INVITATION_PROJECTION = {"name": 1, "pendingInvites": 1, "owner": 1}
+
+
+def serialize_invitation(p, email):
+    """The pending invite for `email` on project p, or None."""
+    for inv in p.get("pendingInvites", []):
+        if (inv.get("email") or "").lower() == email:
+            return {
+                "projectId": str(p["_id"]),
+                "projectName": p.get("name", ""),
+                "invitedAt": inv.get("invitedAt").isoformat() if isinstance(inv.get("invitedAt"), datetime) else str(inv.get("invitedAt", "")),
+                "invitedBy": str(inv.get("invitedBy")) if inv.get("invitedBy") else None,
+                "ownerId": str(p.get("owner")) if p.get("owner") else None
+            }
+    return None
+
+
 @app.route("/api/invitations/respond", methods=["POST"])
 def respond_invitation():
     """
@@ -368,7 +551,7 @@ def respond_invitation():
     projects = get_projects_collection()
     proj = projects.find_one(
         {"_id": ObjectId(project_id), "pendingInvites.email": email},
-        {"owner": 1, "name": 1, "pendingInvites": 1}
+        {"owner": 1, "name": 1, "pendingInvites": 1, "members": 1}
     )
     if not proj:
         return jsonify({"error": "Invite not found"}), 404
@@ -379,13 +562,20 @@ def respond_invitation():
     }
 
     if action == "accept":
-        projects.update_one(
-            {"_id": ObjectId(project_id)},
-            { "$addToSet": {"members": user_id}, **pull_invite }
+        # members and memberProfiles only grow together, and only once
+        added = projects.update_one(
+            {"_id": ObjectId(project_id), "members": {"$ne": user_id}},
+            {"$push": {"members": user_id, "memberProfiles": member_profile(udoc)}, **pull_invite}
         )
+        if added.modified_count:
+            _apply_member_count(project_id, 1)
+            _activity(project_id, "member.joined")
+        else:
+            projects.update_one({"_id": ObjectId(project_id)}, pull_invite)
         status_text = "accepted"
     else:
         projects.update_one({"_id": ObjectId(project_id)}, pull_invite)
+        _activity(project_id, "invite.declined")
         status_text = "declined"
 
     # Notify owner
@@ -414,19 +604,22 @@ def list_notifications():
     cur = get_notifications_collection().find(
         {"userId": user_id}
     ).sort("createdAt", -1)
-    out = []
-    for n in cur:
-        out.append({
-            "id": str(n["_id"]),
-            "projectId": str(n.get("projectId")) if n.get("projectId") else None,
-            "type": n.get("type"),
-            "message": n.get("message", ""),
-            "isRead": bool(n.get("isRead", False)),
-            "createdAt": n.get("createdAt").isoformat() if isinstance(n.get("createdAt"), datetime) else str(n.get("createdAt",""))
-        })
+    out = [serialize_notification(n) for n in cur]
     return jsonify(out), 200
 
 
+def serialize_notification(n):
+    return {
+        "id": str(n["_id"]),
+        "projectId": str(n.get("projectId")) if n.get("projectId") else None,
+        "type": n.get("type"),
+        "taskId": str(n.get("taskId")) if n.get("taskId") else None,
+        "message": n.get("message", ""),
+        "isRead": bool(n.get("isRead", False)),
+        "createdAt": n.get("createdAt").isoformat() if isinstance(n.get("createdAt"), datetime) else str(n.get("createdAt",""))
+    }
+
+
 @app.route("/api/notifications/<nid>/read", methods=["PATCH"])
 def mark_notification_read(nid):
     user_id = get_request_user_id()
@@ -440,6 +633,406 @@ def mark_notification_read(nid):
     return jsonify({"message": "Marked read"}), 200
 
 
+# -------------------- ACTIVITY FEED --------------------
+# Write routes append compact events to the capped `project_activity`
+# collection through `activity_log` (buffered, see activity.py). Clients page
+# back through history, then keep in sync with a `since` cursor; both cursors
+# are the per-project `seq` numbers assigned at flush.
+
+ACTIVITY_PAGE_SIZE = 50
+
+
+def _activity(project_id, kind, task_id=None, **data):
+    """Record an event by the requesting user."""
+    activity_log.record(project_id, kind, actor=get_request_user_id(), task_id=task_id, **data)
+
+
+def task_change_summary(before, update):
+    """Names of the fields an update changed, plus the new status when it moved."""
+    changed = sorted(
+        key for key, value in update.items()
+        if key not in ("updatedAt", "version", "rank") and before.get(key) != value
+    )
+    summary = {"fields": changed, "title": update.get("title", before.get("title", ""))}
+    if "status" in changed:
+        summary["status"] = update["status"]
+    return summary
+
+
+def serialize_activity(event):
+    return {
+        "id": str(event["_id"]),
+        "seq": event.get("seq"),
+        "type": event.get("type"),
+        "projectId": str(event["projectId"]),
+        "taskId": str(event["taskId"]) if event.get("taskId") else None,
+        "actor": str(event["actor"]) if event.get("actor") else None,
+        "at": event["at"].isoformat() if isinstance(event.get("at"), datetime) else None,
+        "data": event.get("data", {}),
+    }
+
+
+def settled_activity(events, since, now=None):
+    """
+    The leading run of `events` (ascending seq, all after `since`) that a
+    sync read may return. It stops at a hole in the sequence: a block another
+    worker has reserved but not written yet, which would be skipped for good
+    once the cursor moved past it. A hole in front of an event older than
+    ACTIVITY_GAP_SECONDS is a lost write (or capped roll-off) and is passed.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=app.config['ACTIVITY_GAP_SECONDS'])
+    settled = []
+    expected = since + 1
+    for event in events:
+        if event["seq"] != expected and event["_id"].generation_time > cutoff:
+            break
+        settled.append(event)
+        expected = event["seq"] + 1
+    return settled
+
+
+def _poll_activity(project_oid, since, limit, wait_seconds):
+    """
+    Events after `since`, oldest first. Repeats the indexed read every
+    ACTIVITY_POLL_INTERVAL seconds while there is nothing to return and the
+    wait has not run out.
+    """
+    query = {"projectId": project_oid, "seq": {"$gt": since}}
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        events = settled_activity(list(get_activity_collection().find(query).sort("seq", 1).limit(limit)), since)
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            return events
+        time.sleep(min(app.config['ACTIVITY_POLL_INTERVAL'], remaining))
+
+
+def parse_activity_args(args, max_wait):
+    """(limit, wait, since, before) from the query string; ValueError on bad input."""
+    try:
+        limit = max(1, min(int(args.get("limit", ACTIVITY_PAGE_SIZE)), 200))
+        wait = max(0.0, min(float(args.get("wait", 0)), max_wait))
+    except (ValueError, TypeError):
+        raise ValueError("limit and wait must be numbers")
+    try:
+        since = int(args["since"]) if args.get("since") else None
+        before = int(args["before"]) if args.get("before") else None
+    except ValueError:
+        raise ValueError("since and before must be event seq numbers")
+    if (since is not None and since < 0) or (before is not None and before < 0):
+        raise ValueError("since and before must be event seq numbers")
+    return limit, wait, since, before
+
+
+def activity_page(events, limit, before):
+    """History body from up to limit + 1 events, newest first."""
+    page = events[:limit]
+    cursor = None
+    if before is None:
+        # where a `since` sync picks up: the end of the page's settled run, so
+        # an event still being written below the newest one is not skipped
+        oldest = list(reversed(page))
+        settled = settled_activity(oldest, oldest[0]["seq"] - 1) if oldest else []
+        cursor = settled[-1]["seq"] if settled else 0
+    return {
+        "events": [serialize_activity(e) for e in page],
+        "next": page[-1]["seq"] if len(events) > limit else None,
+        "cursor": cursor,
+    }
+
+
+@app.route("/api/projects/<project_id>/activity", methods=["GET"])
+@require_project_member
+def get_project_activity(project_id):
+    """
+    Auth required: X-User-Id (must be a project member)
+    History, newest first:  ?limit=50&before=<event seq>
+        -> { "events": [...], "next": <older page's before> | null, "cursor": <seq> }
+    Sync, oldest first:     ?since=<event seq>&limit=50&wait=<seconds>
+        -> { "events": [...], "cursor": <pass as the next since> }
+    With `wait`, an empty sync read is retried until a new event arrives or
+    the wait runs out. Here that holds a worker, so `wait` is clamped to
+    ACTIVITY_SYNC_MAX_WAIT (default 0: answer at once, the client polls);
+    server_async.py allows up to ACTIVITY_MAX_WAIT seconds.
+    """
+    try:
+        limit, wait, since, before = parse_activity_args(request.args, app.config['ACTIVITY_SYNC_MAX_WAIT'])
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    project_oid = ObjectId(project_id)
+
+    if since is not None:
+        events = _poll_activity(project_oid, since, limit, wait)
+        cursor = events[-1]["seq"] if events else since
+        return jsonify({"events": [serialize_activity(e) for e in events], "cursor": cursor}), 200
+
+    query = {"projectId": project_oid}
+    if before is not None:
+        query["seq"] = {"$lt": before}
+    events = list(get_activity_collection().find(query).sort("seq", -1).limit(limit + 1))
+    return jsonify(activity_page(events, limit, before)), 200
+
+
+# -------------------- DUE-DATE REMINDERS --------------------
+# `python jobs.py due-reminders` (every 10 minutes under the worker) finds
+# open tasks due soon / recently overdue with an indexed dueDate range query
+# and fans out notifications with insert_many. Each task records the
+# reminders it got in `reminders.<kind>` (cleared when dueDate changes), and
+# a unique `dedupeKey` on notifications makes a retried batch harmless.
+
+REMINDER_BATCH_SIZE = 500
+REMINDER_KINDS = {
+    "dueSoon": {"type": "task-due-soon", "text": "is due on"},
+    "overdue": {"type": "task-overdue", "text": "was due on"},
+}
+
+
+def _reminder_ranges(now):
+    today = datetime(now.year, now.month, now.day)
+    window = timedelta(days=app.config['REMINDER_WINDOW_DAYS'])
+    lookback = timedelta(days=app.config['REMINDER_OVERDUE_LOOKBACK_DAYS'])
+    return {
+        "dueSoon": {"$gte": today, "$lte": today + window},
+        "overdue": {"$gte": today - lookback, "$lt": today},
+    }
+
+
+def _send_reminder_emails(notifications):
+    """One SMTP connection per batch; failures are logged, never fatal."""
+    user_ids = list({n["userId"] for n in notifications})
+    emails = {
+        u["_id"]: u.get("email")
+        for u in get_users_collection().find({"_id": {"$in": user_ids}}, {"email": 1})
+    }
+    try:
+        with mail.connect() as conn:
+            for n in notifications:
+                if not emails.get(n["userId"]):
+                    continue
+                conn.send(Message(
+                    subject="Teamworks task reminder",
+                    recipients=[emails[n["userId"]]],
+                    body=f"{n['message']}\n\n{app.config['FRONTEND_URL']}",
+                ))
+    except Exception as e:
+        app.logger.exception("Error sending reminder emails: %s", e)
+
+
+def _flush_reminders(kind, batch, now):
+    notifications = []
+    for task in batch:
+        due = task["dueDate"].date().isoformat()
+        notifications.append({
+            "userId": task["assignedTo"],
+            "projectId": task["projectId"],
+            "taskId": task["_id"],
+            "type": REMINDER_KINDS[kind]["type"],
+            "message": f'Task "{task.get("title", "")}" {REMINDER_KINDS[kind]["text"]} {due}.',
+            "createdAt": now,
+            "isRead": False,
+            "dedupeKey": f"{kind}:{task['_id']}:{due}",
+        })
+
+    inserted = len(notifications)
+    try:
+        get_notifications_collection().insert_many(notifications, ordered=False)
+    except BulkWriteError as exc:
+        # duplicate dedupeKey -> already sent by an earlier, interrupted run
+        errors = exc.details.get("writeErrors", [])
+        if any(err.get("code") != 11000 for err in errors):
+            raise
+        inserted = exc.details.get("nInserted", 0)
+        duplicates = {err["index"] for err in errors}
+        notifications = [n for i, n in enumerate(notifications) if i not in duplicates]
+
+    backlog_collection.update_many(
+        {"_id": {"$in": [task["_id"] for task in batch]}},
+        {"$set": {f"reminders.{kind}": now}},
+    )
+    if app.config['REMINDER_EMAILS'] and inserted:
+        _send_reminder_emails(notifications)
+    return inserted
+
+
+def send_due_reminders(now=None):
+    """Returns {kind: notifications created} for one scheduler tick."""
+    now = now or datetime.utcnow()
+    created = {}
+    for kind, due_range in _reminder_ranges(now).items():
+        created[kind] = 0
+        cursor = backlog_collection.find(
+            {
+                "dueDate": due_range,
+                "status": {"$nin": list(DONE_STATUSES)},
+                "assignedTo": {"$type": "objectId"},
+                f"reminders.{kind}": {"$exists": False},
+            },
+            {"title": 1, "dueDate": 1, "assignedTo": 1, "projectId": 1},
+        ).sort("dueDate", 1).batch_size(REMINDER_BATCH_SIZE)
+
+        batch = []
+        for task in cursor:
+            batch.append(task)
+            if len(batch) >= REMINDER_BATCH_SIZE:
+                created[kind] += _flush_reminders(kind, batch, now)
+                batch = []
+        if batch:
+            created[kind] += _flush_reminders(kind, batch, now)
+    return created
+
+
+# -------------------- CALENDAR FEEDS --------------------
+# Subscribable ICS feeds, authenticated by a per-user calendar token in the
+# URL (calendar clients cannot send X-User-Id). Every task write stamps
+# `tasksChangedAt` on the project's stats document, so a poll costs one small
+# query: nothing changed -> 304 from ETag/Last-Modified; changed -> render
+# once from the (projectId|assignedTo, dueDate) index and cache the result.
+
+CALENDAR_TASK_PROJECTION = {
+    "title": 1, "description": 1, "label": 1, "status": 1, "priority": 1, "progress": 1,
+    "startDate": 1, "dueDate": 1, "updatedAt": 1, "projectId": 1,
+}
+calendar_cache = FeedCache()
+
+
+def _calendar_cutoff():
+    day = datetime.utcnow().date() - timedelta(days=app.config['CALENDAR_PAST_DAYS'])
+    return datetime(day.year, day.month, day.day)
+
+
+def _calendar_user(token):
+    if not token:
+        return None
+    return get_users_collection().find_one({"calendarToken": token}, {"firstName": 1, "lastName": 1})
+
+
+def _tasks_changed_at(stats):
+    return stats.get("tasksChangedAt") or stats.get("updatedAt") or datetime(1970, 1, 1)
+
+
+def _calendar_response(cache_key, version_parts, last_modified, render):
+    """304 when the client's copy is current, else the cached or freshly rendered feed."""
+    etag = hashlib.sha1("|".join(str(p) for p in version_parts).encode("utf-8")).hexdigest()[:24]
+    last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    else:
+        fresh = bool(request.if_modified_since and last_modified <= request.if_modified_since)
+
+    if fresh:
+        response = Response(status=304)
+    else:
+        body = calendar_cache.get(cache_key, etag)
+        if body is None:
+            body = "".join(render())
+            calendar_cache.put(cache_key, etag, body)
+        response = Response(body, mimetype="text/calendar")
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _calendar_feed_urls(token, project_ids):
+    base = f"{request.host_url.rstrip('/')}/api/calendar/{token}"
+    return {
+        "personalFeed": f"{base}/me.ics",
+        "projectFeeds": {str(pid): f"{base}/projects/{pid}.ics" for pid in project_ids},
+    }
+
+
+@app.route("/api/users/me/calendar", methods=["GET", "POST"])
+def calendar_subscription():
+    """
+    Auth required: X-User-Id
+    GET: the user's feed URLs (a calendar token is created on first use).
+    POST: rotate the token, so previously shared feed URLs stop working.
+    """
+    user_id = get_request_user_id()
+    if not user_id:
+        return jsonify({"error": "Missing X-User-Id header"}), 401
+    users = get_users_collection()
+    user = users.find_one({"_id": user_id}, {"calendarToken": 1})
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    token = user.get("calendarToken")
+    if request.method == "POST" or not token:
+        token = secrets.token_urlsafe(24)
+        users.update_one({"_id": user_id}, {"$set": {"calendarToken": token}})
+
+    project_ids = [p["_id"] for p in get_projects_collection().find({"members": user_id}, {"_id": 1})]
+    return jsonify({"token": token, **_calendar_feed_urls(token, project_ids)}), 200
+
+
+@app.route("/api/calendar/<token>/projects/<project_id>.ics", methods=["GET"])
+def project_calendar(token, project_id):
+    user = _calendar_user(token)
+    if not user:
+        return jsonify({"error": "Unknown calendar token"}), 404
+    try:
+        project_oid = ObjectId(project_id)
+    except Exception:
+        return jsonify({"error": "Project not found"}), 404
+    project = get_projects_collection().find_one({"_id": project_oid, "members": user["_id"]}, {"name": 1})
+    if not project:
+        return jsonify({"error": "Project not found"}), 404
+
+    stats = get_stats_collection().find_one({"_id": project_oid}, {"tasksChangedAt": 1, "updatedAt": 1}) or {}
+    changed = _tasks_changed_at(stats)
+    cutoff = _calendar_cutoff()
+    link = f"{app.config['FRONTEND_URL']}/projects/{project_id}/backlog"
+
+    def render():
+        cursor = backlog_collection.find(
+            {"projectId": project_oid, "dueDate": {"$gte": cutoff}}, CALENDAR_TASK_PROJECTION
+        ).sort("dueDate", 1).batch_size(500)
+        return render_calendar(f"Teamworks: {project.get('name', '')}", cursor, link_for=lambda task: link)
+
+    return _calendar_response(
+        ("project", project_id),
+        ["project", project_id, project.get("name", ""), changed.isoformat(), cutoff.date()],
+        changed,
+        render,
+    )
+
+
+@app.route("/api/calendar/<token>/me.ics", methods=["GET"])
+def personal_calendar(token):
+    """Tasks assigned to the token's owner across the projects they belong to."""
+    user = _calendar_user(token)
+    if not user:
+        return jsonify({"error": "Unknown calendar token"}), 404
+
+    projects = {
+        p["_id"]: p.get("name", "")
+        for p in get_projects_collection().find({"members": user["_id"]}, {"name": 1})
+    }
+    changed = {
+        s["_id"]: _tasks_changed_at(s)
+        for s in get_stats_collection().find({"_id": {"$in": list(projects)}}, {"tasksChangedAt": 1, "updatedAt": 1})
+    }
+    cutoff = _calendar_cutoff()
+    last_modified = max(changed.values(), default=datetime(1970, 1, 1))
+    version = ["user", user["_id"], user.get("firstName", ""), user.get("lastName", ""), cutoff.date()]
+    for pid in sorted(projects):
+        version += [pid, projects[pid], changed.get(pid, "")]
+
+    def render():
+        cursor = backlog_collection.find(
+            {"assignedTo": user["_id"], "dueDate": {"$gte": cutoff}, "projectId": {"$in": list(projects)}},
+            CALENDAR_TASK_PROJECTION,
+        ).sort("dueDate", 1).batch_size(500)
+        name = f"{user.get('firstName', '')} {user.get('lastName', '')}".strip()
+        return render_calendar(
+            f"Teamworks: {name or 'my tasks'}", cursor, project_names=projects,
+            link_for=lambda task: f"{app.config['FRONTEND_URL']}/projects/{task['projectId']}/backlog",
+        )
+
+    return _calendar_response(("user", str(user["_id"])), version, last_modified, render)
+
+
 # -------------------- PROJECT INVITE (Sending)---------------------
 
 @app.route('/api/projects/<project_id>/invite', methods=['POST'])
@@ -529,7 +1122,7 @@ If you did not expect this invitation, you can safely ignore this email.
                     mail.send(msg)
                     emails_sent.append(email)
                 except Exception as e:
-                    print(f"Error sending email to {email}: {str(e)}")
+                    app.logger.exception("Error sending invitation email: %s", e, extra={"fields": {"email": email}})
                     # Still add to pending invites even if email fails
                     pass
             
@@ -552,6 +1145,7 @@ If you did not expect this invitation, you can safely ignore this email.
             {"$push": {"pendingInvites": {"$each": new_pending}},
              "$set": {"updatedAt": datetime.utcnow()}}
         )
+        _activity(project_id, "invite.sent", emails=[pi["email"] for pi in new_pending])
 
     # return fresh pending list
     proj2 = projects.find_one({"_id": ObjectId(project_id)}, {"pendingInvites": 1})
@@ -600,6 +1194,7 @@ def change_name(project_id):
     if result.modified_count == 0:
         return jsonify({"error": "Project name already set"}), 304  # 304 (Not Modified)
 
+    _activity(project_id, "project.renamed", name=new_project_name)
     return jsonify({"message": "Project name updated"}), 200
 
 
@@ -650,6 +1245,9 @@ def change_owner(project_id):
     if result.matched_count == 0:
         return jsonify({"error": "Project not found"}), 404
 
+    # we already hold the new owner's user document: refresh their embedded profile
+    _refresh_member_profile({"_id": ObjectId(project_id)}, user)
+    _activity(project_id, "owner.changed", ownerId=str(user_id))
     return jsonify({"message": "Project owner updated"}), 200
 
 
@@ -668,9 +1266,183 @@ def delete_project(project_id):
     if result.deleted_count == 0:
         return jsonify({"error": "Project not found"}), 404
 
+    get_stats_collection().delete_one({"_id": ObjectId(project_id)})
+    _activity(project_id, "project.deleted")
     return jsonify({"message": "Project deleted"}), 200
 
 
+# -------------------- PROJECT ARCHIVE --------------------
+# Completed projects older than ARCHIVE_AFTER_DAYS are moved, with their tasks
+# and comments, into archived_* collections by `python jobs.py archive-projects`.
+# They stay readable through the /api/archive routes and are restored when the
+# owner sets the status back to Active.
+#
+# Moves run in ARCHIVE_BATCH_SIZE batches and record their progress in
+# `archiveState` on the archived project ("moving" / "restoring"), so an
+# interrupted move is finished by the next job run.
+
+ARCHIVE_BATCH_SIZE = 500
+
+
+def _move_documents(source, target, query, on_batch=None):
+    """Copy matching documents to `target` (idempotent upserts), then delete them from `source`."""
+    while True:
+        batch = list(source.find(query).limit(ARCHIVE_BATCH_SIZE))
+        if not batch:
+            return
+        ids = [doc["_id"] for doc in batch]
+        if on_batch:
+            on_batch(ids)
+        target.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in batch], ordered=False)
+        source.delete_many({"_id": {"$in": ids}})
+
+
+def _move_project_tasks(project_oid, to_archive):
+    tasks_from, tasks_to = backlog_collection, get_archived_backlog_collection()
+    comments_from, comments_to = get_comments_collection(), get_archived_comments_collection()
+    if not to_archive:
+        tasks_from, tasks_to = tasks_to, tasks_from
+        comments_from, comments_to = comments_to, comments_from
+
+    def move_comments(task_ids):
+        _move_documents(comments_from, comments_to, {"taskId": {"$in": task_ids}})
+
+    _move_documents(tasks_from, tasks_to, {"projectId": project_oid}, on_batch=move_comments)
+
+
+def archive_project(project_oid):
+    """Move one Completed project to the archive. Returns False if it changed meanwhile."""
+    projects = get_projects_collection()
+    archived_projects = get_archived_projects_collection()
+    project = projects.find_one({"_id": project_oid, "status": "Completed"})
+    if not project:
+        return False
+
+    archived_projects.replace_one(
+        {"_id": project_oid},
+        {**project, "archiveState": "moving", "archivedAt": datetime.utcnow()},
+        upsert=True,
+    )
+    # The hot copy disappears only if nobody touched it since we read it
+    removed = projects.delete_one(
+        {"_id": project_oid, "status": "Completed", "updatedAt": project.get("updatedAt")}
+    )
+    if removed.deleted_count == 0:
+        archived_projects.delete_one({"_id": project_oid, "archiveState": "moving"})
+        return False
+
+    _move_project_tasks(project_oid, to_archive=True)
+    archived_projects.update_one({"_id": project_oid}, {"$set": {"archiveState": "archived"}})
+    return True
+
+
+def restore_project(project_oid):
+    """Move an archived project and its tasks/comments back into the hot collections."""
+    archived_projects = get_archived_projects_collection()
+    project = archived_projects.find_one_and_update(
+        {"_id": project_oid},
+        {"$set": {"archiveState": "restoring"}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not project:
+        return False
+
+    _move_project_tasks(project_oid, to_archive=False)
+    for key in ("archiveState", "archivedAt"):
+        project.pop(key, None)
+    # The project becomes visible again only once its tasks are back
+    get_projects_collection().replace_one({"_id": project_oid}, project, upsert=True)
+    archived_projects.delete_one({"_id": project_oid})
+    return True
+
+
+def archive_completed_projects(older_than_days=None, limit=None):
+    """
+    Archive Completed projects idle for `older_than_days`, and finish any move
+    interrupted by a previous run. Returns the number of projects archived.
+    """
+    days = older_than_days if older_than_days is not None else app.config['ARCHIVE_AFTER_DAYS']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+
+    for stuck in get_archived_projects_collection().find({"archiveState": {"$in": ["moving", "restoring"]}}, {"archiveState": 1}):
+        if stuck["archiveState"] == "moving":
+            if get_projects_collection().find_one({"_id": stuck["_id"]}, {"_id": 1}):
+                # interrupted before the hot copy was deleted: nothing moved yet,
+                # and the project may be live again, so drop the archive copy
+                get_archived_projects_collection().delete_one({"_id": stuck["_id"], "archiveState": "moving"})
+                continue
+            _move_project_tasks(stuck["_id"], to_archive=True)
+            get_archived_projects_collection().update_one({"_id": stuck["_id"]}, {"$set": {"archiveState": "archived"}})
+        else:
+            restore_project(stuck["_id"])
+
+    cursor = get_projects_collection().find(
+        {"status": "Completed", "updatedAt": {"$lt": cutoff}}, {"_id": 1}
+    )
+    if limit:
+        cursor = cursor.limit(limit)
+    return sum(1 for p in cursor if archive_project(p["_id"]))
+
+
+@app.route("/api/archive/projects", methods=["GET"])
+def list_archived_projects():
+    """
+    Auth required: X-User-Id
+    Archived projects the user was a member of.
+    """
+    user_id = get_request_user_id()
+    if not user_id:
+        return jsonify({"error": "Missing X-User-Id header"}), 401
+    out = []
+    for p in get_archived_projects_collection().find({"members": user_id}):
+        item = serialize_project(p)
+        item["archivedAt"] = p["archivedAt"].isoformat() if isinstance(p.get("archivedAt"), datetime) else None
+        out.append(item)
+    return jsonify(out), 200
+
+
+def _archived_project_for_member(project_id):
+    user_id = get_request_user_id()
+    if not user_id:
+        return None, (jsonify({"error": "Missing X-User-Id header"}), 401)
+    try:
+        project = get_archived_projects_collection().find_one(
+            {"_id": ObjectId(project_id), "members": user_id}
+        )
+    except InvalidId:
+        project = None
+    if not project:
+        return None, (jsonify({"error": "Archived project not found"}), 404)
+    return project, None
+
+
+@app.route("/api/archive/projects/<project_id>/backlog", methods=["GET"])
+def get_archived_backlog(project_id):
+    project, error = _archived_project_for_member(project_id)
+    if error:
+        return error
+    cursor = get_archived_backlog_collection().find({"projectId": project["_id"]})
+    return jsonify({
+        "project": serialize_project(project),
+        "backlog": [serialize_task(task) for task in cursor],
+    }), 200
+
+
+@app.route("/api/archive/projects/<project_id>/backlog/<task_id>/comments", methods=["GET"])
+def get_archived_comments(project_id, task_id):
+    project, error = _archived_project_for_member(project_id)
+    if error:
+        return error
+    try:
+        task_oid = ObjectId(task_id)
+    except InvalidId:
+        return jsonify({"error": "Task not found"}), 404
+    if not get_archived_backlog_collection().find_one({"_id": task_oid, "projectId": project["_id"]}, {"_id": 1}):
+        return jsonify({"error": "Task not found"}), 404
+    cursor = get_archived_comments_collection().find({"taskId": task_oid}).sort("timestamp", 1)
+    return jsonify([serialize_comment(comment) for comment in cursor]), 200
+
+
 # -------------------- BACKLOG ROUTES --------------------
 
 # @app.route('/api/backlog', methods=['GET'])
@@ -690,43 +1462,76 @@ def delete_project(project_id):
 #     return jsonify(tasks)
 
 
-def _as_iso_date(value):
+def _date_range_filter(args):
     """
-    Accepts: 'YYYY-MM-DD', full ISO8601 string, datetime/date objects, or missing.
-    Returns: ISO date string 'YYYY-MM-DD' or '' if value is falsy.
+    Builds an overlap predicate from ?from=YYYY-MM-DD&to=YYYY-MM-DD.
+    A task matches when [startDate, dueDate] intersects the requested window,
+    so the (projectId, dueDate) index bounds the scan.
     """
-    if not value:
-        return ""
-    if isinstance(value, datetime):
-        return value.date().isoformat()
-    if isinstance(value, str):
-        # try plain date
-        try:
-            return datetime.strptime(value, "%Y-%m-%d").date().isoformat()
-        except ValueError:
-            # try full ISO (and tolerate Z)
-            try:
-                return datetime.fromisoformat(value.replace("Z", "+00:00")).date().isoformat()
-            except Exception:
-                # if it's some other string, just return as-is to avoid 500s
-                return value
-    return str(value)
+    query = {}
+    range_from = args.get("from")
+    range_to = args.get("to")
+    if range_from:
+        from_date = to_bson_date(range_from)
+        if not from_date:
+            raise ValueError("from must be a valid ISO date")
+        query["dueDate"] = {"$gte": from_date}
+    if range_to:
+        to_date = to_bson_date(range_to)
+        if not to_date:
+            raise ValueError("to must be a valid ISO date")
+        query["startDate"] = {"$lte": to_date}
+    return query
+
+
+TASK_FIELDS = (
+    "id", "title", "description", "label", "status", "priority", "assignedTo",
+    "startDate", "dueDate", "progress", "dependencies", "projectId", "version", "rank",
+    "commentCount", "lastCommentAt",
+)
 
 
-def _parse_iso_date(value):
-    if not value:
+def _task_projection(fields):
+    """Mongo projection for a subset of serialized task fields (None = all)."""
+    if not fields:
         return None
-    if isinstance(value, datetime):
-        return value.date()
-    if isinstance(value, str):
-        try:
-            return datetime.strptime(value, "%Y-%m-%d").date()
-        except ValueError:
-            try:
-                return datetime.fromisoformat(value.replace("Z", "+00:00")).date()
-            except Exception:
-                return None
-    return None
+    return {("_id" if f == "id" else f): 1 for f in fields}
+
+
+def _parse_task_fields(raw):
+    """?fields=id,title,status -> validated tuple, or None for every field."""
+    if not raw:
+        return None
+    fields = tuple(f.strip() for f in raw.split(",") if f.strip())
+    unknown = [f for f in fields if f not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown task field(s): {', '.join(unknown)}")
+    return fields
+
+
+def serialize_task(task, fields=None):
+    out = {
+        "id": str(task["_id"]),
+        "title": task.get("title", ""),
+        "description": task.get("description", ""),
+        "label": task.get("label", ""),
+        "status": task.get("status", ""),
+        "priority": task.get("priority", ""),
+        "assignedTo": str(task["assignedTo"]) if task.get("assignedTo") else "",
+        "startDate": as_iso_date(task.get("startDate")),
+        "dueDate": as_iso_date(task.get("dueDate")),
+        "progress": task.get("progress", 0),
+        "dependencies": [str(dep) for dep in task.get("dependencies", [])],
+        "projectId": str(task["projectId"]) if task.get("projectId") else None,
+        "version": task.get("version", 0),
+        "rank": task.get("rank"),
+        # maintained by add_comment; backfill with `python jobs.py comment-counts`
+        "commentCount": task.get("commentCount", 0),
+        "lastCommentAt": task["lastCommentAt"].isoformat() if isinstance(task.get("lastCommentAt"), datetime) else None,
+    }
+    if fields:
+        return {f: out[f] for f in fields}
+    return out
 
 
 def _normalize_progress(value):
@@ -767,108 +1572,424 @@ def _normalize_dependencies(dep_ids, project_id, exclude_task_id=None):
     return normalized
 
 
-@app.route('/api/projects/<project_id>/backlog', methods=['GET'])
-@require_project_member
-def get_project_backlog(project_id):
-    tasks = []
-    for task in backlog_collection.find({"projectId": ObjectId(project_id)}):
-        tasks.append({
-            "id": str(task["_id"]),
-            "title": task["title"],
-            "description": task["description"],
-            "label": task["label"],
-            "status": task["status"],
-            "priority": task["priority"],
-            "assignedTo": task["assignedTo"],
-            "startDate": task["startDate"],
-            "dueDate": task["dueDate"],
-            "progress": task.get("progress", 0),
-            "dependencies": [str(dep) for dep in task.get("dependencies", [])],
-            "projectId": str(task["projectId"]),
-        })
-    return jsonify(tasks)
+# -------------------- TASK VERSIONING --------------------
+# Every task write bumps `version`. Clients may send it back as If-Match to
+# make a write conditional; documents written before versioning count as 0.
 
+def _expected_version():
+    return parse_if_match(request.headers.get("If-Match"))
 
-# @app.route('/api/backlog', methods=['POST'])
-# def create_backlog():
-#     data = request.json
-#     required_fields = ["title", "description", "label", "status", "priority", "assignedTo", "dueDate"]
-#     for field in required_fields:
-#         if field not in data:
-#             return jsonify({"error": f"{field} is required"}), 400
 
-#     task = {
-#         "title": data["title"],
-#         "description": data["description"],
-#         "label": data["label"],
-#         "status": data["status"],
-#         "priority": data["priority"],
-#         "assignedTo": data["assignedTo"],
-#         "dueDate": data["dueDate"]
-#     }
-#     result = backlog_collection.insert_one(task)
-#     return jsonify({"message": "Task created", "id": str(result.inserted_id)}), 201
+def version_filter(expected_version):
+    if expected_version is None:
+        return {}
+    if expected_version == 0:
+        return {"version": {"$in": [0, None]}}
+    return {"version": expected_version}
 
 
-@app.route('/api/projects/<project_id>/backlog', methods=['POST'])
-def create_project_backlog(project_id):
-    data = request.json
-    required_fields = ["title", "description", "label", "status", "priority", "assignedTo", "startDate", "dueDate"]
-    for field in required_fields:
-        if field not in data:
-            return jsonify({"error": f"{field} is required"}), 400
+def _task_versioned_response(body, task):
+    version = task.get("version", 0)
+    response = jsonify({**body, "version": version})
+    response.headers["ETag"] = f'"{version}"'
+    return response, 200
 
-    # single assignee → ObjectId
-    try:
-        assigned_id = ObjectId(data["assignedTo"])
-    except Exception:
-        return jsonify({"error": "assignedTo must be a valid user id"}), 400
 
-    start_date_obj = _parse_iso_date(data["startDate"])
-    due_date_obj = _parse_iso_date(data["dueDate"])
-    if not start_date_obj or not due_date_obj:
-        return jsonify({"error": "startDate and dueDate must be valid ISO dates"}), 400
-    if due_date_obj < start_date_obj:
-        return jsonify({"error": "dueDate cannot be before startDate"}), 400
+def _task_write_failed(project_id, task_id, expected_version, dependency_oid=None):
+    """
+    A conditional write matched nothing; one extra read (failure path only)
+    tells 404, 409 and duplicate-dependency apart.
+    """
+    current = backlog_collection.find_one(
+        {"_id": ObjectId(task_id), "projectId": ObjectId(project_id)},
+        {"version": 1, "dependencies": 1}
+    )
+    if not current:
+        return jsonify({"error": "Task not found"}), 404
+    if dependency_oid is not None and dependency_oid in current.get("dependencies", []):
+        return jsonify({"error": "Dependency already exists"}), 400
+    return jsonify({
+        "error": "Task was modified by someone else",
+        "expectedVersion": expected_version,
+        "currentVersion": current.get("version", 0),
+    }), 409
+
+
+# -------------------- PROJECT STATS --------------------
+# One document per project in `project_stats`, kept current by the task and
+# membership write routes with $inc. Overdue is derived at read time from
+# `openDue` (open tasks bucketed by due day), so it stays correct as days pass
+# without any write.
+
+DONE_STATUSES = ("Done", "Completed")
+# Board columns; "Completed" is the legacy name of Done
+TASK_STATUSES = ("To Do", "In Progress", *DONE_STATUSES)
+
+
+def _stats_key(value):
+    # Mongo field names cannot contain '.' or start with '$'
+    return str(value or "None").replace(".", "_").lstrip("$") or "None"
+
+
+def _empty_project_stats(project_oid, member_count=0):
+    return {
+        "_id": project_oid,
+        "taskCount": 0,
+        "byStatus": {},
+        "byPriority": {},
+        "progressSum": 0,
+        "openDue": {},
+        "memberCount": member_count,
+        "attachmentBytes": 0,
+        "updatedAt": datetime.utcnow(),
+        "tasksChangedAt": datetime.utcnow(),
+    }
 
-    try:
-        progress_value = _normalize_progress(data.get("progress"))
-        dependencies_list = _normalize_dependencies(data.get("dependencies"), project_id)
-    except ValueError as exc:
-        return jsonify({"error": str(exc)}), 400
 
-    project_doc = getattr(request, "_project_doc", None)
-    if project_doc and not any(str(member) == str(assigned_id) for member in project_doc.get("members", [])):
-        return jsonify({"error": "assignedTo must be a member of this project"}), 400
+def _task_stats_inc(task, sign):
+    inc = {
+        "taskCount": sign,
+        f"byStatus.{_stats_key(task.get('status'))}": sign,
+        f"byPriority.{_stats_key(task.get('priority'))}": sign,
+        "progressSum": sign * (task.get("progress") or 0),
+    }
+    due = task.get("dueDate")
+    if task.get("status") not in DONE_STATUSES and isinstance(due, datetime):
+        inc[f"openDue.{due.date().isoformat()}"] = sign
+    return inc
 
-    task = {
-        "title": data["title"],
-        "description": data["description"],
-        "label": data["label"],
-        "status": data["status"],
-        "priority": data["priority"],
-        "assignedTo": str(assigned_id),
-        "startDate": start_date_obj.isoformat(),
-        "dueDate": due_date_obj.isoformat(),
+
+def task_stats_delta(before=None, after=None):
+    """$inc for the difference between a task's old and new state (zero entries dropped)."""
+    inc = {}
+    for task, sign in ((before, -1), (after, 1)):
+        if not task:
+            continue
+        for key, value in _task_stats_inc(task, sign).items():
+            inc[key] = inc.get(key, 0) + value
+    return {key: value for key, value in inc.items() if value}
+
+
+def _apply_task_stats(project_id, before=None, after=None):
+    """Apply the difference between a task's old and new state to its project's stats."""
+    _write_stats_inc(project_id, task_stats_delta(before, after))
+
+
+def _write_stats_inc(project_id, inc):
+    _write_stats(project_id, stats_update(inc))
+
+
+def _write_stats(project_id, update):
+    """
+    Apply an incremental update to a project's stats. Projects created before
+    stats existed have no document; an upserted delta would be wrong (e.g.
+    memberCount -1), so those are rebuilt instead, which counts this write.
+    """
+    result = get_stats_collection().update_one({"_id": ObjectId(project_id)}, update)
+    if not result.matched_count:
+        rebuild_project_stats([project_id])
+
+
+def stats_update(inc):
+    """
+    Update for a task write: the $inc plus a `tasksChangedAt` stamp, written
+    even when the counters don't move (a title edit still changes the
+    project's calendar feed).
+    """
+    now = datetime.utcnow()
+    update = {"$set": {"updatedAt": now, "tasksChangedAt": now}}
+    inc = {key: value for key, value in inc.items() if value}
+    if inc:
+        update["$inc"] = inc
+    return update
+
+
+def _apply_member_count(project_id, delta):
+    _write_stats(project_id, {"$inc": {"memberCount": delta}, "$set": {"updatedAt": datetime.utcnow()}})
+
+
+def rebuild_project_stats(project_ids=None):
+    """
+    Recompute stats from scratch with a single aggregation over backlog_items.
+    project_ids: iterable of ids to repair, or None for every project.
+    Returns the number of stats documents written.
+    """
+    project_filter = {}
+    if project_ids is not None:
+        project_filter = {"_id": {"$in": [ObjectId(pid) for pid in project_ids]}}
+
+    stats = {
+        p["_id"]: _empty_project_stats(p["_id"], member_count=len(p.get("members", [])))
+        for p in get_projects_collection().find(project_filter, {"members": 1})
+    }
+    if not stats:
+        return 0
+
+    pipeline = [
+        {"$match": {"projectId": {"$in": list(stats)}}},
+        {"$group": {
+            "_id": {
+                "projectId": "$projectId",
+                "status": "$status",
+                "priority": "$priority",
+                "openDue": {"$cond": [
+                    {"$and": [
+                        {"$not": [{"$in": ["$status", list(DONE_STATUSES)]}]},
+                        {"$eq": [{"$type": "$dueDate"}, "date"]},
+                    ]},
+                    {"$dateToString": {"format": "%Y-%m-%d", "date": "$dueDate"}},
+                    None,
+                ]},
+            },
+            "count": {"$sum": 1},
+            "progressSum": {"$sum": {"$ifNull": ["$progress", 0]}},
+        }},
+    ]
+    for row in backlog_collection.aggregate(pipeline):
+        key = row["_id"]
+        doc = stats[key["projectId"]]
+        doc["taskCount"] += row["count"]
+        doc["progressSum"] += row["progressSum"]
+        status_key = _stats_key(key.get("status"))
+        priority_key = _stats_key(key.get("priority"))
+        doc["byStatus"][status_key] = doc["byStatus"].get(status_key, 0) + row["count"]
+        doc["byPriority"][priority_key] = doc["byPriority"].get(priority_key, 0) + row["count"]
+        if key.get("openDue"):
+            doc["openDue"][key["openDue"]] = doc["openDue"].get(key["openDue"], 0) + row["count"]
+
+    # quota usage is recounted from the attachment metadata, which includes
+    # the `pending` documents of uploads still in flight (their reservations)
+    for row in get_attachments_collection().aggregate([
+        {"$match": {"projectId": {"$in": list(stats)}}},
+        {"$group": {"_id": "$projectId", "bytes": {"$sum": "$length"}}},
+    ]):
+        stats[row["_id"]]["attachmentBytes"] = row["bytes"]
+
+    stats_collection = get_stats_collection()
+    for doc in stats.values():
+        stats_collection.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+    return len(stats)
+
+
+def _serialize_project_stats(stats, today=None):
+    today = (today or datetime.utcnow().date()).isoformat()
+    task_count = stats.get("taskCount", 0)
+    return {
+        "taskCount": task_count,
+        "byStatus": {k: v for k, v in stats.get("byStatus", {}).items() if v},
+        "byPriority": {k: v for k, v in stats.get("byPriority", {}).items() if v},
+        "averageProgress": round(stats.get("progressSum", 0) / task_count, 2) if task_count else 0,
+        "overdue": sum(v for day, v in stats.get("openDue", {}).items() if day < today and v > 0),
+        "memberCount": stats.get("memberCount", 0),
+        "attachmentBytes": stats.get("attachmentBytes", 0),
+    }
+
+
+@app.route("/api/users/me/project-stats", methods=["GET"])
+def list_my_project_stats():
+    """
+    Auth required: X-User-Id
+    Stats for every project the user belongs to, in one aggregation.
+    """
+    user_id = get_request_user_id()
+    if not user_id:
+        return jsonify({"error": "Missing X-User-Id header"}), 401
+
+    projects = read_router.collection(get_projects_collection())
+    out = [serialize_my_project_stats(p) for p in projects.aggregate(my_project_stats_pipeline(user_id))]
+    return jsonify(out), 200
+
+
+def my_project_stats_pipeline(user_id):
+    return [
+        {"$match": {"members": user_id}},
+        {"$project": {"name": 1, "status": 1, "memberCount": {"$size": "$members"}}},
+        {"$lookup": {
+            "from": get_stats_collection().name,
+            "localField": "_id",
+            "foreignField": "_id",
+            "as": "stats",
+        }},
+    ]
+
+
+def serialize_my_project_stats(p):
+    stats = p["stats"][0] if p["stats"] else {}
+    stats.setdefault("memberCount", p["memberCount"])
+    return {
+        "projectId": str(p["_id"]),
+        "name": p.get("name", ""),
+        "status": p.get("status", "Active"),
+        **_serialize_project_stats(stats),
+    }
+
+
+@app.route("/api/projects/<project_id>/stats/rebuild", methods=["POST"])
+@require_project_owner
+def rebuild_stats(project_id):
+    rebuild_project_stats([project_id])
+    stats = get_stats_collection().find_one({"_id": ObjectId(project_id)}) or {}
+    return jsonify({"message": "Stats rebuilt", **_serialize_project_stats(stats)}), 200
+
+
+@app.route('/api/projects/<project_id>/backlog', methods=['GET'])
+@require_project_member
+def get_project_backlog(project_id):
+    try:
+        query, sort = backlog_query(project_id, request.args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    cursor = read_router.collection(backlog_collection).find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    tasks = [serialize_task(task) for task in cursor]
+    return jsonify(tasks)
+
+
+def backlog_query(project_id, args):
+    """(filter, sort or None) for the backlog listing; raises ValueError."""
+    query = {"projectId": ObjectId(project_id)}
+    query.update(_date_range_filter(args))
+    # (projectId, status, rank) index: every column comes back in board order
+    sort = [("status", 1), ("rank", 1)] if args.get("order") == "rank" else None
+    return query, sort
+
+
+# @app.route('/api/backlog', methods=['POST'])
+# def create_backlog():
+#     data = request.json
+#     required_fields = ["title", "description", "label", "status", "priority", "assignedTo", "dueDate"]
+#     for field in required_fields:
+#         if field not in data:
+#             return jsonify({"error": f"{field} is required"}), 400
+
+#     task = {
+#         "title": data["title"],
+#         "description": data["description"],
+#         "label": data["label"],
+#         "status": data["status"],
+#         "priority": data["priority"],
+#         "assignedTo": data["assignedTo"],
+#         "dueDate": data["dueDate"]
+#     }
+#     result = backlog_collection.insert_one(task)
+#     return jsonify({"message": "Task created", "id": str(result.inserted_id)}), 201
+
+
+@app.route('/api/projects/<project_id>/backlog', methods=['POST'])
+def create_project_backlog(project_id):
+    data = request.json
+    required_fields = ["title", "description", "label", "status", "priority", "assignedTo", "startDate", "dueDate"]
+    for field in required_fields:
+        if field not in data:
+            return jsonify({"error": f"{field} is required"}), 400
+    if data["status"] not in TASK_STATUSES:
+        return jsonify({"error": f"status must be one of {', '.join(TASK_STATUSES)}"}), 400
+
+    # single assignee → ObjectId
+    try:
+        assigned_id = ObjectId(data["assignedTo"])
+    except Exception:
+        return jsonify({"error": "assignedTo must be a valid user id"}), 400
+
+    start_date_obj = parse_iso_date(data["startDate"])
+    due_date_obj = parse_iso_date(data["dueDate"])
+    if not start_date_obj or not due_date_obj:
+        return jsonify({"error": "startDate and dueDate must be valid ISO dates"}), 400
+    if due_date_obj < start_date_obj:
+        return jsonify({"error": "dueDate cannot be before startDate"}), 400
+
+    try:
+        progress_value = _normalize_progress(data.get("progress"))
+        dependencies_list = _normalize_dependencies(data.get("dependencies"), project_id)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    project_doc = getattr(request, "_project_doc", None)
+    if project_doc and not any(str(member) == str(assigned_id) for member in project_doc.get("members", [])):
+        return jsonify({"error": "assignedTo must be a member of this project"}), 400
+
+    task = {
+        "title": data["title"],
+        "description": data["description"],
+        "label": data["label"],
+        "status": data["status"],
+        "priority": data["priority"],
+        "assignedTo": assigned_id,
+        "startDate": to_bson_date(data["startDate"]),
+        "dueDate": to_bson_date(data["dueDate"]),
         "progress": progress_value,
         "dependencies": dependencies_list,
+        "rank": rank_after(_column_tail_rank(ObjectId(project_id), data["status"])),
+        "version": 1,
         "createdAt": datetime.utcnow(),
         "updatedAt": datetime.utcnow(),
         "projectId": ObjectId(project_id),
     }
     result = backlog_collection.insert_one(task)
+    _apply_task_stats(project_id, after=task)
+    _activity(project_id, "task.created", task_id=result.inserted_id, title=task["title"])
+    if len(task["rank"]) > RANK_MAX_LENGTH:
+        queue_rank_rebalance(task["projectId"], task["status"])
     return jsonify({"message": "Task created", "id": str(result.inserted_id)}), 201
 
 
 @app.route("/api/projects/<project_id>/backlog/<task_id>", methods=["PUT"])
 def update_task(project_id, task_id):
-    data = request.json
-    task = backlog_collection.find_one(
-        {"_id": ObjectId(task_id), "projectId": ObjectId(project_id)}
-    )
-    if not task:
-        return jsonify({"error": "Task not found"}), 404
+    """
+    Optional precondition: If-Match: "<version>" (the task's ETag).
+    A stale version returns 409 with the current version instead of
+    overwriting a concurrent edit. A status change appends the task to the
+    end of its new column, as move_task does.
+    """
+    try:
+        expected_version = _expected_version()
+        update = build_task_update(request.json)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
+    # Single round-trip: the pre-image feeds the stats delta and the
+    # post-image is the pre-image with this $set applied.
+    project_oid = ObjectId(project_id)
+    match = {"_id": ObjectId(task_id), "projectId": project_oid, **version_filter(expected_version)}
+    task = None
+    if "status" in update:
+        # Only matches when the status really changes; an unchanged one keeps its rank
+        rank = rank_after(_column_tail_rank(project_oid, update["status"]))
+        task = backlog_collection.find_one_and_update(
+            {**match, "status": {"$ne": update["status"]}},
+            {"$set": {**update, "rank": rank}, "$inc": {"version": 1}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if task:
+            update["rank"] = rank
+        else:
+            match["status"] = update["status"]  # moved meanwhile -> 409 below
+    if not task:
+        task = backlog_collection.find_one_and_update(
+            match, {"$set": update, "$inc": {"version": 1}}, return_document=ReturnDocument.BEFORE,
+        )
+    if not task:
+        return _task_write_failed(project_id, task_id, expected_version)
+    if len(update.get("rank", "")) > RANK_MAX_LENGTH:
+        queue_rank_rebalance(project_oid, update["status"])
+
+    reset = reminders_reset(task, update)
+    if reset:
+        backlog_collection.update_one(*reset)
+    updated_task = {**task, **update, "version": task.get("version", 0) + 1}
+    _apply_task_stats(project_id, before=task, after=updated_task)
+    _activity(project_id, "task.updated", task_id=task_id, **task_change_summary(task, update))
+    return _task_versioned_response({
+        "message": "Task updated successfully",
+        "task": serialize_task(updated_task),
+    }, updated_task)
+
+
+def build_task_update(data):
+    """Validated $set document for a task update; raises ValueError."""
+    data = data or {}
     allowed_fields = [
         "title",
         "description",
@@ -887,35 +2008,67 @@ def update_task(project_id, task_id):
         if field in data:
             update[field] = data[field]
     
+    # Store assignee and dates with native BSON types (ObjectId / date)
+    if "assignedTo" in update:
+        if update["assignedTo"]:
+            try:
+                update["assignedTo"] = ObjectId(update["assignedTo"])
+            except Exception:
+                raise ValueError("assignedTo must be a valid user id")
+        else:
+            update["assignedTo"] = None
+
+    for date_field in ("startDate", "dueDate"):
+        if date_field in update:
+            if update[date_field]:
+                date_value = to_bson_date(update[date_field])
+                if not date_value:
+                    raise ValueError(f"{date_field} must be a valid ISO date")
+                update[date_field] = date_value
+            else:
+                update[date_field] = None
+
     # Normalize progress if provided
     if "progress" in update:
-        try:
-            update["progress"] = _normalize_progress(update["progress"])
-        except ValueError as exc:
-            return jsonify({"error": str(exc)}), 400
+        update["progress"] = _normalize_progress(update["progress"])
 
     if not update:
-        return jsonify({"error": "No valid fields to update"}), 400
+        raise ValueError("No valid fields to update")
 
     update["updatedAt"] = datetime.utcnow()
-    backlog_collection.update_one({"_id": ObjectId(task_id)}, {"$set": update})
-    return jsonify({"message": "Task updated successfully"})
+    return update
+
+
+def reminders_reset(before, update):
+    """(filter, update) clearing `reminders` if `update` moved the due date, else None.
+
+    A new due date is a new deadline: reminders for it have not been sent.
+    The filter pins the new dueDate so a later edit is not overridden; a
+    reminder sent in between is deduplicated by its dedupeKey.
+    """
+    if "dueDate" not in update or update["dueDate"] == before.get("dueDate"):
+        return None
+    return {"_id": before["_id"], "dueDate": update["dueDate"]}, {"$set": {"reminders": {}}}
 
 
 @app.route("/api/projects/<project_id>/backlog/<task_id>", methods=["DELETE"])
 def delete_task(project_id, task_id):
-    result = backlog_collection.delete_one(
+    deleted = backlog_collection.find_one_and_delete(
         {"_id": ObjectId(task_id), "projectId": ObjectId(project_id)}
     )
-    if result.deleted_count == 0:
+    if not deleted:
         return jsonify({"error": "Task not found"}), 404
+    _apply_task_stats(project_id, before=deleted)
+    _delete_attachments({"taskId": deleted["_id"]})
+    _activity(project_id, "task.deleted", task_id=task_id, title=deleted.get("title", ""))
     # Remove the deleted task from other dependency lists
     try:
         backlog_collection.update_many(
-            {"projectId": ObjectId(project_id)},
+            {"projectId": ObjectId(project_id), "dependencies": ObjectId(task_id)},
             {
                 "$pull": {"dependencies": ObjectId(task_id)},
-                "$set": {"updatedAt": datetime.utcnow()}
+                "$set": {"updatedAt": datetime.utcnow()},
+                "$inc": {"version": 1}
             }
         )
     except Exception:
@@ -931,94 +2084,1000 @@ def add_dependency(project_id, task_id):
     
     if not dependency_id:
         return jsonify({"error": "dependencyId is required"}), 400
-    
-    # Verify task exists
-    task = backlog_collection.find_one(
-        {"_id": ObjectId(task_id), "projectId": ObjectId(project_id)}
-    )
-    if not task:
-        return jsonify({"error": "Task not found"}), 404
+
+    try:
+        expected_version = _expected_version()
+        dep_oid = ObjectId(dependency_id)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Each dependency id must be a valid task id"}), 400
+
+    # Prevent self-dependency
+    if str(task_id) == str(dependency_id):
+        return jsonify({"error": "A task cannot depend on itself"}), 400
     
     # Verify dependency task exists in same project
     dep_task = backlog_collection.find_one(
-        {"_id": ObjectId(dependency_id), "projectId": ObjectId(project_id)}
+        {"_id": dep_oid, "projectId": ObjectId(project_id)},
+        {"_id": 1}
     )
     if not dep_task:
         return jsonify({"error": "Dependency task not found in this project"}), 404
-    
-    # Prevent self-dependency
-    if str(task_id) == str(dependency_id):
-        return jsonify({"error": "A task cannot depend on itself"}), 400
-    
-    # Get current dependencies
-    current_deps = task.get("dependencies", [])
-    dep_oid = ObjectId(dependency_id)
-    
-    # Check if already a dependency
-    if dep_oid in current_deps:
-        return jsonify({"error": "Dependency already exists"}), 400
-    
-    # Add dependency
-    new_deps = current_deps + [dep_oid]
+
+    # Add dependency atomically; the $ne guard rejects duplicates
+    updated_task = backlog_collection.find_one_and_update(
+        {
+            "_id": ObjectId(task_id),
+            "projectId": ObjectId(project_id),
+            "dependencies": {"$ne": dep_oid},
+            **version_filter(expected_version),
+        },
+        {
+            "$addToSet": {"dependencies": dep_oid},
+            "$set": {"updatedAt": datetime.utcnow()},
+            "$inc": {"version": 1},
+        },
+        projection={"dependencies": 1, "version": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not updated_task:
+        return _task_write_failed(project_id, task_id, expected_version, dependency_oid=dep_oid)
+    _activity(project_id, "dependency.added", task_id=task_id, dependencyId=str(dep_oid))
+
+    return _task_versioned_response({
+        "message": "Dependency added successfully",
+        "dependencies": [str(dep) for dep in updated_task.get("dependencies", [])]
+    }, updated_task)
+
+
+@app.route("/api/projects/<project_id>/backlog/<task_id>/dependencies/<dependency_id>", methods=["DELETE"])
+@require_project_member
+def remove_dependency(project_id, task_id, dependency_id):
     try:
-        normalized_deps = _normalize_dependencies(
-            [str(d) for d in new_deps],
-            project_id,
-            exclude_task_id=task_id
-        )
+        expected_version = _expected_version()
     except ValueError as exc:
         return jsonify({"error": str(exc)}), 400
-    
-    backlog_collection.update_one(
-        {"_id": ObjectId(task_id)},
+
+    updated_task = backlog_collection.find_one_and_update(
+        {"_id": ObjectId(task_id), "projectId": ObjectId(project_id), **version_filter(expected_version)},
         {
-            "$set": {
-                "dependencies": normalized_deps,
-                "updatedAt": datetime.utcnow()
-            }
+            "$pull": {"dependencies": ObjectId(dependency_id)},
+            "$set": {"updatedAt": datetime.utcnow()},
+            "$inc": {"version": 1},
+        },
+        projection={"dependencies": 1, "version": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not updated_task:
+        return _task_write_failed(project_id, task_id, expected_version)
+    _activity(project_id, "dependency.removed", task_id=task_id, dependencyId=dependency_id)
+
+    return _task_versioned_response({
+        "message": "Dependency removed successfully",
+        "dependencies": [str(dep) for dep in updated_task.get("dependencies", [])]
+    }, updated_task)
+
+
+# -------------------- PROGRESS SNAPSHOTS --------------------
+# One document per project per day in the `project_snapshots` time-series
+# collection, written by `python jobs.py snapshot-progress`. Burndown and
+# velocity charts read a date range with one indexed query.
+
+SNAPSHOT_PROJECT_BATCH = 200
+
+
+def take_progress_snapshots(day=None):
+    """
+    Snapshot every project not yet captured for `day` (default: today, UTC).
+    One $group aggregation per batch of projects. Returns snapshots written.
+    """
+    today = datetime.utcnow()
+    day = day or datetime(today.year, today.month, today.day)
+    snapshots = get_snapshots_collection()
+    done = {s["projectId"] for s in snapshots.find({"day": day}, {"projectId": 1})}
+    pending = [
+        p["_id"] for p in get_projects_collection().find({}, {"_id": 1})
+        if p["_id"] not in done
+    ]
+
+    written = 0
+    for start in range(0, len(pending), SNAPSHOT_PROJECT_BATCH):
+        batch = pending[start:start + SNAPSHOT_PROJECT_BATCH]
+        rows = {
+            row["_id"]: row for row in backlog_collection.aggregate([
+                {"$match": {"projectId": {"$in": batch}}},
+                {"$group": {
+                    "_id": "$projectId",
+                    "total": {"$sum": 1},
+                    "completed": {"$sum": {"$cond": [{"$in": ["$status", list(DONE_STATUSES)]}, 1, 0]}},
+                    "overdue": {"$sum": {"$cond": [
+                        {"$and": [
+                            {"$not": [{"$in": ["$status", list(DONE_STATUSES)]}]},
+                            {"$eq": [{"$type": "$dueDate"}, "date"]},
+                            {"$lt": ["$dueDate", day]},
+                        ]}, 1, 0,
+                    ]}},
+                    "averageProgress": {"$avg": {"$ifNull": ["$progress", 0]}},
+                }},
+            ])
         }
+        docs = []
+        for project_oid in batch:
+            row = rows.get(project_oid, {})
+            total = row.get("total", 0)
+            completed = row.get("completed", 0)
+            docs.append({
+                "projectId": project_oid,
+                "day": day,
+                "totalTasks": total,
+                "completedTasks": completed,
+                "remainingTasks": total - completed,
+                "overdueTasks": row.get("overdue", 0),
+                "averageProgress": round(row.get("averageProgress") or 0, 2),
+            })
+        if docs:
+            snapshots.insert_many(docs, ordered=False)
+            written += len(docs)
+    return written
+
+
+@app.route("/api/projects/<project_id>/snapshots", methods=["GET"])
+@require_project_member
+def get_progress_snapshots(project_id):
+    """
+    Daily progress for burndown / velocity charts.
+    Query: ?from=YYYY-MM-DD&to=YYYY-MM-DD (default: the last 30 days)
+    """
+    raw_from, raw_to = request.args.get("from"), request.args.get("to")
+    range_from = to_bson_date(raw_from) if raw_from else None
+    range_to = to_bson_date(raw_to) if raw_to else None
+    if (raw_from and not range_from) or (raw_to and not range_to):
+        return jsonify({"error": "from and to must be valid ISO dates"}), 400
+
+    if not range_to:
+        today = datetime.utcnow()
+        range_to = datetime(today.year, today.month, today.day)
+    if not range_from:
+        range_from = range_to - timedelta(days=30)
+
+    cursor = read_router.collection(get_snapshots_collection()).find(
+        {"projectId": ObjectId(project_id), "day": {"$gte": range_from, "$lte": range_to}},
+        {"_id": 0, "projectId": 0},
+    ).sort("day", 1)
+    return jsonify([
+        {
+            "date": snap["day"].date().isoformat(),
+            "totalTasks": snap.get("totalTasks", 0),
+            "completedTasks": snap.get("completedTasks", 0),
+            "remainingTasks": snap.get("remainingTasks", 0),
+            "overdueTasks": snap.get("overdueTasks", 0),
+            "averageProgress": snap.get("averageProgress", 0),
+        }
+        for snap in cursor
+    ]), 200
+
+
+# -------------------- KANBAN ORDERING --------------------
+# Tasks carry a fractional `rank` (see ranking.py) ordering them inside their
+# status column. A move rewrites only the moved task; columns whose ranks grow
+# past RANK_MAX_LENGTH are queued and respaced by `python jobs.py rebalance-ranks`.
+
+def _column_tail_rank(project_oid, status):
+    last = backlog_collection.find_one(
+        {"projectId": project_oid, "status": status, "rank": {"$type": "string"}},
+        {"rank": 1},
+        sort=[("rank", -1)],
     )
-    
-    # Return updated task with dependencies as strings
-    updated_task = backlog_collection.find_one({"_id": ObjectId(task_id)})
+    return last["rank"] if last else None
+
+
+def queue_rank_rebalance(project_oid, status):
+    get_rank_rebalance_collection().update_one(
+        {"_id": {"projectId": project_oid, "status": status}},
+        {"$setOnInsert": {"queuedAt": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+def rebalance_column_ranks(project_oid, status):
+    """
+    Respace one column's ranks evenly, keeping the current order (unranked
+    tasks go last, oldest first). Each write is guarded by the rank it was
+    read with so a concurrent move is not overwritten. Returns tasks updated.
+    """
+    tasks = list(backlog_collection.find(
+        {"projectId": project_oid, "status": status}, {"rank": 1}
+    ))
+    tasks.sort(key=lambda t: (t.get("rank") is None, t.get("rank") or "", t["_id"]))
+    ops = [
+        UpdateOne({"_id": task["_id"], "rank": task.get("rank")}, {"$set": {"rank": rank}})
+        for task, rank in zip(tasks, spaced_ranks(len(tasks)))
+        if task.get("rank") != rank
+    ]
+    updated = 0
+    for start in range(0, len(ops), IMPORT_BATCH_SIZE):
+        updated += backlog_collection.bulk_write(ops[start:start + IMPORT_BATCH_SIZE], ordered=False).modified_count
+    return updated
+
+
+def _neighbour_ranks(project_oid, status, task_oid, after_id, before_id):
+    """Ranks just above (after_id) and just below (before_id) the drop position."""
+    ids = [ObjectId(x) for x in (after_id, before_id) if x]
+    if task_oid in ids:
+        raise ValueError("A task cannot be positioned relative to itself")
+    found = {
+        t["_id"]: t.get("rank")
+        for t in backlog_collection.find(
+            {"_id": {"$in": ids}, "projectId": project_oid, "status": status}, {"rank": 1}
+        )
+    }
+    if len(found) != len(ids):
+        raise ValueError("afterId and beforeId must be tasks in the target column")
+
+    column = {"projectId": project_oid, "status": status, "_id": {"$ne": task_oid}}
+    lower = found[ObjectId(after_id)] if after_id else None
+    upper = found[ObjectId(before_id)] if before_id else None
+    if (after_id and lower is None) or (before_id and upper is None):
+        return None  # legacy tasks without ranks; caller rebalances and retries
+    if after_id and not before_id:
+        nxt = backlog_collection.find_one({**column, "rank": {"$gt": lower}}, {"rank": 1}, sort=[("rank", 1)])
+        upper = nxt["rank"] if nxt else None
+    elif before_id and not after_id:
+        prev = backlog_collection.find_one({**column, "rank": {"$lt": upper}}, {"rank": 1}, sort=[("rank", -1)])
+        lower = prev["rank"] if prev else None
+    elif not after_id and not before_id:
+        tail = backlog_collection.find_one({**column, "rank": {"$type": "string"}}, {"rank": 1}, sort=[("rank", -1)])
+        return (tail["rank"] if tail else None), None
+    return lower, upper
+
+
+def _ranks_collide(positions):
+    """
+    No room between the neighbours: concurrent appends can give two tasks the
+    same rank (both take rank_after of one tail). A rebalance separates them.
+    """
+    lower, upper = positions
+    return lower is not None and upper is not None and lower >= upper
+
+
+@app.route("/api/projects/<project_id>/backlog/<task_id>/move", methods=["POST"])
+@require_project_member
+def move_task(project_id, task_id):
+    """
+    Body: { "status": "<target column>",
+            "afterId": "<task shown above the drop>" | null,
+            "beforeId": "<task shown below the drop>" | null }
+    Neither id -> end of the column. Writes exactly one task document.
+    Neighbours with no room between them (equal ranks) trigger a column
+    rebalance; 409 if they still collide afterwards.
+    Optional If-Match precondition, as for update_task.
+    """
+    data = request.json or {}
+    status = (data.get("status") or "").strip()
+    if not status:
+        return jsonify({"error": "status is required"}), 400
+    try:
+        expected_version = _expected_version()
+        project_oid = ObjectId(project_id)
+        task_oid = ObjectId(task_id)
+        positions = _neighbour_ranks(project_oid, status, task_oid, data.get("afterId"), data.get("beforeId"))
+        if positions is None or _ranks_collide(positions):
+            rebalance_column_ranks(project_oid, status)
+            positions = _neighbour_ranks(project_oid, status, task_oid, data.get("afterId"), data.get("beforeId"))
+        if positions is None or _ranks_collide(positions):
+            return jsonify({"error": "The column changed while moving the task; reload and try again"}), 409
+        lower, upper = positions
+        rank = rank_after(lower) if upper is None else rank_between(lower, upper)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except InvalidId:
+        return jsonify({"error": "Invalid task id"}), 400
+
+    update = {"status": status, "rank": rank, "updatedAt": datetime.utcnow()}
+    task = backlog_collection.find_one_and_update(
+        {"_id": task_oid, "projectId": project_oid, **version_filter(expected_version)},
+        {"$set": update, "$inc": {"version": 1}},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if not task:
+        return _task_write_failed(project_id, task_id, expected_version)
+
+    moved_task = {**task, **update, "version": task.get("version", 0) + 1}
+    if task.get("status") != status:
+        _apply_task_stats(project_id, before=task, after=moved_task)
+    if len(rank) > RANK_MAX_LENGTH:
+        queue_rank_rebalance(project_oid, status)
+    _activity(project_id, "task.moved", task_id=task_oid, fromStatus=task.get("status"), status=status)
+    return _task_versioned_response({
+        "message": "Task moved",
+        "task": serialize_task(moved_task),
+    }, moved_task)
+
+
+# -------------------- TIMELINE (Gantt) --------------------
+# The Gantt view asks for its visible date window only. Tasks overlapping the
+# window come from the (projectId, startDate, dueDate) index, already ordered,
+# with bar geometry computed for the zoom level, plus the dependency links
+# whose two ends are both inside the window.
+
+# One Gantt column covers this many days at each zoom level
+TIMELINE_ZOOM_DAYS_PER_COLUMN = {"day": 1, "week": 7, "month": 365.25 / 12}
+TIMELINE_COLUMN_WIDTH = 40  # px, the Gantt's min_column_width
+TIMELINE_MAX_DAYS = 3 * 366
+TIMELINE_FIELDS = ("id", "title", "label", "status", "priority", "assignedTo", "startDate", "dueDate", "progress")
+
+
+def _timeline_bar(task, window_start, window_end, px_per_day):
+    """Bar position relative to the window's left edge; a bar covers its whole due day."""
+    start = max(task["startDate"], window_start)
+    end = min(task["dueDate"], window_end) + timedelta(days=1)
+    return {
+        "left": round((start - window_start).days * px_per_day, 2),
+        "width": round(max(1, (end - start).days) * px_per_day, 2),
+        "clippedStart": task["startDate"] < window_start,
+        "clippedEnd": task["dueDate"] > window_end,
+    }
+
+
+@app.route("/api/projects/<project_id>/timeline", methods=["GET"])
+@require_project_member
+def get_project_timeline(project_id):
+    """
+    Auth required: X-User-Id (must be a project member)
+    Query: from=YYYY-MM-DD&to=YYYY-MM-DD   visible window (required, inclusive)
+           &zoom=day|week|month           default week
+           &columnWidth=40                px per Gantt column
+           &fields=id,title,...           task fields (default TIMELINE_FIELDS)
+    -> { "window": {from, to, zoom, pxPerDay, width},
+         "tasks": [{...fields, "bar": {left, width, clippedStart, clippedEnd}}],
+         "links": [{"source": <dependency id>, "target": <task id>}] }
+    Tasks without both dates cannot be placed and are left out.
+    """
+    if not request.args.get("from") or not request.args.get("to"):
+        return jsonify({"error": "from and to are required"}), 400
+    zoom = request.args.get("zoom", "week")
+    if zoom not in TIMELINE_ZOOM_DAYS_PER_COLUMN:
+        return jsonify({"error": f"zoom must be one of: {', '.join(TIMELINE_ZOOM_DAYS_PER_COLUMN)}"}), 400
+    try:
+        column_width = float(request.args.get("columnWidth", TIMELINE_COLUMN_WIDTH))
+    except ValueError:
+        return jsonify({"error": "columnWidth must be a number"}), 400
+    if column_width <= 0:
+        return jsonify({"error": "columnWidth must be positive"}), 400
+    try:
+        window = _date_range_filter(request.args)
+        task_fields = _parse_task_fields(request.args.get("fields")) or TIMELINE_FIELDS
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    window_start, window_end = window["dueDate"]["$gte"], window["startDate"]["$lte"]
+    if window_end < window_start:
+        return jsonify({"error": "to cannot be before from"}), 400
+    if (window_end - window_start).days >= TIMELINE_MAX_DAYS:
+        return jsonify({"error": f"The window can span at most {TIMELINE_MAX_DAYS} days"}), 400
+
+    px_per_day = column_width / TIMELINE_ZOOM_DAYS_PER_COLUMN[zoom]
+    projection = _task_projection(set(task_fields) | {"startDate", "dueDate", "dependencies"})
+    cursor = read_router.collection(backlog_collection).find({"projectId": ObjectId(project_id), **window}, projection).sort(
+        [("startDate", 1), ("dueDate", 1)]
+    )
+    tasks = list(cursor)
+    in_window = {task["_id"] for task in tasks}
+    links = [
+        {"source": str(dep), "target": str(task["_id"])}
+        for task in tasks
+        for dep in task.get("dependencies", [])
+        if dep in in_window
+    ]
     return jsonify({
-        "message": "Dependency added successfully",
-        "dependencies": [str(dep) for dep in updated_task.get("dependencies", [])]
+        "window": {
+            "from": window_start.date().isoformat(),
+            "to": window_end.date().isoformat(),
+            "zoom": zoom,
+            "pxPerDay": round(px_per_day, 4),
+            "width": round(((window_end - window_start).days + 1) * px_per_day, 2),
+        },
+        "tasks": [
+            {**serialize_task(task, task_fields), "bar": _timeline_bar(task, window_start, window_end, px_per_day)}
+            for task in tasks
+        ],
+        "links": links,
     }), 200
 
 
-@app.route("/api/projects/<project_id>/backlog/<task_id>/dependencies/<dependency_id>", methods=["DELETE"])
+# -------------------- PAGE BOOTSTRAP --------------------
+
+@app.route("/api/projects/<project_id>/bootstrap", methods=["GET"])
+def get_project_bootstrap(project_id):
+    """
+    Auth required: X-User-Id (must be a project member)
+    Everything a board page needs in one response:
+      { "project": {...}, "members": [{id, name, email}], "backlog": [...] }
+    Query: ?include=project,members,backlog (default: all three)
+           &fields=id,title,status,...      (task fields, default: all)
+    The membership check is part of the project query itself, and member
+    names come from the project's embedded `memberProfiles`.
+    """
+    user_id = get_request_user_id()
+    if not user_id:
+        return jsonify({"error": "Missing X-User-Id header"}), 401
+
+    include = {
+        part.strip()
+        for part in request.args.get("include", "project,members,backlog").split(",")
+        if part.strip()
+    }
+    try:
+        project_oid = ObjectId(project_id)
+        task_fields = _parse_task_fields(request.args.get("fields"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception:
+        return jsonify({"error": "Invalid project ID"}), 400
+
+    project = get_projects_collection().find_one({"_id": project_oid, "members": user_id})
+    if not project:
+        return jsonify({"error": "You are not a member of this project"}), 403
+
+    response = {}
+    if "project" in include:
+        response["project"] = serialize_project(project)
+    if "members" in include:
+        profiles = project.get("memberProfiles")
+        if profiles is None:  # not backfilled yet
+            profiles = [
+                member_profile(u)
+                for u in get_users_collection().find({"_id": {"$in": project.get("members", [])}}, MEMBER_PROFILE_PROJECTION)
+            ]
+        response["members"] = [_serialize_member(m) for m in profiles]
+    if "backlog" in include:
+        cursor = backlog_collection.find({"projectId": project_oid}, _task_projection(task_fields))
+        response["backlog"] = [serialize_task(task, task_fields) for task in cursor]
+    return jsonify(response), 200
+
+
+# -------------------- BACKLOG EXPORT / IMPORT --------------------
+
+EXPORT_COLUMNS = [
+    "id", "title", "description", "label", "status", "priority", "assignedTo",
+    "startDate", "dueDate", "progress", "dependencies", "comments",
+]
+EXPORT_BATCH_SIZE = 500
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+
+def serialize_comment(comment):
+    return {
+        "id": str(comment["_id"]),
+        "taskId": str(comment["taskId"]),
+        "author": comment.get("author", ""),
+        "text": comment.get("text", ""),
+        "timestamp": comment["timestamp"].isoformat() if isinstance(comment.get("timestamp"), datetime) else str(comment.get("timestamp", "")),
+    }
+
+
+def _export_batches(project_oid, with_comments):
+    """Yields lists of serialized tasks straight off the cursor, EXPORT_BATCH_SIZE at a time."""
+    cursor = read_router.collection(backlog_collection).find({"projectId": project_oid}).sort("_id", 1).batch_size(
+        EXPORT_BATCH_SIZE
+    )
+    batch = []
+    for task in cursor:
+        batch.append(task)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield _export_serialize_batch(batch, with_comments)
+            batch = []
+    if batch:
+        yield _export_serialize_batch(batch, with_comments)
+
+
+def _export_serialize_batch(tasks, with_comments):
+    comments_by_task = {}
+    if with_comments:
+        # one comments query per batch instead of one per task
+        for comment in read_router.collection(get_comments_collection()).find(
+            {"taskId": {"$in": [t["_id"] for t in tasks]}}
+        ).sort([("taskId", 1), ("timestamp", 1)]):
+            comments_by_task.setdefault(comment["taskId"], []).append(serialize_comment(comment))
+    out = []
+    for task in tasks:
+        item = serialize_task(task)
+        if with_comments:
+            item["comments"] = comments_by_task.get(task["_id"], [])
+        out.append(item)
+    return out
+
+
+@app.route("/api/projects/<project_id>/backlog/export", methods=["GET"])
 @require_project_member
-def remove_dependency(project_id, task_id, dependency_id):
-    # Verify task exists
-    task = backlog_collection.find_one(
-        {"_id": ObjectId(task_id), "projectId": ObjectId(project_id)}
+def export_backlog(project_id):
+    """
+    Streams the whole backlog (with dependencies and, by default, comments).
+    Query: ?format=ndjson|csv&comments=0|1
+    """
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be 'ndjson' or 'csv'"}), 400
+    with_comments = request.args.get("comments", "1") != "0"
+    project_oid = ObjectId(project_id)
+
+    def generate_ndjson():
+        for batch in _export_batches(project_oid, with_comments):
+            yield "".join(json.dumps(item) + "\n" for item in batch)
+
+    def generate_csv():
+        columns = EXPORT_COLUMNS if with_comments else EXPORT_COLUMNS[:-1]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for batch in _export_batches(project_oid, with_comments):
+            for item in batch:
+                item["dependencies"] = ";".join(item["dependencies"])
+                if with_comments:
+                    item["comments"] = json.dumps(item["comments"])
+                writer.writerow([item.get(col, "") for col in columns])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        if buffer.getvalue():
+            yield buffer.getvalue()
+
+    if export_format == "csv":
+        body, mimetype = generate_csv(), "text/csv"
+    else:
+        body, mimetype = generate_ndjson(), "application/x-ndjson"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="backlog-{project_id}.{export_format}"'},
     )
-    if not task:
-        return jsonify({"error": "Task not found"}), 404
-    
-    # Get current dependencies
-    current_deps = task.get("dependencies", [])
-    dep_oid = ObjectId(dependency_id)
-    
-    # Remove dependency
-    new_deps = [d for d in current_deps if d != dep_oid]
-    
-    backlog_collection.update_one(
-        {"_id": ObjectId(task_id)},
-        {
-            "$set": {
-                "dependencies": new_deps,
-                "updatedAt": datetime.utcnow()
+
+
+def _iter_request_lines(stream, chunk_size=64 * 1024):
+    """Decode the request body incrementally into lines (line endings kept)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _iter_import_rows(export_format, stream):
+    lines = _iter_request_lines(stream)
+    if export_format == "csv":
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield ValueError("invalid JSON")
+
+
+def _import_task_row(row, project_oid, member_ids):
+    """Validate one import row -> (task document, external id, dependency refs)."""
+    if isinstance(row, Exception):
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object")
+    for field in ("title", "status", "priority", "startDate", "dueDate"):
+        if not row.get(field):
+            raise ValueError(f"{field} is required")
+    for field in ("title", "status", "priority", "description", "label"):
+        if not isinstance(row.get(field) or "", str):
+            raise ValueError(f"{field} must be a string")
+    if row["status"] not in TASK_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(TASK_STATUSES)}")
+
+    start_date = to_bson_date(row["startDate"])
+    due_date = to_bson_date(row["dueDate"])
+    if not start_date or not due_date:
+        raise ValueError("startDate and dueDate must be valid ISO dates")
+    if due_date < start_date:
+        raise ValueError("dueDate cannot be before startDate")
+
+    assigned_id = None
+    if row.get("assignedTo"):
+        try:
+            assigned_id = ObjectId(row["assignedTo"])
+        except Exception:
+            raise ValueError("assignedTo must be a valid user id")
+        if assigned_id not in member_ids:
+            raise ValueError("assignedTo must be a member of this project")
+
+    progress = _normalize_progress(row.get("progress") if row.get("progress") != "" else None)
+
+    refs = row.get("dependencies") or []
+    if isinstance(refs, str):
+        refs = [ref.strip() for ref in refs.split(";") if ref.strip()]
+    if not isinstance(refs, list):
+        raise ValueError("dependencies must be an array of task ids")
+
+    now = datetime.utcnow()
+    task = {
+        "_id": ObjectId(),
+        "title": row["title"],
+        "description": row.get("description") or "",
+        "label": row.get("label") or "",
+        "status": row["status"],
+        "priority": row["priority"],
+        "assignedTo": assigned_id,
+        "startDate": start_date,
+        "dueDate": due_date,
+        "progress": progress,
+        "dependencies": [],
+        "version": 1,
+        "createdAt": now,
+        "updatedAt": now,
+        "projectId": project_oid,
+    }
+    return task, str(row.get("id") or ""), [str(ref) for ref in refs]
+
+
+@app.route("/api/projects/<project_id>/backlog/import", methods=["POST"])
+@require_project_member
+def import_backlog(project_id):
+    """
+    Streams an NDJSON or CSV upload (same columns as the export) into the backlog.
+    Query: ?format=ndjson|csv
+    Rows are validated and written IMPORT_BATCH_SIZE at a time with insert_many.
+    A dependency may name another row's "id" in the same file (in any order) or
+    an existing task in this project; a row of the file wins over an existing
+    task with the same id, so re-importing an export links the new copies.
+    Rows that fail validation are skipped and reported. Memory is bounded by
+    the batch: each inserted task carries its run id and external id
+    (importId / importKey) and its unresolved refs (importPending), so refs
+    are looked up in the database and the fields are dropped at the end.
+    """
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be 'ndjson' or 'csv'"}), 400
+
+    project_oid = ObjectId(project_id)
+    project = get_projects_collection().find_one({"_id": project_oid}, {"members": 1})
+    member_ids = set(project.get("members", []))
+
+    import_id = ObjectId()
+    column_ranks = {}    # status -> rank generator appending after that column's tail
+    long_rank_columns = set()
+    errors = []
+    error_count = 0
+    imported = 0
+    unresolved = 0
+
+    def imported_ids(refs):
+        """External id -> task id for rows of this file already inserted (latest wins)."""
+        found = {}
+        if refs:
+            for task in backlog_collection.find(
+                {"importId": import_id, "importKey": {"$in": list(refs)}}, {"importKey": 1}
+            ).sort("_id", 1):
+                found[task["importKey"]] = task["_id"]
+        return found
+
+    def flush(batch):
+        nonlocal imported, unresolved
+        # rows read so far are final; a later row may still claim a missing ref
+        in_batch = {task["importKey"]: task["_id"] for task, _ in batch if "importKey" in task}
+        earlier = imported_ids({ref for _, refs in batch for ref in refs if ref not in in_batch})
+        docs = []
+        stats_inc = {}
+        for task, refs in batch:
+            pending = []
+            for ref in refs:
+                dep_oid = in_batch.get(ref) or earlier.get(ref)
+                if not dep_oid:
+                    pending.append(ref)
+                elif dep_oid == task["_id"]:
+                    unresolved += 1
+                elif dep_oid not in task["dependencies"]:
+                    task["dependencies"].append(dep_oid)
+            if pending:
+                task["importPending"] = pending
+            if task["status"] not in column_ranks:
+                column_ranks[task["status"]] = rank_sequence(_column_tail_rank(project_oid, task["status"]))
+            task["rank"] = next(column_ranks[task["status"]])
+            if len(task["rank"]) > RANK_MAX_LENGTH:
+                long_rank_columns.add(task["status"])
+            docs.append(task)
+            for key, value in _task_stats_inc(task, 1).items():
+                stats_inc[key] = stats_inc.get(key, 0) + value
+        if docs:
+            backlog_collection.insert_many(docs, ordered=False)
+            _write_stats_inc(project_id, stats_inc)
+            imported += len(docs)
+
+    def resolve_pending(chunk):
+        nonlocal unresolved
+        refs = {ref for task in chunk for ref in task["importPending"]}
+        rows = imported_ids(refs)
+        candidates = {ObjectId(ref) for ref in refs if ref not in rows and ObjectId.is_valid(ref)}
+        existing = set()
+        if candidates:
+            existing = {
+                t["_id"] for t in backlog_collection.find(
+                    {"_id": {"$in": list(candidates)}, "projectId": project_oid}, {"_id": 1}
+                )
             }
+        ops = []
+        for task in chunk:
+            deps = []
+            for ref in task["importPending"]:
+                if ref in rows:
+                    dep_oid = rows[ref]
+                elif ObjectId.is_valid(ref) and ObjectId(ref) in existing:
+                    dep_oid = ObjectId(ref)
+                else:
+                    dep_oid = None
+                if not dep_oid or dep_oid == task["_id"]:
+                    unresolved += 1
+                elif dep_oid not in deps:
+                    deps.append(dep_oid)
+            update = {"$unset": {"importPending": ""}}
+            if deps:
+                update["$addToSet"] = {"dependencies": {"$each": deps}}
+            ops.append(UpdateOne({"_id": task["_id"]}, update))
+        backlog_collection.bulk_write(ops, ordered=False)
+
+    batch = []
+    for row_number, row in enumerate(_iter_import_rows(export_format, request.stream), start=1):
+        try:
+            task, external_id, refs = _import_task_row(row, project_oid, member_ids)
+        except ValueError as exc:
+            error_count += 1
+            if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                errors.append({"row": row_number, "error": str(exc)})
+            continue
+        task["importId"] = import_id
+        if external_id:
+            task["importKey"] = external_id
+        batch.append((task, refs))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    # Dependencies on rows that appeared later in the file, else on existing tasks
+    chunk = []
+    pending = backlog_collection.find(
+        {"importId": import_id, "importPending": {"$exists": True}}, {"importPending": 1}
+    ).batch_size(IMPORT_BATCH_SIZE)
+    for task in pending:
+        chunk.append(task)
+        if len(chunk) >= IMPORT_BATCH_SIZE:
+            resolve_pending(chunk)
+            chunk = []
+    if chunk:
+        resolve_pending(chunk)
+    backlog_collection.update_many({"importId": import_id}, {"$unset": {"importId": "", "importKey": ""}})
+
+    for status in long_rank_columns:
+        queue_rank_rebalance(project_oid, status)
+    if imported:
+        _activity(project_id, "tasks.imported", count=imported)
+    return jsonify({
+        "message": f"Imported {imported} task(s).",
+        "imported": imported,
+        "errorCount": error_count,
+        "errors": errors,
+        "unresolvedDependencies": unresolved,
+    }), 200 if imported or not error_count else 400
+
+
+# -------------------- SEARCH --------------------
+
+SEARCH_MAX_RESULTS = 1000
+# One scale for both indexes: textScore already multiplies each field's match
+# by its weight, so a title hit must keep its lead over a comment hit
+SEARCH_SCORE_SCALE = max(*TASK_TEXT_WEIGHTS.values(), *COMMENT_TEXT_WEIGHTS.values())
+
+
+def _normalize_scores(hits):
+    """
+    Scale textScores by SEARCH_SCORE_SCALE so that a hit in the heaviest
+    field scores about 1. Every source is divided by the same constant, so
+    merged results keep the field weights' order (title > label > comment
+    text) and a weak match stays weak however few hits its source has.
+    """
+    for hit in hits:
+        hit["score"] = hit["score"] / SEARCH_SCORE_SCALE
+    return hits
+
+
+@app.route("/api/projects/<project_id>/search", methods=["GET"])
+@require_project_member
+def search_project(project_id):
+    """
+    Ranked full-text search over task title/description/label and comment text.
+    Query: ?q=<terms>&scope=tasks,comments&page=1&limit=20
+    Both collections use a text index prefixed by projectId, so a search only
+    ever touches the requested project's index entries. Scores from both
+    are divided by the same constant, then merged.
+    """
+    terms = (request.args.get("q") or "").strip()
+    if not terms:
+        return jsonify({"error": "q is required"}), 400
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+        limit = min(max(int(request.args.get("limit", 20)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "page and limit must be integers"}), 400
+    scope = {
+        part.strip()
+        for part in request.args.get("scope", "tasks,comments").split(",")
+        if part.strip()
+    }
+
+    # Each source only needs its top page*limit hits to fill the merged page
+    window = min(page * limit, SEARCH_MAX_RESULTS)
+    query = {"projectId": ObjectId(project_id), "$text": {"$search": terms}}
+    score = {"score": {"$meta": "textScore"}}
+    hits = []
+    tasks = read_router.collection(backlog_collection)
+
+    if "tasks" in scope:
+        cursor = tasks.find(
+            query, {**score, "title": 1, "status": 1, "label": 1, "priority": 1}
+        ).sort([("score", {"$meta": "textScore"})]).limit(window + 1)
+        task_hits = []
+        for task in cursor:
+            task_hits.append({
+                "type": "task",
+                "id": str(task["_id"]),
+                "taskId": str(task["_id"]),
+                "title": task.get("title", ""),
+                "status": task.get("status", ""),
+                "label": task.get("label", ""),
+                "priority": task.get("priority", ""),
+                "score": task["score"],
+            })
+        hits.extend(_normalize_scores(task_hits))
+
+    if "comments" in scope:
+        cursor = read_router.collection(get_comments_collection()).find(
+            query, {**score, "taskId": 1, "author": 1, "text": 1, "timestamp": 1}
+        ).sort([("score", {"$meta": "textScore"})]).limit(window + 1)
+        comment_hits = []
+        for comment in cursor:
+            comment_hits.append({
+                "type": "comment",
+                "id": str(comment["_id"]),
+                "taskId": str(comment["taskId"]),
+                "author": comment.get("author", ""),
+                "text": comment.get("text", ""),
+                "timestamp": comment["timestamp"].isoformat() if isinstance(comment.get("timestamp"), datetime) else str(comment.get("timestamp", "")),
+                "score": comment["score"],
+            })
+        hits.extend(_normalize_scores(comment_hits))
+
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    start = (page - 1) * limit
+    results = hits[start:start + limit]
+    has_more = len(hits) > start + limit and start + limit < SEARCH_MAX_RESULTS
+
+    # Label comment hits with their task title (one query for the whole page)
+    comment_task_ids = {ObjectId(hit["taskId"]) for hit in results if hit["type"] == "comment"}
+    if comment_task_ids:
+        titles = {
+            str(t["_id"]): t.get("title", "")
+            for t in tasks.find({"_id": {"$in": list(comment_task_ids)}}, {"title": 1})
         }
+        for hit in results:
+            if hit["type"] == "comment":
+                hit["taskTitle"] = titles.get(hit["taskId"], "")
+
+    return jsonify({
+        "results": results,
+        "page": page,
+        "limit": limit,
+        "hasMore": has_more,
+    }), 200
+
+
+# -------------------- MY TASKS (across projects) --------------------
+
+def _encode_task_cursor(task):
+    return f'{task["dueDate"].isoformat()}|{task["_id"]}'
+
+
+def _decode_task_cursor(cursor):
+    try:
+        due_part, id_part = cursor.split("|", 1)
+        return datetime.fromisoformat(due_part), ObjectId(id_part)
+    except Exception:
+        raise ValueError("cursor is invalid")
+
+
+@app.route("/api/users/me/tasks", methods=["GET"])
+def list_my_tasks():
+    """
+    Auth required: X-User-Id
+    Tasks assigned to the logged-in user across every project they belong to,
+    ordered by dueDate. Served by the (assignedTo, dueDate, _id) index.
+    Query: ?status=To Do,In Progress&dueFrom=YYYY-MM-DD&dueTo=YYYY-MM-DD
+           &limit=50&cursor=<nextCursor from the previous page>
+    Tasks without a BSON dueDate (not yet migrated) are not listed.
+    """
+    user_id = get_request_user_id()
+    if not user_id:
+        return jsonify({"error": "Missing X-User-Id header"}), 401
+
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), 200)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    due = {"$type": "date"}
+    due_from = request.args.get("dueFrom")
+    due_to = request.args.get("dueTo")
+    if due_from:
+        due["$gte"] = to_bson_date(due_from)
+        if not due["$gte"]:
+            return jsonify({"error": "dueFrom must be a valid ISO date"}), 400
+    if due_to:
+        due["$lte"] = to_bson_date(due_to)
+        if not due["$lte"]:
+            return jsonify({"error": "dueTo must be a valid ISO date"}), 400
+
+    project_names = {
+        p["_id"]: p.get("name", "")
+        for p in get_projects_collection().find({"members": user_id}, {"name": 1})
+    }
+    if not project_names:
+        return jsonify({"tasks": [], "nextCursor": None}), 200
+
+    query = {
+        "assignedTo": user_id,
+        "dueDate": due,
+        "projectId": {"$in": list(project_names)},
+    }
+    statuses = [st.strip() for st in request.args.get("status", "").split(",") if st.strip()]
+    if statuses:
+        query["status"] = {"$in": statuses}
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            after_due, after_id = _decode_task_cursor(cursor)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        query["$or"] = [
+            {"dueDate": {"$gt": after_due}},
+            {"dueDate": after_due, "_id": {"$gt": after_id}},
+        ]
+
+    page = list(
+        read_router.collection(backlog_collection).find(query)
+        .sort([("dueDate", 1), ("_id", 1)])
+        .limit(limit + 1)
     )
-    
-    # Return updated task with dependencies as strings
-    updated_task = backlog_collection.find_one({"_id": ObjectId(task_id)})
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    tasks = []
+    for task in page:
+        item = serialize_task(task)
+        item["projectName"] = project_names.get(task["projectId"], "")
+        tasks.append(item)
+
     return jsonify({
-        "message": "Dependency removed successfully",
-        "dependencies": [str(dep) for dep in updated_task.get("dependencies", [])]
+        "tasks": tasks,
+        "nextCursor": _encode_task_cursor(page[-1]) if has_more else None,
     }), 200
 
 
@@ -1089,28 +3148,36 @@ def remove_dependency(project_id, task_id, dependency_id):
 #     return jsonify({"message": "Task deleted successfully"})
 
 # -------------------- GET USERS ROUTE -------------------- For getting user emails to change ownership
+USER_SUMMARY_PROJECTION = {"_id": 1, "email": 1, "firstName": 1, "lastName": 1}
+
+
+def serialize_user_summary(user):
+    return {
+        "id": str(user["_id"]),
+        "email": user["email"],
+        "name": f"{user.get('firstName','')} {user.get('lastName','')}".strip()
+    }
+
+
 @app.route('/api/users', methods=['GET'])
 def get_users_list():    
     try:
         users_collection = get_users_collection()
-        users = []
-        for user in users_collection.find({}, {"_id": 1, "email": 1, "firstName": 1, "lastName": 1}):
-            users.append({
-                "id": str(user["_id"]),
-                "email": user["email"],
-                "name": f"{user.get('firstName','')} {user.get('lastName','')}".strip()
-            })
+        users = [
+            serialize_user_summary(user)
+            for user in read_router.collection(users_collection).find({}, USER_SUMMARY_PROJECTION)
+        ]
         return jsonify(users), 200
 
     except Exception as e:
-        app.logger.error(f"Error getting users: {e}")
+        app.logger.exception("Error getting users: %s", e)
         return jsonify({"error": "An error occurred while getting users."}), 500
 # -------------------- USER AUTH ROUTES --------------------
 
 @app.route('/api/users', methods=['POST'])
 def create_user():
     data = request.json
-    app.logger.info(f"Received signup data: {data}")
+    app.logger.info("Signup request", extra={"fields": data, "sample": True})
 
     if not data.get('firstName') or not data.get('lastName') or not data.get('email') or not data.get('password'):
         app.logger.error("Missing required fields.")
@@ -1124,7 +3191,6 @@ def create_user():
             return jsonify({"error": "An account with this email already exists."}), 409
         
         hashed_password = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt())
-        app.logger.info(f"Using collection: {str(get_users_collection())}")
 
         user = {
             "firstName": data["firstName"],
@@ -1133,18 +3199,18 @@ def create_user():
             "password": hashed_password,
         }
         result = get_users_collection().insert_one(user)
-        app.logger.info(f"User created with ID: {result.inserted_id}")
+        app.logger.info("User created", extra={"fields": {"userId": str(result.inserted_id)}})
 
         return jsonify({"message": "User created successfully", "id": str(result.inserted_id)}), 201
     except Exception as e:
-        app.logger.error(f"Error during signup: {e}")
+        app.logger.exception("Error during signup: %s", e)
         return jsonify({"error": "An error occurred during signup."}), 500
 
 
 @app.route('/api/users/login', methods=['POST'])
 def login_user():
     data = request.json
-    app.logger.info(f"Received login data: {data}")
+    app.logger.info("Login request", extra={"fields": data, "sample": True})
 
     if not data.get('email') or not data.get('password'):
         app.logger.error("Missing email or password.")
@@ -1165,7 +3231,7 @@ def login_user():
         else:
             return jsonify({"error": "Invalid email or password"}), 401
     except Exception as e:
-        app.logger.error(f"Error during login: {e}")
+        app.logger.exception("Error during login: %s", e)
         return jsonify({"error": "An error occurred during login."}), 500
 
 # -------------------- COMMENT ROUTES --------------------
@@ -1211,48 +3277,341 @@ def login_user():
 @app.route('/api/projects/<project_id>/backlog/<task_id>/comments', methods=['GET'])
 @require_project_member
 def get_comments(project_id, task_id):
-    comments = []
-    for comment in get_comments_collection().find({"taskId": ObjectId(task_id)}).sort("timestamp", 1):
-        comments.append({
-            "id": str(comment["_id"]),
-            "taskId": str(comment["taskId"]),
-            "author": comment["author"],
-            "text": comment["text"],
-            "timestamp": comment["timestamp"].isoformat() if isinstance(comment["timestamp"], datetime) else str(comment["timestamp"])
-        })
+    comments = [
+        serialize_comment(comment)
+        for comment in get_comments_collection().find({"taskId": ObjectId(task_id)}).sort("timestamp", 1)
+    ]
     return jsonify(comments)
 
 @app.route('/api/projects/<project_id>/backlog/<task_id>/comments', methods=['POST'])
 @require_project_member
 def add_comment(project_id, task_id):
-    data = request.json
-    text = data.get("text")
-    if not text:
-        return jsonify({"error": "Comment text is required"}), 400
+    try:
+        comment = build_comment(request.json, project_id, task_id)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    # Counter first: it doubles as the task-exists check, and a failed insert
+    # afterwards only leaves the count high until the next backfill.
+    counted = backlog_collection.update_one(
+        {"_id": comment["taskId"], "projectId": comment["projectId"]},
+        comment_counter_update(comment),
+    )
+    if not counted.matched_count:
+        return jsonify({"error": "Task not found"}), 404
+    result = get_comments_collection().insert_one(comment)
+    comment["_id"] = result.inserted_id
+    _activity(project_id, "comment.added", task_id=task_id, commentId=str(result.inserted_id))
+    return jsonify(serialize_comment(comment)), 201
+
+
+def comment_counter_update(comment):
+    """Keeps the task's commentCount / lastCommentAt current (no version bump: not a task edit)."""
+    return {"$inc": {"commentCount": 1}, "$max": {"lastCommentAt": comment["timestamp"]}}
 
-    comment = {
+
+def rebuild_comment_counts(project_ids=None):
+    """
+    Backfill commentCount / lastCommentAt from task_comments with one
+    aggregation that $merges straight into backlog_items. Tasks without
+    comments are left without the fields (serialized as 0 / null).
+    """
+    pipeline = []
+    if project_ids is not None:
+        pipeline.append({"$match": {"projectId": {"$in": [ObjectId(pid) for pid in project_ids]}}})
+    pipeline += [
+        {"$group": {"_id": "$taskId", "commentCount": {"$sum": 1}, "lastCommentAt": {"$max": "$timestamp"}}},
+        {"$merge": {
+            "into": backlog_collection.name,
+            "on": "_id",
+            "whenMatched": [{"$set": {
+                "commentCount": "$$new.commentCount",
+                "lastCommentAt": "$$new.lastCommentAt",
+            }}],
+            "whenNotMatched": "discard",
+        }},
+    ]
+    get_comments_collection().aggregate(pipeline)
+
+
+def build_comment(data, project_id, task_id):
+    text = (data or {}).get("text")
+    if not text:
+        raise ValueError("Comment text is required")
+    return {
         "taskId": ObjectId(task_id),
+        "projectId": ObjectId(project_id),
         "author": data.get("author", "Anonymous"),
         "text": text,
         "timestamp": datetime.utcnow()
     }
-    result = get_comments_collection().insert_one(comment)
 
-    response_comment = {
-        "id": str(result.inserted_id),
-        "taskId": str(comment["taskId"]),
-        "author": comment["author"],
-        "text": comment["text"],
-        "timestamp": comment["timestamp"].isoformat()
+# -------------------- TASK ATTACHMENTS --------------------
+# File bytes go to the `attachments` GridFS bucket; `task_attachments` keeps
+# one metadata document per file (same _id), indexed by task, so listings
+# never read chunks. Uploads are the raw request body (not multipart), copied
+# into GridFS one chunk at a time, so a worker holds at most one chunk of the
+# file. A project's usage is reserved in project_stats.attachmentBytes from
+# Content-Length before any byte is stored, so concurrent uploads cannot
+# overshoot ATTACHMENT_PROJECT_QUOTA_BYTES. The metadata document is written
+# first, marked `pending` until the last chunk is stored, so a stats rebuild
+# in the meantime still counts the reservation. Pending files are not listed
+# or served.
+
+ATTACHMENT_CHUNK_SIZE = 255 * 1024  # GridFS default chunk size
+
+
+def _attachment_filename(raw):
+    name = os.path.basename((raw or "").replace("\\", "/")).strip()
+    name = "".join(ch for ch in name if ch.isprintable())[:255]
+    return name or "attachment"
+
+
+def _reserve_attachment_bytes(project_oid, size):
+    """Atomically add `size` to the project's usage unless that would pass the quota."""
+    quota = app.config['ATTACHMENT_PROJECT_QUOTA_BYTES']
+    if size > quota:
+        return False
+    within_quota = {"_id": project_oid, "$or": [
+        {"attachmentBytes": {"$lte": quota - size}},
+        {"attachmentBytes": {"$exists": False}},
+    ]}
+    reserve = {"$inc": {"attachmentBytes": size}}
+    if get_stats_collection().update_one(within_quota, reserve).matched_count:
+        return True
+    if get_stats_collection().find_one({"_id": project_oid}, {"_id": 1}):
+        return False  # over quota
+    # no stats document yet (project predates stats): build it, then retry once
+    rebuild_project_stats([project_oid])
+    return bool(get_stats_collection().update_one(within_quota, reserve).matched_count)
+
+
+def _release_attachment_bytes(project_oid, size):
+    get_stats_collection().update_one({"_id": project_oid}, {"$inc": {"attachmentBytes": -size}})
+
+
+def _delete_attachments(query):
+    """Remove matching attachments (metadata first, then file) and release their quota. Returns the count."""
+    attachments = get_attachments_collection()
+    bucket = get_attachments_bucket()
+    deleted = 0
+    for doc in list(attachments.find(query, {"_id": 1})):
+        # claim each one, so a concurrent delete cannot release the bytes twice
+        claimed = attachments.find_one_and_delete({"_id": doc["_id"]})
+        if not claimed:
+            continue
+        try:
+            bucket.delete(claimed["_id"])
+        except NoFile:
+            pass
+        _release_attachment_bytes(claimed["projectId"], claimed.get("length", 0))
+        deleted += 1
+    return deleted
+
+
+def _serialize_attachment(doc):
+    return {
+        "id": str(doc["_id"]),
+        "taskId": str(doc["taskId"]),
+        "filename": doc.get("filename", ""),
+        "contentType": doc.get("contentType", "application/octet-stream"),
+        "length": doc.get("length", 0),
+        "sha256": doc.get("sha256"),
+        "uploadedBy": str(doc["uploadedBy"]) if doc.get("uploadedBy") else None,
+        "uploadedAt": doc["uploadedAt"].isoformat() if isinstance(doc.get("uploadedAt"), datetime) else None,
     }
-    return jsonify(response_comment), 201
+
+
+def _iter_attachment(grid_out, start, stop):
+    """Bytes [start, stop) of a GridFS file, one chunk at a time."""
+    try:
+        grid_out.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = grid_out.read(min(ATTACHMENT_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        grid_out.close()
+
+
+@app.route("/api/projects/<project_id>/backlog/<task_id>/attachments", methods=["GET"])
+@require_project_member
+def list_attachments(project_id, task_id):
+    try:
+        task_oid = ObjectId(task_id)
+    except InvalidId:
+        return jsonify({"error": "Task not found"}), 404
+    cursor = get_attachments_collection().find(
+        {"taskId": task_oid, "projectId": ObjectId(project_id), "pending": {"$exists": False}}
+    ).sort("uploadedAt", 1)
+    return jsonify([_serialize_attachment(doc) for doc in cursor]), 200
+
+
+@app.route("/api/projects/<project_id>/backlog/<task_id>/attachments", methods=["POST"])
+@require_project_member
+def upload_attachment(project_id, task_id):
+    """
+    Body: the raw file bytes (not multipart); Content-Type becomes the file's type.
+    Query: ?filename=<name>
+    Content-Length is required (411), and is checked against
+    ATTACHMENT_MAX_BYTES and the project quota (413) before anything is stored.
+    """
+    size = request.content_length
+    if size is None:
+        return jsonify({"error": "Content-Length is required"}), 411
+    if size > app.config['ATTACHMENT_MAX_BYTES']:
+        return jsonify({"error": f"Attachments are limited to {app.config['ATTACHMENT_MAX_BYTES']} bytes"}), 413
+    try:
+        project_oid, task_oid = ObjectId(project_id), ObjectId(task_id)
+    except Exception:
+        return jsonify({"error": "Task not found"}), 404
+    if not backlog_collection.find_one({"_id": task_oid, "projectId": project_oid}, {"_id": 1}):
+        return jsonify({"error": "Task not found"}), 404
+    filename = _attachment_filename(request.args.get("filename"))
+    content_type = request.mimetype or "application/octet-stream"
+    upload = get_attachments_bucket().open_upload_stream(
+        filename,
+        chunk_size_bytes=ATTACHMENT_CHUNK_SIZE,
+        metadata={"taskId": task_oid, "projectId": project_oid, "contentType": content_type},
+    )
+    attachment = {
+        "_id": upload._id,
+        "taskId": task_oid,
+        "projectId": project_oid,
+        "filename": filename,
+        "contentType": content_type,
+        "length": size,
+        "uploadedBy": get_request_user_id(),
+        "uploadedAt": datetime.utcnow(),
+        "pending": True,
+    }
+    # metadata before the reservation: a rebuild in between over-counts, never under-counts
+    attachments = get_attachments_collection()
+    attachments.insert_one(attachment)
+    if not _reserve_attachment_bytes(project_oid, size):
+        attachments.delete_one({"_id": upload._id})
+        return jsonify({
+            "error": "Project attachment quota exceeded",
+            "quotaBytes": app.config['ATTACHMENT_PROJECT_QUOTA_BYTES'],
+        }), 413
+
+    digest = hashlib.sha256()
+    received = 0
+    try:
+        while True:
+            chunk = request.stream.read(ATTACHMENT_CHUNK_SIZE)
+            if not chunk:
+                break
+            received += len(chunk)
+            digest.update(chunk)
+            upload.write(chunk)
+        if received != size:
+            raise ValueError("Upload ended before Content-Length bytes were received")
+        upload.close()
+    except Exception as exc:
+        upload.abort()
+        # a task delete may have claimed the pending document (and released the bytes) already
+        if attachments.find_one_and_delete({"_id": upload._id}):
+            _release_attachment_bytes(project_oid, size)
+        if isinstance(exc, ValueError):
+            return jsonify({"error": str(exc)}), 400
+        raise
+
+    del attachment["pending"]
+    attachment["sha256"] = digest.hexdigest()
+    completed = attachments.update_one(
+        {"_id": upload._id, "pending": True},
+        {"$set": {"sha256": attachment["sha256"]}, "$unset": {"pending": ""}},
+    )
+    if not completed.matched_count:
+        # the task was deleted mid-upload; its cleanup released the bytes
+        get_attachments_bucket().delete(upload._id)
+        return jsonify({"error": "Task not found"}), 404
+    _activity(project_id, "attachment.added", task_id=task_id, attachmentId=str(upload._id), filename=filename)
+    return jsonify(_serialize_attachment(attachment)), 201
+
+
+@app.route("/api/projects/<project_id>/backlog/<task_id>/attachments/<attachment_id>", methods=["GET"])
+@require_project_member
+def download_attachment(project_id, task_id, attachment_id):
+    """
+    Streams the file. Supports a single byte range (206 / 416), If-Range and
+    If-None-Match against the content's sha256 ETag.
+    """
+    try:
+        attachment_oid, task_oid = ObjectId(attachment_id), ObjectId(task_id)
+    except InvalidId:
+        return jsonify({"error": "Attachment not found"}), 404
+    meta = get_attachments_collection().find_one(
+        {"_id": attachment_oid, "taskId": task_oid, "projectId": ObjectId(project_id), "pending": {"$exists": False}}
+    )
+    if not meta:
+        return jsonify({"error": "Attachment not found"}), 404
+
+    etag, length = meta["sha256"], meta["length"]
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    byte_range = request.range
+    if byte_range is not None and (len(byte_range.ranges) != 1 or
+                                   (request.headers.get("If-Range") and request.if_range.etag != etag)):
+        byte_range = None  # multipart/byteranges is not supported; a stale If-Range gets the whole file
+    start, stop, status = 0, length, 200
+    if byte_range is not None:
+        bounds = byte_range.range_for_length(length)
+        if bounds is None:
+            response = Response(status=416)
+            response.headers["Content-Range"] = f"bytes */{length}"
+            return response
+        (start, stop), status = bounds, 206
+
+    try:
+        grid_out = get_attachments_bucket().open_download_stream(attachment_oid)
+    except NoFile:
+        return jsonify({"error": "Attachment not found"}), 404
+    # direct_passthrough: the body goes out as stored (never recompressed, so ranges stay valid)
+    response = Response(
+        _iter_attachment(grid_out, start, stop),
+        status=status,
+        mimetype=meta.get("contentType", "application/octet-stream"),
+        direct_passthrough=True,
+    )
+    response.content_length = stop - start
+    if status == 206:
+        response.content_range = ContentRange("bytes", start, stop, length)
+    response.accept_ranges = "bytes"
+    response.set_etag(etag)
+    response.cache_control.private = True
+    filename = meta.get("filename", "attachment")
+    fallback = filename.encode("ascii", "ignore").decode("ascii").replace('"', "") or "attachment"
+    response.headers["Content-Disposition"] = f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+    return response
+
+
+@app.route("/api/projects/<project_id>/backlog/<task_id>/attachments/<attachment_id>", methods=["DELETE"])
+@require_project_member
+def delete_attachment(project_id, task_id, attachment_id):
+    try:
+        attachment_oid, task_oid = ObjectId(attachment_id), ObjectId(task_id)
+    except InvalidId:
+        return jsonify({"error": "Attachment not found"}), 404
+    query = {"_id": attachment_oid, "taskId": task_oid, "projectId": ObjectId(project_id), "pending": {"$exists": False}}
+    if not _delete_attachments(query):
+        return jsonify({"error": "Attachment not found"}), 404
+    _activity(project_id, "attachment.deleted", task_id=task_id, attachmentId=attachment_id)
+    return jsonify({"message": "Attachment deleted"}), 200
+
 
 # -------------------- PROFILE ROUTES --------------------
 
 @app.route('/api/users/<user_id>', methods=['PUT'])
 def update_user_profile(user_id):
     data = request.json
-    app.logger.info(f"Received profile update data for user {user_id}: {data}")
+    app.logger.info("Profile update request", extra={"fields": {"userId": user_id, **(data or {})}, "sample": True})
 
     # Check if the required fields are provided
     if not data.get('firstName') or not data.get('lastName') or not data.get('email'):
@@ -1265,7 +3624,7 @@ def update_user_profile(user_id):
         # Check if user exists
         user = users_collection.find_one({"_id": ObjectId(user_id)})
         if not user:
-            app.logger.error(f"User with ID {user_id} not found.")
+            app.logger.warning("User not found", extra={"fields": {"userId": user_id}})
             return jsonify({"error": "User not found"}), 404
 
         # Check if email is being changed and if the new email already exists
@@ -1295,7 +3654,12 @@ def update_user_profile(user_id):
             app.logger.warning("No changes were made to the user profile.")
             return jsonify({"error": "No changes were made"}), 400
 
-        app.logger.info(f"User profile updated successfully for user {user_id}")
+        if any(update_data[key] != user.get(key) for key in ("firstName", "lastName", "email")):
+            updated_user = {**user, **update_data}
+            for collection in (get_projects_collection(), get_archived_projects_collection()):
+                _refresh_member_profile({"members": user["_id"]}, updated_user, collection)
+
+        app.logger.info("User profile updated", extra={"fields": {"userId": user_id}})
         return jsonify({"message": "Profile updated successfully", "user": {
             "id": user_id,
             "firstName": data["firstName"],
@@ -1305,7 +3669,7 @@ def update_user_profile(user_id):
         }}), 200
 
     except Exception as e:
-        app.logger.error(f"Error during profile update: {e}")
+        app.logger.exception("Error during profile update: %s", e)
         return jsonify({"error": "An error occurred during profile update."}), 500
 
 # -------------------- SERVER RUN --------------------
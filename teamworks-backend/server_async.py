@@ -0,0 +1,410 @@
+# server_async.py
+"""
+Optional asyncio serving mode (ASGI).
+
+    pip install -r requirements-async.txt
+    uvicorn server_async:app --host 0.0.0.0 --port $PORT --workers 2
+
+The high-traffic / long-lived routes (dashboard, notification polling, board
+reads and drags, comments, activity long-polls) are served by async Quart views over PyMongo's
+AsyncMongoClient, so an open request costs a coroutine instead of a worker
+thread. Every other route is forwarded to the regular Flask app (server.py)
+through a2wsgi's WSGI adapter, so nothing has to be ported twice. The adapter
+runs Flask on a pool of ASYNC_WSGI_THREADS threads (default GUNICORN_THREADS,
+else 16) and streams request bodies into it, so forwarded routes still run in
+parallel like under a gthread worker; past that many in-flight forwarded
+requests they queue for a thread. Validation and serialization helpers are imported from
+server.py; only the database calls differ.
+
+Request ids, rate-limit budgets (not the per-process concurrency cap, which
+is what this mode is meant to lift), CORS and response compression
+(compression.py) apply to both halves. Server-Timing and request profiling
+(profiler.py) do not: they measure the sync PyMongo client and a thread's
+cProfile, so the async views are served without them.
+
+Use connbench.py to compare connection capacity and memory with the sync
+gunicorn workers.
+"""
+import asyncio
+import math
+import os
+import time
+from functools import wraps
+
+import certifi
+from a2wsgi import WSGIMiddleware
+from bson import ObjectId
+from pymongo import AsyncMongoClient, ReturnDocument
+from quart import Quart, g, jsonify, request
+from quart_cors import cors
+from werkzeug.exceptions import HTTPException
+
+from logconfig import access_logger, new_request_id, redact_path, request_id_var
+from model import MONGO_URI, backlog_collection, db
+from model import get_comments_collection, get_notifications_collection, get_projects_collection
+from model import get_activity_collection, get_stats_collection, get_users_collection
+from ranking import RANK_MAX_LENGTH, rank_after
+from fields import parse_if_match
+from ratelimit import MongoBackend
+from server import FRONTEND_URL, INVITATION_PROJECTION, USER_SUMMARY_PROJECTION
+from server import app as flask_app
+from server import activity_log, compressor, rate_limiter, read_router, rebuild_project_stats
+from server import (
+    activity_page, backlog_query, build_comment, build_task_update, comment_counter_update,
+    my_project_stats_pipeline, parse_activity_args, queue_rank_rebalance, reminders_reset, settled_activity,
+    stats_update, task_change_summary, task_stats_delta, version_filter,
+)
+from server import (
+    serialize_activity, serialize_comment, serialize_invitation, serialize_my_project_stats, serialize_notification,
+    serialize_project, serialize_task, serialize_user_project, serialize_user_summary,
+)
+
+if "localhost" in MONGO_URI or "127.0.0.1" in MONGO_URI:
+    async_client = AsyncMongoClient(MONGO_URI)
+else:
+    async_client = AsyncMongoClient(MONGO_URI, tls=True, tlsCAFile=certifi.where())
+adb = async_client[db.name]
+
+WSGI_THREADS = int(os.getenv("ASYNC_WSGI_THREADS", os.getenv("GUNICORN_THREADS", 16)))
+
+# Same collections as model.py, async handles
+projects = adb[get_projects_collection().name]
+backlog = adb[backlog_collection.name]
+users = adb[get_users_collection().name]
+comments = adb[get_comments_collection().name]
+notifications = adb[get_notifications_collection().name]
+stats = adb[get_stats_collection().name]
+activity = adb[get_activity_collection().name]
+
+async_app = cors(
+    Quart(__name__),
+    allow_origin=[FRONTEND_URL, "http://localhost:3000"],
+    allow_credentials=True,
+    expose_headers=["ETag", "X-Request-Id"],
+)
+
+
+# -------------------- Request plumbing --------------------
+
+@async_app.before_request
+async def _start_request():
+    g.request_id = new_request_id(request.headers.get("X-Request-Id"))
+    request_id_var.set(g.request_id)
+    g.started = time.perf_counter()
+    return await _rate_limit()
+
+
+async def _rate_limit():
+    """Same budgets and keys as ratelimit.RateLimiter, minus the in-flight cap."""
+    if not rate_limiter.enabled:
+        return None
+    endpoint = request.endpoint or "unknown"
+    budget_name, budget = rate_limiter.budget_for(endpoint, request.method)
+    ip = rate_limiter.client_ip(request.remote_addr, ",".join(request.headers.getlist("X-Forwarded-For")))
+    client, unverified = rate_limiter.client_key(endpoint, request.headers.get("X-User-Id"), ip)
+    take = rate_limiter.backend.take
+    key = f"{budget_name}|{client}"
+    if isinstance(rate_limiter.backend, MongoBackend):
+        allowed, retry_after = await asyncio.to_thread(take, key, budget)
+    else:
+        allowed, retry_after = take(key, budget)
+    if not allowed:
+        response = jsonify({"error": "Too many requests, please slow down."})
+        response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        return response, 429
+    if unverified:
+        # the user lookup is a blocking (sync client) query
+        await asyncio.to_thread(rate_limiter.verify_user, unverified, ip)
+    return None
+
+
+@async_app.after_request
+async def _compress(response):
+    return await compressor.after_async_request(response, request)
+
+
+@async_app.after_request
+async def _finish_request(response):
+    response.headers["X-Request-Id"] = g.request_id
+    if flask_app.config.get("LOG_ACCESS", True):
+        access_logger.info("%s %s %s", request.method, redact_path(request.path, request.view_args), response.status_code, extra={"fields": {
+            "status": response.status_code,
+            "durationMs": round((time.perf_counter() - g.started) * 1000, 2),
+            "userId": request.headers.get("X-User-Id"),
+            "async": True,
+        }})
+    return response
+
+
+def _request_user_id():
+    uid = request.headers.get("X-User-Id")
+    try:
+        return ObjectId(uid) if uid else None
+    except Exception:
+        return None
+
+
+def _reader(collection):
+    """`collection` with this route's read preference (readprefs.py; endpoint names match server.py)."""
+    return read_router.collection(collection, endpoint=request.endpoint)
+
+
+def require_project_member(fn):
+    @wraps(fn)
+    async def wrapper(project_id, *args, **kwargs):
+        user_id = _request_user_id()
+        if not user_id:
+            return jsonify({"error": "Missing X-User-Id header"}), 401
+        proj = await projects.find_one({"_id": ObjectId(project_id), "members": user_id}, {"_id": 1})
+        if not proj:
+            return jsonify({"error": "You are not a member of this project"}), 403
+        return await fn(project_id, *args, **kwargs)
+
+    return wrapper
+
+
+# -------------------- Routes --------------------
+# View function names match server.py so rate-limit budgets carry over.
+
+@async_app.route("/", methods=["GET"])
+async def home():
+    return jsonify({"message": "Welcome to Teamworks!"})
+
+
+@async_app.route("/api/projects/<user_id>", methods=["GET"])
+async def list_user_projects(user_id):
+    return jsonify([serialize_user_project(p) async for p in projects.find({"members": ObjectId(user_id)})])
+
+
+@async_app.route("/api/project/<project_id>", methods=["GET"])
+@require_project_member
+async def get_project(project_id):
+    p = await projects.find_one({"_id": ObjectId(project_id)})
+    if not p:
+        return jsonify({"error": "Project not found"}), 404
+    return jsonify(serialize_project(p))
+
+
+@async_app.route("/api/users", methods=["GET"])
+async def get_users_list():
+    return jsonify([serialize_user_summary(u) async for u in _reader(users).find({}, USER_SUMMARY_PROJECTION)]), 200
+
+
+@async_app.route("/api/invitations", methods=["GET"])
+async def list_invitations():
+    user_id = _request_user_id()
+    udoc = await users.find_one({"_id": user_id}, {"email": 1}) if user_id else None
+    if not udoc:
+        return jsonify({"error": "Missing X-User-Id header"}), 401
+    email = (udoc.get("email") or "").strip().lower()
+    if not email:
+        return jsonify({"error": "User has no email on file"}), 400
+    results = [
+        inv async for p in projects.find({"pendingInvites.email": email}, INVITATION_PROJECTION)
+        if (inv := serialize_invitation(p, email))
+    ]
+    return jsonify(results), 200
+
+
+@async_app.route("/api/notifications", methods=["GET"])
+async def list_notifications():
+    user_id = _request_user_id()
+    if not user_id:
+        return jsonify({"error": "Missing X-User-Id header"}), 401
+    cursor = notifications.find({"userId": user_id}).sort("createdAt", -1)
+    return jsonify([serialize_notification(n) async for n in cursor]), 200
+
+
+@async_app.route("/api/notifications/<nid>/read", methods=["PATCH"])
+async def mark_notification_read(nid):
+    user_id = _request_user_id()
+    if not user_id:
+        return jsonify({"error": "Missing X-User-Id header"}), 401
+    await notifications.update_one({"_id": ObjectId(nid), "userId": user_id}, {"$set": {"isRead": True}})
+    return jsonify({"message": "Marked read"}), 200
+
+
+@async_app.route("/api/users/me/project-stats", methods=["GET"])
+async def list_my_project_stats():
+    user_id = _request_user_id()
+    if not user_id:
+        return jsonify({"error": "Missing X-User-Id header"}), 401
+    cursor = await _reader(projects).aggregate(my_project_stats_pipeline(user_id))
+    return jsonify([serialize_my_project_stats(p) async for p in cursor]), 200
+
+
+@async_app.route("/api/projects/<project_id>/backlog", methods=["GET"])
+@require_project_member
+async def get_project_backlog(project_id):
+    try:
+        query, sort = backlog_query(project_id, request.args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    cursor = _reader(backlog).find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    return jsonify([serialize_task(task) async for task in cursor])
+
+
+@async_app.route("/api/projects/<project_id>/backlog/<task_id>", methods=["PUT"])
+async def update_task(project_id, task_id):
+    """Same contract as server.update_task (If-Match, 409 on a stale version)."""
+    try:
+        expected_version = parse_if_match(request.headers.get("If-Match"))
+        update = build_task_update(await request.get_json())
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    project_oid = ObjectId(project_id)
+    match = {"_id": ObjectId(task_id), "projectId": project_oid, **version_filter(expected_version)}
+    task = None
+    if "status" in update:
+        # Same two-step write as server.update_task: a new column appends at its tail
+        tail = await backlog.find_one(
+            {"projectId": project_oid, "status": update["status"], "rank": {"$type": "string"}},
+            {"rank": 1}, sort=[("rank", -1)],
+        )
+        rank = rank_after(tail["rank"] if tail else None)
+        task = await backlog.find_one_and_update(
+            {**match, "status": {"$ne": update["status"]}},
+            {"$set": {**update, "rank": rank}, "$inc": {"version": 1}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if task:
+            update["rank"] = rank
+        else:
+            match["status"] = update["status"]
+    if not task:
+        task = await backlog.find_one_and_update(
+            match, {"$set": update, "$inc": {"version": 1}}, return_document=ReturnDocument.BEFORE,
+        )
+    if not task:
+        current = await backlog.find_one(
+            {"_id": ObjectId(task_id), "projectId": ObjectId(project_id)}, {"version": 1}
+        )
+        if not current:
+            return jsonify({"error": "Task not found"}), 404
+        return jsonify({
+            "error": "Task was modified by someone else",
+            "expectedVersion": expected_version,
+            "currentVersion": current.get("version", 0),
+        }), 409
+
+    if len(update.get("rank", "")) > RANK_MAX_LENGTH:
+        await asyncio.to_thread(queue_rank_rebalance, project_oid, update["status"])
+
+    reset = reminders_reset(task, update)
+    if reset:
+        await backlog.update_one(*reset)
+    updated_task = {**task, **update, "version": task.get("version", 0) + 1}
+    written = await stats.update_one(
+        {"_id": ObjectId(project_id)}, stats_update(task_stats_delta(before=task, after=updated_task))
+    )
+    if not written.matched_count:
+        # no stats document yet (project predates stats): rebuild, as server._write_stats does
+        await asyncio.to_thread(rebuild_project_stats, [project_id])
+    # record() only appends to the write-behind buffer, so it is safe on the loop
+    activity_log.record(
+        project_id, "task.updated", actor=_request_user_id(), task_id=task_id, **task_change_summary(task, update)
+    )
+    response = jsonify({
+        "message": "Task updated successfully",
+        "task": serialize_task(updated_task),
+        "version": updated_task["version"],
+    })
+    response.headers["ETag"] = f'"{updated_task["version"]}"'
+    return response, 200
+
+
+@async_app.route("/api/projects/<project_id>/backlog/<task_id>/comments", methods=["GET"])
+@require_project_member
+async def get_comments(project_id, task_id):
+    cursor = comments.find({"taskId": ObjectId(task_id)}).sort("timestamp", 1)
+    return jsonify([serialize_comment(c) async for c in cursor])
+
+
+@async_app.route("/api/projects/<project_id>/backlog/<task_id>/comments", methods=["POST"])
+@require_project_member
+async def add_comment(project_id, task_id):
+    try:
+        comment = build_comment(await request.get_json(), project_id, task_id)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    counted = await backlog.update_one(
+        {"_id": comment["taskId"], "projectId": comment["projectId"]},
+        comment_counter_update(comment),
+    )
+    if not counted.matched_count:
+        return jsonify({"error": "Task not found"}), 404
+    result = await comments.insert_one(comment)
+    comment["_id"] = result.inserted_id
+    activity_log.record(
+        project_id, "comment.added", actor=_request_user_id(), task_id=task_id, commentId=str(result.inserted_id)
+    )
+    return jsonify(serialize_comment(comment)), 201
+
+
+async def _poll_activity(project_oid, since, limit, wait_seconds):
+    """server._poll_activity with an asyncio sleep between the indexed reads."""
+    query = {"projectId": project_oid, "seq": {"$gt": since}}
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        events = settled_activity([e async for e in activity.find(query).sort("seq", 1).limit(limit)], since)
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            return events
+        await asyncio.sleep(min(flask_app.config['ACTIVITY_POLL_INTERVAL'], remaining))
+
+
+@async_app.route("/api/projects/<project_id>/activity", methods=["GET"])
+@require_project_member
+async def get_project_activity(project_id):
+    """Same contract as server.get_project_activity; a `wait` (up to ACTIVITY_MAX_WAIT) holds a coroutine, not a thread."""
+    try:
+        limit, wait, since, before = parse_activity_args(request.args, flask_app.config['ACTIVITY_MAX_WAIT'])
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    project_oid = ObjectId(project_id)
+
+    if since is not None:
+        events = await _poll_activity(project_oid, since, limit, wait)
+        cursor = events[-1]["seq"] if events else since
+        return jsonify({"events": [serialize_activity(e) for e in events], "cursor": cursor}), 200
+
+    query = {"projectId": project_oid}
+    if before is not None:
+        query["seq"] = {"$lt": before}
+    events = [e async for e in activity.find(query).sort("seq", -1).limit(limit + 1)]
+    return jsonify(activity_page(events, limit, before)), 200
+
+
+# -------------------- ASGI entry point --------------------
+
+class Dispatcher:
+    """Routes a request to the async app when it has a matching view, else to Flask."""
+
+    def __init__(self, async_application, wsgi_application):
+        self.async_app = async_application
+        self.fallback = WSGIMiddleware(wsgi_application, workers=WSGI_THREADS)
+        self.urls = async_application.url_map.bind("localhost")
+
+    def _is_async(self, scope):
+        if scope["type"] != "http":
+            return scope["type"] == "lifespan"
+        # CORS preflight stays with flask-cors, which knows every route
+        if scope["method"] == "OPTIONS":
+            return False
+        try:
+            self.urls.match(scope["path"], method=scope["method"])
+        except HTTPException:
+            return False
+        return True
+
+    async def __call__(self, scope, receive, send):
+        if self._is_async(scope):
+            await self.async_app(scope, receive, send)
+        else:
+            await self.fallback(scope, receive, send)
+
+
+app = Dispatcher(async_app, flask_app)
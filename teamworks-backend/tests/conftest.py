@@ -0,0 +1,47 @@
+"""
+Fixtures for tests that drive server.py against a real MongoDB (MONGO_URI, as
+in model.py). They skip when flask / pymongo are missing or the server is
+unreachable, and remove everything they wrote.
+"""
+import pytest
+
+
+@pytest.fixture(scope="session")
+def server():
+    pytest.importorskip("flask")
+    pymongo = pytest.importorskip("pymongo")
+    from model import MONGO_URI  # importing model does no I/O
+
+    try:
+        pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=500).admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip("MongoDB is not reachable")
+    import server
+
+    server.rate_limiter.enabled = False
+    return server
+
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
+
+
+@pytest.fixture
+def project(server):
+    """A throwaway project with one member: {"id", "user"} as strings."""
+    from bson import ObjectId
+
+    users = server.get_users_collection()
+    projects = server.get_projects_collection()
+    user_id = users.insert_one({"firstName": "Test", "lastName": "User", "email": f"{ObjectId()}@example.test"}).inserted_id
+    project_id = projects.insert_one({"name": "test project", "owner": user_id, "members": [user_id]}).inserted_id
+    server.get_stats_collection().insert_one(server._empty_project_stats(project_id, member_count=1))
+    yield {"id": str(project_id), "user": str(user_id)}
+    task_ids = [t["_id"] for t in server.backlog_collection.find({"projectId": project_id}, {"_id": 1})]
+    server.get_comments_collection().delete_many({"taskId": {"$in": task_ids}})
+    server.backlog_collection.delete_many({"projectId": project_id})
+    server.get_stats_collection().delete_many({"_id": project_id})
+    server.get_rank_rebalance_collection().delete_many({"_id.projectId": project_id})
+    projects.delete_one({"_id": project_id})
+    users.delete_one({"_id": user_id})
@@ -0,0 +1,150 @@
+"""Backlog export / import (server.py against MongoDB; see conftest.py)."""
+import csv
+import io
+import json
+
+import pytest
+
+
+def _row(external_id, title, dependencies=(), **extra):
+    return {
+        "id": external_id, "title": title, "status": "To Do", "priority": "Medium",
+        "startDate": "2025-01-06", "dueDate": "2025-01-10", "dependencies": list(dependencies), **extra,
+    }
+
+
+def _import(client, project, body, export_format="ndjson"):
+    if export_format == "ndjson" and not isinstance(body, str):
+        body = "".join(json.dumps(row) + "\n" for row in body)
+    return client.post(
+        f"/api/projects/{project['id']}/backlog/import?format={export_format}",
+        data=body.encode("utf-8"),
+        headers={"X-User-Id": project["user"]},
+    )
+
+
+def _export(client, project, export_format="ndjson", comments="0"):
+    response = client.get(
+        f"/api/projects/{project['id']}/backlog/export?format={export_format}&comments={comments}",
+        headers={"X-User-Id": project["user"]},
+    )
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+
+def _tasks(server, project):
+    return list(server.backlog_collection.find({"projectId": server.ObjectId(project["id"])}).sort("_id", 1))
+
+
+def _deps_by_title(tasks):
+    titles = {t["_id"]: t["title"] for t in tasks}
+    return {t["title"]: sorted(titles.get(d, str(d)) for d in t["dependencies"]) for t in tasks}
+
+
+def test_forward_references_across_batches(server, client, project, monkeypatch):
+    monkeypatch.setattr(server, "IMPORT_BATCH_SIZE", 2)
+    response = _import(client, project, [
+        _row("a", "A", ["d"]),      # row in a later batch
+        _row("b", "B", ["a"]),      # row already read
+        _row("c", "C", ["c", "nope"]),
+        _row("d", "D"),
+    ])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["imported"] == 4
+    assert body["unresolvedDependencies"] == 2  # the self-reference and "nope"
+    assert _deps_by_title(_tasks(server, project)) == {"A": ["D"], "B": ["A"], "C": [], "D": []}
+    leftovers = {"importId", "importKey", "importPending"}
+    assert not [t for t in _tasks(server, project) if leftovers & t.keys()]
+
+
+@pytest.mark.parametrize("batch_size", [1, 1000])
+def test_reimported_export_links_the_new_copies(server, client, project, monkeypatch, batch_size):
+    assert _import(client, project, [_row("a", "A", ["b"]), _row("b", "B"), _row("c", "C", ["a"])]).status_code == 200
+    old_ids = {t["_id"] for t in _tasks(server, project)}
+    exported = _export(client, project)
+
+    monkeypatch.setattr(server, "IMPORT_BATCH_SIZE", batch_size)
+    assert _import(client, project, exported).get_json()["unresolvedDependencies"] == 0
+    copies = [t for t in _tasks(server, project) if t["_id"] not in old_ids]
+    assert _deps_by_title(copies) == {"A": ["B"], "B": [], "C": ["A"]}
+
+
+def test_existing_tasks_can_be_referenced(server, client, project):
+    _import(client, project, [_row("a", "A")])
+    existing_id = str(_tasks(server, project)[0]["_id"])
+    assert _import(client, project, [_row("x", "X", [existing_id])]).status_code == 200
+    assert _deps_by_title(_tasks(server, project))["X"] == ["A"]
+
+
+def test_import_queues_a_rebalance_for_long_ranks(server, client, project):
+    _import(client, project, [_row("a", "A")])
+    server.backlog_collection.update_one(
+        {"projectId": server.ObjectId(project["id"])}, {"$set": {"rank": "U" * server.RANK_MAX_LENGTH}}
+    )
+    queue = server.get_rank_rebalance_collection()
+    queued = {"_id": {"projectId": server.ObjectId(project["id"]), "status": "To Do"}}
+    assert queue.count_documents(queued) == 0
+
+    _import(client, project, [_row("b", "B")])
+    assert queue.count_documents(queued) == 1
+
+
+def test_csv_and_ndjson_round_trip(server, client, project):
+    fields = {"description": "line 1\nline 2, with comma", "label": "ops", "progress": 40, "assignedTo": project["user"]}
+    _import(client, project, [_row("a", "A", **fields), _row("b", "B", ["a"], dueDate="2025-02-01")])
+    original = json.loads(_export(client, project).splitlines()[0])
+
+    for export_format in ("csv", "ndjson"):
+        before = {t["_id"] for t in _tasks(server, project)}
+        exported = _export(client, project, export_format)
+        if export_format == "csv":
+            assert len(list(csv.DictReader(io.StringIO(exported)))) == len(before)
+        response = _import(client, project, exported, export_format)
+        assert response.status_code == 200
+        assert response.get_json()["imported"] == len(before)
+        copies = [t for t in _tasks(server, project) if t["_id"] not in before]
+        copy_a = next(server.serialize_task(t) for t in copies if t["title"] == "A")
+        for key in ("description", "label", "status", "priority", "assignedTo", "startDate", "dueDate", "progress"):
+            assert copy_a[key] == original[key], (export_format, key)
+        assert _deps_by_title([t for t in copies])["B"] == ["A"]
+
+
+def test_error_report(server, client, project, monkeypatch):
+    monkeypatch.setattr(server, "IMPORT_MAX_REPORTED_ERRORS", 2)
+    body = "\n".join([
+        json.dumps(_row("a", "A")),
+        "{not json",
+        json.dumps(_row("b", "")),
+        json.dumps(_row("c", "C", dueDate="2024-12-31")),
+    ]) + "\n"
+    response = _import(client, project, body)
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["imported"] == 1
+    assert report["errorCount"] == 3
+    assert report["errors"] == [
+        {"row": 2, "error": "invalid JSON"},
+        {"row": 3, "error": "title is required"},
+    ]
+
+    response = _import(client, project, "{not json\n")
+    assert response.status_code == 400
+    assert response.get_json()["imported"] == 0
+
+
+def test_rows_with_invalid_status_or_priority_are_rejected(server, client, project):
+    response = _import(client, project, [
+        _row("a", "A", status="Someday"),
+        _row("b", "B", status={"$ne": None}),
+        _row("c", "C", priority=["High"]),
+        _row("d", "D", status="Done"),
+    ])
+    report = response.get_json()
+    assert report["imported"] == 1
+    assert [error["error"] for error in report["errors"]] == [
+        "status must be one of To Do, In Progress, Done, Completed",
+        "status must be a string",
+        "priority must be a string",
+    ]
+    assert [t["title"] for t in _tasks(server, project)] == ["D"]
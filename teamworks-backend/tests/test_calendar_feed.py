@@ -0,0 +1,40 @@
+from calendar_feed import _escape, _fold
+
+
+def test_escape_text_values():
+    assert _escape("a,b;c\\d") == r"a\,b\;c\\d"
+    assert _escape("line 1\r\nline 2\nline 3") == "line 1\\nline 2\\nline 3"
+    assert _escape(None) == ""
+
+
+def test_short_lines_are_not_folded():
+    assert _fold("SUMMARY:short") == "SUMMARY:short\r\n"
+    line = "X" * 75
+    assert _fold(line) == line + "\r\n"
+
+
+def _physical_lines(folded):
+    assert folded.endswith("\r\n")
+    return folded[:-2].split("\r\n")
+
+
+def _unfold(folded):
+    return folded[:-2].replace("\r\n ", "")
+
+
+def test_long_lines_fold_at_75_octets():
+    line = "DESCRIPTION:" + "abcdefghij" * 30
+    folded = _fold(line)
+    parts = _physical_lines(folded)
+    assert len(parts) > 1
+    assert all(len(part.encode("utf-8")) <= 75 for part in parts)
+    assert all(part.startswith(" ") for part in parts[1:])
+    assert _unfold(folded) == line
+
+
+def test_folding_never_splits_a_utf8_sequence():
+    line = "SUMMARY:" + "é€😀" * 40
+    folded = _fold(line)
+    parts = _physical_lines(folded)
+    assert all(len(part.encode("utf-8")) <= 75 for part in parts)
+    assert _unfold(folded) == line
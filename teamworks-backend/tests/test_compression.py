@@ -0,0 +1,74 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+flask = pytest.importorskip("flask")
+
+from compression import Compressor, parse_accept_encoding  # noqa: E402
+
+PAYLOAD = [{"id": i, "title": f"task {i}"} for i in range(200)]
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip, br;q=0.5, identity;q=0") == {"gzip": 1.0, "br": 0.5, "identity": 0.0}
+    assert parse_accept_encoding(None) == {}
+
+
+@pytest.fixture
+def flask_app():
+    app = flask.Flask(__name__)
+    Compressor(app)
+
+    @app.route("/tasks")
+    def tasks():
+        response = flask.jsonify(PAYLOAD)
+        response.set_etag("3")
+        return response
+
+    @app.route("/small")
+    def small():
+        return flask.jsonify({"ok": True})
+
+    return app
+
+
+def test_flask_compresses_large_json(flask_app):
+    response = flask_app.test_client().get("/tasks", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == 'W/"3"'
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.get_data())) == PAYLOAD
+
+
+def test_flask_leaves_small_or_unaccepted_bodies(flask_app):
+    client = flask_app.test_client()
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/tasks", headers={"Accept-Encoding": "gzip;q=0"}).headers
+
+
+def test_async_views_are_compressed():
+    quart = pytest.importorskip("quart")
+    compressor = Compressor(flask.Flask(__name__))  # server_async reuses server.py's
+    app = quart.Quart(__name__)
+
+    @app.route("/tasks")
+    async def tasks():
+        return quart.jsonify(PAYLOAD)
+
+    @app.after_request
+    async def compress(response):
+        return await compressor.after_async_request(response, quart.request)
+
+    async def fetch(headers):
+        response = await app.test_client().get("/tasks", headers=headers)
+        return response, await response.get_data()
+
+    response, body = asyncio.run(fetch({"Accept-Encoding": "gzip"}))
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body)) == PAYLOAD
+
+    response, body = asyncio.run(fetch({}))
+    assert "Content-Encoding" not in response.headers
+    assert json.loads(body) == PAYLOAD
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+import pytest
+
+from fields import parse_if_match, to_bson_date
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (None, None),
+    ("", None),
+    ("*", None),
+    (' * ', None),
+    ('"3"', 3),
+    ("3", 3),
+    ('W/"7"', 7),
+    (' "0" ', 0),
+])
+def test_parse_if_match(raw, expected):
+    assert parse_if_match(raw) == expected
+
+
+@pytest.mark.parametrize("raw", ['"abc"', 'W/"1.5"', '"sha256-etag"'])
+def test_parse_if_match_rejects_non_versions(raw):
+    with pytest.raises(ValueError):
+        parse_if_match(raw)
+
+
+def test_to_bson_date():
+    assert to_bson_date("2024-02-29") == datetime(2024, 2, 29)
+    assert to_bson_date("2024-02-29T18:30:00Z") == datetime(2024, 2, 29)
+    assert to_bson_date("not a date") is None
+    assert to_bson_date("") is None
@@ -0,0 +1,63 @@
+"""Kanban moves (server.py against MongoDB; see conftest.py)."""
+from datetime import datetime
+
+
+def _insert_tasks(server, project, ranks, status="To Do"):
+    now = datetime.utcnow()
+    docs = [{
+        "title": f"T{i}", "description": "", "label": "", "status": status, "priority": "Medium",
+        "assignedTo": None, "startDate": now, "dueDate": now, "progress": 0, "dependencies": [],
+        "rank": rank, "version": 1, "createdAt": now, "updatedAt": now,
+        "projectId": server.ObjectId(project["id"]),
+    } for i, rank in enumerate(ranks)]
+    server.backlog_collection.insert_many(docs)
+    return [str(doc["_id"]) for doc in docs]
+
+
+def _move(client, project, task_id, **body):
+    return client.post(
+        f"/api/projects/{project['id']}/backlog/{task_id}/move",
+        json={"status": "To Do", **body},
+        headers={"X-User-Id": project["user"]},
+    )
+
+
+def _column(server, project):
+    tasks = server.backlog_collection.find({"projectId": server.ObjectId(project["id"])}, {"rank": 1})
+    return [str(t["_id"]) for t in sorted(tasks, key=lambda t: (t["rank"], t["_id"]))]
+
+
+def test_move_between_tasks(server, client, project):
+    first, second, third = _insert_tasks(server, project, ["a", "b", "c"])
+    response = _move(client, project, third, afterId=first, beforeId=second)
+    assert response.status_code == 200
+    assert _column(server, project) == [first, third, second]
+
+
+def test_move_between_tasks_with_equal_ranks(server, client, project):
+    # two concurrent appends both took rank_after of the same tail
+    first, second, moved = _insert_tasks(server, project, ["b", "b", "c"])
+    response = _move(client, project, moved, afterId=first, beforeId=second)
+    assert response.status_code == 200
+    assert _column(server, project) == [first, moved, second]
+
+
+def _update(client, project, task_id, **body):
+    return client.put(
+        f"/api/projects/{project['id']}/backlog/{task_id}",
+        json=body,
+        headers={"X-User-Id": project["user"]},
+    )
+
+
+def test_status_edit_appends_to_the_new_column(server, client, project):
+    done_first, done_last = _insert_tasks(server, project, ["b", "m"], status="Done")
+    (edited,) = _insert_tasks(server, project, ["a"])
+    assert _update(client, project, edited, status="Done").status_code == 200
+    assert _column(server, project) == [done_first, done_last, edited]
+
+    # re-sending the unchanged status (edit forms always do) keeps the position
+    rank = server.backlog_collection.find_one({"_id": server.ObjectId(edited)})["rank"]
+    assert _update(client, project, done_first, status="Done", title="renamed").status_code == 200
+    assert server.backlog_collection.find_one({"_id": server.ObjectId(done_first)})["rank"] == "b"
+    assert server.backlog_collection.find_one({"_id": server.ObjectId(edited)})["rank"] == rank
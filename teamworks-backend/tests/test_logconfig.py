@@ -0,0 +1,35 @@
+import logging
+
+import pytest
+
+flask = pytest.importorskip("flask")
+
+from logconfig import REDACTED, RequestContextFilter, redact_path, request_path  # noqa: E402
+
+
+def test_redact_path_masks_sensitive_route_variables():
+    path = "/api/calendar/s3cret/projects/abc.ics"
+    assert redact_path(path, {"token": "s3cret", "project_id": "abc"}) == (
+        f"/api/calendar/{REDACTED}/projects/abc.ics"
+    )
+    assert redact_path(path, {"project_id": "abc"}) == path
+    assert redact_path(path, None) == path
+
+
+@pytest.fixture
+def app():
+    app = flask.Flask(__name__)
+    app.add_url_rule("/api/calendar/<token>/me.ics", "personal_calendar", lambda token: "")
+    return app
+
+
+def test_request_path_hides_the_calendar_token(app):
+    with app.test_request_context("/api/calendar/s3cret/me.ics?from=x&token=s3cret"):
+        assert request_path() == f"/api/calendar/{REDACTED}/me.ics"
+        full = request_path(full=True)
+        assert "s3cret" not in full
+        assert full.startswith(f"/api/calendar/{REDACTED}/me.ics?from=x&")
+
+        record = logging.LogRecord("teamworks.access", logging.INFO, __file__, 1, "msg", None, None)
+        RequestContextFilter().filter(record)
+        assert "s3cret" not in record.path
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from bson import ObjectId  # noqa: E402
+from migrate import _backlog_types_changes  # noqa: E402
+
+
+def test_backlog_types_converts_strings():
+    user, dep = ObjectId(), ObjectId()
+    changes = _backlog_types_changes({
+        "_id": 1, "startDate": "2025-01-06", "dueDate": "2025-01-10T00:00:00Z",
+        "assignedTo": str(user), "dependencies": [str(dep), str(dep)],
+    })
+    assert changes == {
+        "startDate": datetime(2025, 1, 6), "dueDate": datetime(2025, 1, 10),
+        "assignedTo": user, "dependencies": [dep],
+    }
+
+
+def test_backlog_types_keeps_values_it_cannot_convert(capsys):
+    dep = ObjectId()
+    changes = _backlog_types_changes({
+        "_id": 1, "startDate": "next week", "assignedTo": "alice", "dependencies": [str(dep), "T-12"],
+    })
+    assert changes["startDate"] is None and changes["legacyStartDate"] == "next week"
+    assert changes["assignedTo"] is None and changes["legacyAssignedTo"] == "alice"
+    assert changes["dependencies"] == [dep] and changes["legacyDependencies"] == [str(dep), "T-12"]
+    assert capsys.readouterr().out.count("task 1:") == 3
+
+
+def test_backlog_types_empty_assignee_is_not_reported(capsys):
+    assert _backlog_types_changes({"_id": 1, "assignedTo": ""}) == {"assignedTo": None}
+    assert capsys.readouterr().out == ""
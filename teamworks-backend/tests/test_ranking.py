@@ -0,0 +1,76 @@
+import pytest
+
+from ranking import DIGITS, RANK_MAX_LENGTH, rank_after, rank_between, spaced_ranks
+
+
+def test_rank_between_open_ends():
+    rank = rank_between()
+    assert rank and not rank.endswith("0")
+    assert rank_between(None, rank) < rank < rank_between(rank, None)
+
+
+@pytest.mark.parametrize("lower, upper", [
+    ("a", "b"),      # adjacent digits: needs an extra digit
+    ("a", "a1"),     # upper extends lower
+    ("1", "z"),
+    ("az", "b"),
+    ("Vzz", "W"),
+])
+def test_rank_between_sorts_strictly_inside(lower, upper):
+    rank = rank_between(lower, upper)
+    assert lower < rank < upper
+    assert not rank.endswith("0")
+
+
+@pytest.mark.parametrize("lower, upper", [("b", "a"), ("a", "a")])
+def test_rank_between_rejects_unordered_bounds(lower, upper):
+    with pytest.raises(ValueError):
+        rank_between(lower, upper)
+
+
+def test_repeated_inserts_at_the_same_spot_stay_ordered():
+    lower, upper = "a", "b"
+    for _ in range(200):
+        rank = rank_between(lower, upper)
+        assert lower < rank < upper
+        upper = rank
+
+
+def test_rank_after():
+    assert rank_after() == DIGITS[len(DIGITS) // 2]
+    assert rank_after("a") == "b"
+    assert rank_after("az") == "b"
+    assert rank_after("z") > "z"
+
+
+def test_appends_keep_their_length():
+    rank, ranks = None, []
+    for _ in range(100):
+        rank = rank_after(rank)
+        ranks.append(rank)
+    assert ranks == sorted(ranks)
+    assert len(set(ranks)) == len(ranks)
+    # one more digit per ~31 appends, not one per halving
+    assert max(len(r) for r in ranks) <= 4
+
+
+@pytest.mark.parametrize("count", [1, 2, 61, 62, 1000, 5000])
+def test_spaced_ranks_are_ordered_and_short(count):
+    ranks = spaced_ranks(count)
+    assert len(ranks) == count
+    assert ranks == sorted(ranks)
+    assert len(set(ranks)) == count
+    assert all(r and not r.endswith("0") for r in ranks)
+    assert max(len(r) for r in ranks) < RANK_MAX_LENGTH
+    # lower half of the space: appends after the last one stay short
+    assert ranks[-1] < DIGITS[len(DIGITS) // 2]
+
+
+def test_spaced_ranks_leave_room_between_neighbours():
+    ranks = spaced_ranks(100)
+    for lower, upper in zip(ranks, ranks[1:]):
+        assert lower < rank_between(lower, upper) < upper
+
+
+def test_spaced_ranks_empty():
+    assert spaced_ranks(0) == []
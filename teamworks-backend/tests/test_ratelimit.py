@@ -0,0 +1,117 @@
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("pymongo")
+
+import ratelimit  # noqa: E402
+from ratelimit import Budget, MemoryBackend  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_then_empty(clock):
+    backend, budget = MemoryBackend(), Budget(rate=1, burst=3)
+    assert [backend.take("k", budget)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = backend.take("k", budget)
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+
+
+def test_refill_over_time(clock):
+    backend, budget = MemoryBackend(), Budget(rate=2, burst=2)
+    backend.take("k", budget)
+    backend.take("k", budget)
+    assert not backend.take("k", budget)[0]
+
+    clock[0] += 0.25  # half a token
+    allowed, retry_after = backend.take("k", budget)
+    assert not allowed
+    assert retry_after == pytest.approx(0.25)
+
+    clock[0] += 0.25
+    assert backend.take("k", budget)[0]
+    assert not backend.take("k", budget)[0]
+
+
+def test_refill_is_capped_at_burst(clock):
+    backend, budget = MemoryBackend(), Budget(rate=10, burst=2)
+    backend.take("k", budget)
+    clock[0] += 3600
+    assert [backend.take("k", budget)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_keys_are_independent(clock):
+    backend, budget = MemoryBackend(), Budget(rate=1, burst=1)
+    assert backend.take("a", budget)[0]
+    assert not backend.take("a", budget)[0]
+    assert backend.take("b", budget)[0]
+
+
+def _limiter(**kwargs):
+    return ratelimit.RateLimiter(user_exists=lambda user_id: user_id.startswith("real"), **kwargs)
+
+
+def test_users_are_keyed_with_their_ip_once_verified():
+    limiter = _limiter()
+    assert limiter.client_key("get_project", "real-1", "10.0.0.1") == ("ip:10.0.0.1", "real-1")
+    limiter.verify_user("real-1", "10.0.0.1")
+    assert limiter.client_key("get_project", "real-1", "10.0.0.1") == ("user:real-1|ip:10.0.0.1", None)
+    # claiming the same id from elsewhere neither shares nor drains that bucket
+    assert limiter.client_key("get_project", "real-1", "10.0.0.2") == ("ip:10.0.0.2", "real-1")
+    assert limiter.client_key("login_user", "real-1", "10.0.0.1") == ("ip:10.0.0.1", None)
+
+
+def test_made_up_ids_stay_on_the_ip_bucket():
+    limiter = _limiter()
+    limiter.verify_user("fake", "10.0.0.1")
+    assert limiter.client_key("get_project", "fake", "10.0.0.1") == ("ip:10.0.0.1", "fake")
+
+
+def test_one_ip_gets_a_bounded_number_of_user_buckets():
+    limiter = _limiter(max_users_per_ip=2)
+    for user in ("real-1", "real-2", "real-3"):
+        limiter.verify_user(user, "10.0.0.1")
+    assert limiter.client_key("get_project", "real-2", "10.0.0.1")[0] == "user:real-2|ip:10.0.0.1"
+    assert limiter.client_key("get_project", "real-3", "10.0.0.1") == ("ip:10.0.0.1", None)
+
+
+def test_known_users_evict_least_recently_used():
+    limiter = _limiter(max_known_users=2)
+    limiter.verify_user("real-1", "10.0.0.1")
+    limiter.verify_user("real-2", "10.0.0.2")
+    limiter.client_key("get_project", "real-1", "10.0.0.1")  # touch
+    limiter.verify_user("real-3", "10.0.0.3")
+    assert limiter.client_key("get_project", "real-1", "10.0.0.1")[1] is None
+    assert limiter.client_key("get_project", "real-2", "10.0.0.2")[1] == "real-2"
+    assert limiter.client_key("get_project", "real-3", "10.0.0.3")[1] is None
+
+
+def test_client_ip_reads_forwarded_for_from_the_trusted_end():
+    limiter = _limiter()
+    limiter.proxy_hops = 0
+    assert limiter.client_ip("10.0.0.9", "1.2.3.4") == "10.0.0.9"
+    limiter.proxy_hops = 1
+    # the left-most entry is whatever the client sent; the router appended the last one
+    assert limiter.client_ip("10.0.0.9", "6.6.6.6, 1.2.3.4") == "1.2.3.4"
+    assert limiter.client_ip("10.0.0.9", "6.6.6.6,5.5.5.5, 1.2.3.4") == "1.2.3.4"
+    limiter.proxy_hops = 2
+    assert limiter.client_ip("10.0.0.9", "6.6.6.6, 1.2.3.4, 10.0.0.8") == "1.2.3.4"
+    # fewer entries than trusted hops: not from behind our proxies
+    assert limiter.client_ip("10.0.0.9", "1.2.3.4") == "10.0.0.9"
+    assert limiter.client_ip("10.0.0.9", None) == "10.0.0.9"
+
+
+def test_memory_backend_evicts_least_recently_used(clock):
+    backend, budget = MemoryBackend(max_keys=2), Budget(rate=1, burst=1)
+    backend.take("a", budget)
+    backend.take("b", budget)
+    backend.take("a", budget)  # touch
+    backend.take("c", budget)
+    assert len(backend._buckets) == 2
+    assert not backend.take("a", budget)[0]  # still remembered: empty
+    assert backend.take("b", budget)[0]      # evicted: starts full
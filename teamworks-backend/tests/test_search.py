@@ -0,0 +1,36 @@
+"""Project search ranking (server.py against MongoDB; see conftest.py)."""
+from datetime import datetime
+
+
+def _insert_task(server, project, title, description=""):
+    now = datetime.utcnow()
+    return server.backlog_collection.insert_one({
+        "title": title, "description": description, "label": "", "status": "To Do", "priority": "Medium",
+        "assignedTo": None, "startDate": now, "dueDate": now, "progress": 0, "dependencies": [],
+        "rank": "m", "version": 1, "createdAt": now, "updatedAt": now,
+        "projectId": server.ObjectId(project["id"]),
+    }).inserted_id
+
+
+def _search(client, project, terms):
+    response = client.get(
+        f"/api/projects/{project['id']}/search?q={terms}",
+        headers={"X-User-Id": project["user"]},
+    )
+    assert response.status_code == 200
+    return response.get_json()["results"]
+
+
+def test_title_hit_ranks_above_comment_hit(server, client, project):
+    titled = _insert_task(server, project, "Migrate the zeppelin cache")
+    commented = _insert_task(server, project, "Unrelated chore")
+    server.get_comments_collection().insert_one({
+        "taskId": commented, "projectId": server.ObjectId(project["id"]),
+        "author": "Test User", "text": "blocked on the zeppelin cache", "timestamp": datetime.utcnow(),
+    })
+
+    results = _search(client, project, "zeppelin")
+    assert [(hit["type"], hit["taskId"]) for hit in results] == [
+        ("task", str(titled)),
+        ("comment", str(commented)),
+    ]